@@ -1,4 +1,7 @@
+import hashlib
+
 from google.adk.agents import LlmAgent
+from google.adk.agents.readonly_context import ReadonlyContext
 from google.adk.models.lite_llm import LiteLlm
 from google.adk.tools.mcp_tool import McpToolset, StreamableHTTPConnectionParams
 
@@ -16,6 +19,17 @@ critical allergies. Use clear, professional clinical language.
 If the patient is not found, inform the user and suggest verifying the patient ID.
 If unsure of the patient ID, ask the user to confirm before calling the tool."""
 
+
+def trace_headers(context: ReadonlyContext) -> dict[str, str]:
+    """W3C trace context for MCP calls, so one agent turn's tool calls share a trace.
+
+    The IDs are derived from the invocation ID: every tool call made while
+    answering the same user message carries the same traceparent.
+    """
+    digest = hashlib.sha256(context.invocation_id.encode()).hexdigest()
+    return {"traceparent": f"00-{digest[:32]}-{digest[32:48]}-01"}
+
+
 root_agent = LlmAgent(
     name="clinical_summary_agent",
     model=LiteLlm(model="openai/gpt-4o-mini"),
@@ -26,6 +40,7 @@ root_agent = LlmAgent(
                 url=MCP_SERVER_URL,
             ),
             tool_filter=["get_patient_summary"],
+            header_provider=trace_headers,
         )
     ],
 )
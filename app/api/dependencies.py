@@ -0,0 +1,78 @@
+from collections.abc import AsyncIterator
+
+from fastapi import Depends, Request
+
+from app.fhir.cache import FHIRCache
+from app.fhir.client import FHIRClient
+from app.fhir.transport import FHIRTransport
+from app.llm.cache import LLMCache
+from app.llm.client import LLMClient
+from app.llm.ratelimit import LLMRateLimiter, Priority
+from app.looplag import LoopLagMonitor
+from app.processing.jobs import BatchJobManager
+from app.processing.offload import Offloader
+
+# Set on requests made by the in-process MCP server's tool calls
+REQUEST_SOURCE_HEADER = "X-Request-Source"
+
+
+def get_fhir_transport(request: Request) -> FHIRTransport | None:
+    """Shared FHIR transport created in the application lifespan, if running."""
+    return getattr(request.app.state, "fhir_transport", None)
+
+
+def get_fhir_cache(request: Request) -> FHIRCache | None:
+    """Shared FHIR response cache created in the application lifespan, if enabled."""
+    return getattr(request.app.state, "fhir_cache", None)
+
+
+async def get_fhir_client(
+    transport: FHIRTransport | None = Depends(get_fhir_transport),
+    cache: FHIRCache | None = Depends(get_fhir_cache),
+) -> AsyncIterator[FHIRClient]:
+    """FHIR client bound to the shared transport and cache for one request."""
+    async with FHIRClient(
+        http_client=transport.client if transport else None,
+        cache=cache,
+        batch_unsupported=transport.batch_unsupported if transport else None,
+    ) as fhir_client:
+        yield fhir_client
+
+
+def get_llm_cache(request: Request) -> LLMCache | None:
+    """Shared LLM completion cache created in the application lifespan, if enabled."""
+    return getattr(request.app.state, "llm_cache", None)
+
+
+def get_llm_limiter(request: Request) -> LLMRateLimiter | None:
+    """Process-wide LLM rate limiter created in the application lifespan, if running."""
+    return getattr(request.app.state, "llm_limiter", None)
+
+
+def get_llm_client(
+    request: Request,
+    cache: LLMCache | None = Depends(get_llm_cache),
+    limiter: LLMRateLimiter | None = Depends(get_llm_limiter),
+) -> LLMClient:
+    """LLM client bound to the shared completion cache and rate limiter.
+
+    MCP tool calls run at agent priority, everything else at interactive priority.
+    """
+    is_mcp = request.headers.get(REQUEST_SOURCE_HEADER) == "mcp"
+    priority = Priority.AGENT if is_mcp else Priority.INTERACTIVE
+    return LLMClient(cache=cache, limiter=limiter, priority=priority)
+
+
+def get_offloader(request: Request) -> Offloader | None:
+    """Executor stage for CPU-bound extraction and prompt rendering, if running."""
+    return getattr(request.app.state, "offloader", None)
+
+
+def get_loop_lag(request: Request) -> LoopLagMonitor | None:
+    """Event-loop lag monitor created in the application lifespan, if enabled."""
+    return getattr(request.app.state, "loop_lag", None)
+
+
+def get_batch_jobs(request: Request) -> BatchJobManager:
+    """Batch job manager created in the application lifespan."""
+    return request.app.state.batch_jobs
@@ -1,4 +1,6 @@
+from .batch import router as batch_router
 from .health import router as health_router
+from .metrics import router as metrics_router
 from .summary import router as summary_router
 
-__all__ = ["summary_router", "health_router"]
+__all__ = ["summary_router", "health_router", "batch_router", "metrics_router"]
@@ -0,0 +1,125 @@
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app import fastjson
+from app.api.dependencies import get_batch_jobs
+from app.processing.jobs import BatchJob, BatchJobManager
+from app.schemas.requests import BatchSummaryRequest, BulkSummaryRequest
+from app.schemas.responses import BatchJobStatus, ErrorResponse
+
+router = APIRouter(prefix="/api/v1/summary/batch", tags=["batch"])
+
+
+def _job_status(job: BatchJob) -> BatchJobStatus:
+    return BatchJobStatus(
+        job_id=job.job_id,
+        status=job.status,
+        total=len(job.patient_ids),
+        completed=len(job.results),
+        failed=job.failed,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        error=job.error,
+    )
+
+
+@router.post(
+    "",
+    operation_id="create_batch_summary",
+    response_model=BatchJobStatus,
+    status_code=202,
+    responses={413: {"model": ErrorResponse, "description": "Too many patients"}},
+)
+async def create_batch_summary(
+    request: BatchSummaryRequest,
+    jobs: BatchJobManager = Depends(get_batch_jobs),
+) -> BatchJobStatus:
+    """
+    Start a summary job for a cohort of patients.
+
+    Patients are processed in the background through a bounded worker pool
+    with separate concurrency caps for FHIR fetches and LLM calls. Poll the
+    returned job ID for progress or stream its results.
+    """
+    return _job_status(jobs.submit(request.patient_ids))
+
+
+@router.post(
+    "/bulk",
+    operation_id="create_bulk_summary",
+    response_model=BatchJobStatus,
+    status_code=202,
+    responses={
+        400: {"model": ErrorResponse, "description": "Bulk Data ingestion not configured"},
+        404: {"model": ErrorResponse, "description": "Export directory not found"},
+    },
+)
+async def create_bulk_summary(
+    request: BulkSummaryRequest,
+    jobs: BatchJobManager = Depends(get_batch_jobs),
+) -> BatchJobStatus:
+    """
+    Start a summary job over a FHIR Bulk Data ($export) NDJSON export.
+
+    The export is indexed by patient reference in a single streaming pass and
+    each patient's resources are read back only when that patient is
+    summarized. Progress and results use the same endpoints as REST batch jobs.
+    """
+    return _job_status(jobs.submit_bulk(request.export_dir, request.group_id))
+
+
+@router.get(
+    "/{job_id}",
+    operation_id="get_batch_summary_status",
+    response_model=BatchJobStatus,
+    responses={404: {"model": ErrorResponse, "description": "Job not found"}},
+)
+async def get_batch_summary_status(
+    job_id: str,
+    jobs: BatchJobManager = Depends(get_batch_jobs),
+) -> BatchJobStatus:
+    """Get the progress of a batch summary job."""
+    return _job_status(jobs.get(job_id))
+
+
+@router.get(
+    "/{job_id}/results",
+    operation_id="stream_batch_summary_results",
+    responses={
+        200: {"content": {"application/x-ndjson": {}}},
+        404: {"model": ErrorResponse, "description": "Job not found"},
+    },
+)
+async def stream_batch_summary_results(
+    job_id: str,
+    jobs: BatchJobManager = Depends(get_batch_jobs),
+) -> StreamingResponse:
+    """
+    Stream a batch job's per-patient results as NDJSON.
+
+    Results already finished are sent immediately; the stream then stays open
+    and emits each further result as it completes, closing when the job ends.
+    """
+    job = jobs.get(job_id)
+
+    async def lines() -> AsyncIterator[bytes]:
+        async for result in job.iter_results():
+            yield fastjson.dumps(result) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.delete(
+    "/{job_id}",
+    operation_id="cancel_batch_summary",
+    response_model=BatchJobStatus,
+    responses={404: {"model": ErrorResponse, "description": "Job not found"}},
+)
+async def cancel_batch_summary(
+    job_id: str,
+    jobs: BatchJobManager = Depends(get_batch_jobs),
+) -> BatchJobStatus:
+    """Cancel a running batch summary job, keeping results finished so far."""
+    return _job_status(await jobs.cancel(job_id))
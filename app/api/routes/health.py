@@ -1,4 +1,21 @@
-from fastapi import APIRouter
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from app.api.dependencies import (
+    get_fhir_cache,
+    get_fhir_transport,
+    get_llm_cache,
+    get_llm_limiter,
+    get_loop_lag,
+    get_offloader,
+)
+from app.fhir.cache import FHIRCache
+from app.fhir.transport import FHIRTransport
+from app.llm.cache import LLMCache
+from app.llm.ratelimit import LLMRateLimiter
+from app.looplag import LoopLagMonitor
+from app.processing.offload import Offloader
 
 router = APIRouter(tags=["health"])
 
@@ -9,6 +26,66 @@ async def health_check() -> dict[str, str]:
     return {"status": "healthy"}
 
 
+@router.get("/health/pool")
+async def pool_stats(
+    transport: FHIRTransport | None = Depends(get_fhir_transport),
+) -> dict[str, Any]:
+    """FHIR connection pool usage and saturation counters."""
+    if transport is None:
+        return {"status": "unavailable"}
+    return transport.stats()
+
+
+@router.get("/health/cache")
+async def cache_stats(
+    cache: FHIRCache | None = Depends(get_fhir_cache),
+) -> dict[str, Any]:
+    """FHIR response cache size and hit/miss counters."""
+    if cache is None:
+        return {"status": "disabled"}
+    return cache.snapshot()
+
+
+@router.get("/health/llm-cache")
+async def llm_cache_stats(
+    cache: LLMCache | None = Depends(get_llm_cache),
+) -> dict[str, Any]:
+    """LLM completion cache size and hit/miss counters."""
+    if cache is None:
+        return {"status": "disabled"}
+    return cache.snapshot()
+
+
+@router.get("/health/llm")
+async def llm_limiter_stats(
+    limiter: LLMRateLimiter | None = Depends(get_llm_limiter),
+) -> dict[str, Any]:
+    """LLM rate limiter budget, per-priority queue depth and wait times, and retries."""
+    if limiter is None:
+        return {"status": "unavailable"}
+    return limiter.snapshot()
+
+
+@router.get("/health/loop")
+async def loop_lag_stats(
+    monitor: LoopLagMonitor | None = Depends(get_loop_lag),
+) -> dict[str, Any]:
+    """Event-loop lag: how long the loop was blocked, recent percentiles and max."""
+    if monitor is None:
+        return {"status": "disabled"}
+    return monitor.snapshot()
+
+
+@router.get("/health/offload")
+async def offload_stats(
+    offloader: Offloader | None = Depends(get_offloader),
+) -> dict[str, Any]:
+    """Where extraction and prompt rendering ran (inline, thread, process) and in-flight work."""
+    if offloader is None:
+        return {"status": "unavailable"}
+    return offloader.snapshot()
+
+
 @router.get("/")
 async def root() -> dict[str, str]:
     """Root endpoint with API info."""
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from app import metrics
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/metrics")
+async def prometheus_metrics() -> Response:
+    """Process metrics in the Prometheus text exposition format."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,36 +1,47 @@
 import time
-from datetime import datetime
+from collections.abc import AsyncIterator
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 
-from app.config import get_settings
+from app import fastjson
+from app.api.dependencies import get_fhir_client, get_llm_client
+from app.fastjson import FastJSONResponse
 from app.fhir.client import FHIRClient
-from app.fhir.resources import (
-    AllergyHandler,
-    ConditionHandler,
-    MedicationRequestHandler,
-    ObservationHandler,
-    PatientHandler,
-)
 from app.llm.client import LLMClient
-from app.llm.prompts import PromptAssembler, SectionType
-from app.schemas.responses import (
-    DataAvailability,
-    ErrorResponse,
-    PatientSummaryResponse,
-    SectionSummaries,
+from app.llm.prompts import CombinedOutputParser, PromptAssembler
+from app.processing import SectionResult, SingleFlight
+from app.processing.pipeline import (
+    RESOURCE_ELEMENTS,
+    RESOURCE_HANDLERS,
+    PatientData,
+    build_section_prompts_async,
+    build_section_scheduler,
+    build_summary_response,
+    fast_section_results,
+    fetch_patient_data,
+    generate_summary,
+    merge_section_results,
+    resolve_mode,
+    section_source,
 )
+from app.schemas.requests import SummaryMode
+from app.schemas.responses import ErrorResponse, PatientSummaryResponse
 
 router = APIRouter(prefix="/api/v1", tags=["summary"])
 
-# Resource handlers mapping
-RESOURCE_HANDLERS = {
-    "Patient": PatientHandler(),
-    "Condition": ConditionHandler(),
-    "MedicationRequest": MedicationRequestHandler(),
-    "Observation": ObservationHandler(),
-    "AllergyIntolerance": AllergyHandler(),
-}
+# Concurrent summaries of the same patient share one pipeline run. The run uses the
+# first caller's FHIR and LLM clients (their stats and llm.calls), so the key includes
+# the LLM priority: agent calls never ride on, or hold back, an interactive request.
+summary_flights = SingleFlight()
+
+MODE_QUERY = Query(
+    None,
+    description=(
+        "two_stage (a call per section, then a final call) or fast (one combined call); "
+        "defaults to the SUMMARY_MODE setting"
+    ),
+)
 
 
 @router.get(
@@ -42,7 +53,12 @@ RESOURCE_HANDLERS = {
         500: {"model": ErrorResponse, "description": "Internal server error"},
     },
 )
-async def get_patient_summary(patient_id: str) -> PatientSummaryResponse:
+async def get_patient_summary(
+    patient_id: str,
+    mode: SummaryMode | None = MODE_QUERY,
+    fhir_client: FHIRClient = Depends(get_fhir_client),
+    llm: LLMClient = Depends(get_llm_client),
+) -> PatientSummaryResponse:
     """
     Generate a comprehensive clinical summary for a patient.
 
@@ -52,100 +68,192 @@ async def get_patient_summary(patient_id: str) -> PatientSummaryResponse:
 
     Args:
         patient_id: The FHIR Patient resource ID
+        mode: two_stage or fast (a single LLM call; lower latency, less synthesis)
 
     Returns:
         PatientSummaryResponse with comprehensive summary and section details
     """
-    start_time = time.time()
-    settings = get_settings()
-
-    # Step 1: Fetch all FHIR resources in parallel
-    async with FHIRClient() as fhir_client:
-        try:
-            resources = await fhir_client.get_patient_resources(
-                patient_id=patient_id,
-                resource_types=list(RESOURCE_HANDLERS.keys()),
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"FHIR query failed: {str(e)}",
-            )
-
-    # Check if patient exists
-    if not resources.get("Patient"):
-        raise HTTPException(
-            status_code=404,
-            detail=f"Patient {patient_id} not found in FHIR server",
-        )
-
-    # Step 2: Convert resources to DataFrames
-    dataframes = {}
-    data_availability = {}
+    mode = resolve_mode(mode)
+    return await summary_flights.run(
+        ("summary", patient_id, mode, llm.priority),
+        lambda: generate_summary(patient_id, fhir_client, llm, mode),
+    )
 
-    for resource_type, handler in RESOURCE_HANDLERS.items():
-        resource_list = resources.get(resource_type, [])
-        df = handler.to_dataframe(resource_list)
-        dataframes[resource_type] = df
-        data_availability[resource_type] = not df.empty
 
-    # Step 3: Build section prompts
-    assembler = PromptAssembler()
-    section_prompts = assembler.build_all_section_prompts(dataframes)
+@router.get(
+    "/summary/{patient_id}/stream",
+    operation_id="stream_patient_summary",
+    responses={
+        200: {"content": {"text/event-stream": {}}},
+        404: {"model": ErrorResponse, "description": "Patient not found"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+    },
+)
+async def stream_patient_summary(
+    patient_id: str,
+    mode: SummaryMode | None = MODE_QUERY,
+    fhir_client: FHIRClient = Depends(get_fhir_client),
+    llm: LLMClient = Depends(get_llm_client),
+) -> StreamingResponse:
+    """
+    Stream a clinical summary for a patient as Server-Sent Events.
 
-    # Step 4: Generate section summaries
-    llm = LLMClient()
-    section_summaries: dict[SectionType, str] = {}
+    Emits ``data_availability`` right after the FHIR fetch, one ``section``
+    event per section summary as it completes, ``summary_delta`` events while
+    the final summary is generated, and a closing ``done`` event carrying the
+    full PatientSummaryResponse. Failures after the stream has started are
+    reported as an ``error`` event. Sections rendered from templates are sent
+    first; in fast mode the others arrive as the single combined response
+    gets to each section's closing tag.
+    """
+    # Fetch before streaming so a missing patient is still a plain 404
+    data = await fetch_patient_data(patient_id, fhir_client)
+    if resolve_mode(mode) is SummaryMode.FAST:
+        events = _fast_summary_events(data, llm)
+    else:
+        events = _summary_events(data, llm)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    for section_type, prompt in section_prompts.items():
-        summary = await llm.generate_section_summary(prompt)
-        section_summaries[section_type] = summary
 
-    # Step 5: Generate final comprehensive summary
-    final_prompt = assembler.build_final_prompt(section_summaries)
-    final_summary = await llm.generate_final_summary(final_prompt)
+def _sse(event: str, payload: dict | str) -> str:
+    """Format one Server-Sent Event."""
+    data = payload if isinstance(payload, str) else fastjson.dumps(payload).decode()
+    return f"event: {event}\ndata: {data}\n\n"
 
-    # Step 6: Build response
-    processing_time = int((time.time() - start_time) * 1000)
 
-    return PatientSummaryResponse(
-        patient_id=patient_id,
-        generated_at=datetime.utcnow(),
-        summary=final_summary,
-        sections=SectionSummaries(
-            demographics=section_summaries.get(SectionType.DEMOGRAPHICS),
-            conditions=section_summaries.get(SectionType.CONDITIONS),
-            medications=section_summaries.get(SectionType.MEDICATIONS),
-            observations=section_summaries.get(SectionType.OBSERVATIONS),
-            allergies=section_summaries.get(SectionType.ALLERGIES),
-        ),
-        data_availability=DataAvailability(**data_availability),
-        processing_time_ms=processing_time,
-        model=settings.openai_model,
+def _section_event(result: SectionResult) -> str:
+    """A ``section`` event for one section result."""
+    return _sse(
+        "section",
+        {
+            "section": result.section_type.value,
+            "summary": result.summary,
+            "fallback": result.fallback,
+            "source": section_source(result).value,
+        },
     )
 
 
+async def _summary_events(data: PatientData, llm: LLMClient) -> AsyncIterator[str]:
+    """Run the LLM stages and yield progress as Server-Sent Events."""
+    yield _sse("data_availability", data.data_availability.model_dump_json())
+
+    try:
+        assembler = PromptAssembler()
+        section_prompts, templated, budget_report = await build_section_prompts_async(data)
+        for result in templated.values():
+            yield _section_event(result)
+
+        section_results = {}
+        async for result in build_section_scheduler(llm).iter_results(section_prompts):
+            section_results[result.section_type] = result
+            yield _section_event(result)
+        section_results = merge_section_results(templated, section_results)
+        section_summaries = {st: r.summary for st, r in section_results.items()}
+
+        final_start = time.perf_counter()
+        final_prompt = assembler.build_final_prompt(section_summaries)
+        parts: list[str] = []
+        async for delta in llm.stream_final_summary(final_prompt):
+            parts.append(delta)
+            yield _sse("summary_delta", {"delta": delta})
+        final_llm_ms = (time.perf_counter() - final_start) * 1000
+
+        response = build_summary_response(
+            data,
+            section_results,
+            "".join(parts),
+            final_llm_ms,
+            budget_report,
+            final_prompt,
+            llm_calls=llm.calls,
+        )
+        yield _sse("done", response.model_dump_json())
+    except Exception as e:
+        yield _sse("error", {"detail": f"Summary generation failed: {str(e)}"})
+
+
+async def _fast_summary_events(data: PatientData, llm: LLMClient) -> AsyncIterator[str]:
+    """Stream the single combined LLM call, split into section and summary events."""
+    yield _sse("data_availability", data.data_availability.model_dump_json())
+
+    try:
+        section_prompts, templated, budget_report = await build_section_prompts_async(data)
+        for result in templated.values():
+            yield _section_event(result)
+        combined_prompt = PromptAssembler().build_combined_prompt(
+            section_prompts, {st: result.summary for st, result in templated.items()}
+        )
+
+        start = time.perf_counter()
+        parser = CombinedOutputParser()
+        async for delta in llm.stream_combined_summary(combined_prompt):
+            completed, summary_delta = parser.feed(delta)
+            for section_type in completed:
+                if section_type not in section_prompts:
+                    continue  # templated, already sent
+                if not parser.sections[section_type]:
+                    continue  # reported with the fallback text below
+                yield _section_event(SectionResult(section_type, parser.sections[section_type]))
+            if summary_delta:
+                yield _sse("summary_delta", {"delta": summary_delta})
+        llm_ms = (time.perf_counter() - start) * 1000
+
+        section_results = fast_section_results(parser, section_prompts)
+        for result in section_results.values():
+            if result.fallback:
+                yield _section_event(result)
+        section_results = merge_section_results(templated, section_results)
+        response = build_summary_response(
+            data,
+            section_results,
+            parser.summary(),
+            llm_ms,
+            budget_report,
+            combined_prompt,
+            llm_calls=llm.calls,
+            mode=SummaryMode.FAST,
+        )
+        yield _sse("done", response.model_dump_json())
+    except Exception as e:
+        yield _sse("error", {"detail": f"Summary generation failed: {str(e)}"})
+
+
 @router.get("/resources/{patient_id}", operation_id="get_patient_resources")
-async def get_patient_resources(patient_id: str) -> dict:
+async def get_patient_resources(
+    patient_id: str,
+    project_elements: bool = Query(
+        True, description="Request only the elements the handlers read (_elements)"
+    ),
+    fhir_client: FHIRClient = Depends(get_fhir_client),
+) -> FastJSONResponse:
     """
     Debug endpoint to fetch raw FHIR resources for a patient.
 
-    Useful for testing and debugging the FHIR data extraction.
+    Useful for testing and debugging the FHIR data extraction. Pass
+    ``project_elements=false`` to download full resources from the server.
     """
-    async with FHIRClient() as fhir_client:
-        resources = await fhir_client.get_patient_resources(
-            patient_id=patient_id,
-            resource_types=list(RESOURCE_HANDLERS.keys()),
-        )
+    resources = await fhir_client.get_patient_resources(
+        patient_id=patient_id,
+        resource_types=list(RESOURCE_HANDLERS.keys()),
+        elements=RESOURCE_ELEMENTS if project_elements else None,
+    )
+    truncated = fhir_client.truncated
 
-    # Convert to DataFrames and return as dict
+    # Extract into record tables; the rows are plain JSON values, so they are
+    # rendered directly instead of going through jsonable_encoder
     result = {}
     for resource_type, handler in RESOURCE_HANDLERS.items():
         resource_list = resources.get(resource_type, [])
-        df = handler.to_dataframe(resource_list)
+        table = handler.to_records(resource_list)
         result[resource_type] = {
             "count": len(resource_list),
-            "data": df.to_dict(orient="records") if not df.empty else [],
+            "truncated": truncated.get(resource_type, False),
+            "data": table.to_dicts(),
         }
 
-    return result
+    return FastJSONResponse(result)
@@ -0,0 +1,547 @@
+"""Benchmark suite for extraction, prompt assembly and end-to-end summaries.
+
+Micro-benchmarks time each handler's ``extract_fields`` / ``to_records`` /
+``to_dataframe`` (with pandas installed), markdown rendering and prompt
+assembly. Inputs are synthetic patients from tiny up to 10k observations.
+The end-to-end benchmark starts the mock FHIR server, the mock LLM and the
+API as local processes. It then drives ``/api/v1/summary`` at a fixed
+concurrency, once per summary mode (two-stage and single-pass fast), and
+reports p50/p95/p99 latency, throughput and LLM tokens per summary, plus
+``/health`` latency while the load runs (a blocked event loop shows up there).
+
+Results are written as JSON. ``--compare`` checks them against an earlier
+run and exits non-zero when anything got slower than ``--tolerance``::
+
+    python -m app.bench --output bench.json
+    python -m app.bench --sizes small,xl --skip-e2e --compare bench.json
+    python -m app.bench --skip-micro --modes fast
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app import fastjson
+from app.llm.prompts import PromptAssembler
+from app.mock import PatientProfile, generate_patient
+from app.processing.compaction import compact_observations
+from app.processing.pipeline import RESOURCE_HANDLERS, build_section_prompts, extract_patient_data
+from app.schemas.requests import SummaryMode
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SIZES = {
+    "tiny": PatientProfile(
+        conditions=2, medications=2, observations=10, allergies=1, observation_tests=5
+    ),
+    "small": PatientProfile(),
+    "large": PatientProfile(
+        conditions=40, medications=60, observations=2000, allergies=6, observation_tests=20
+    ),
+    "xl": PatientProfile(
+        conditions=80, medications=120, observations=10000, allergies=10, observation_tests=20
+    ),
+}
+
+# Seconds between /health probes during a load run
+HEALTH_PROBE_INTERVAL = 0.05
+
+
+@dataclass
+class Timing:
+    """Timing of one micro-benchmark, in milliseconds per run."""
+
+    name: str
+    size: str
+    items: int
+    runs: int
+    min_ms: float
+    median_ms: float
+
+
+@dataclass
+class LoadResult:
+    """Latency percentiles, throughput and token usage of one end-to-end load run."""
+
+    size: str
+    mode: str
+    requests: int
+    concurrency: int
+    errors: int
+    duration_s: float
+    throughput_rps: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    # Means per successful summary, from the response's timings
+    llm_calls: float = 0.0
+    prompt_tokens: float = 0.0
+    completion_tokens: float = 0.0
+    # /health latency while the load ran: how responsive the event loop stayed
+    health_p50_ms: float = 0.0
+    health_p99_ms: float = 0.0
+
+
+def measure(fn: Callable[[], Any], min_time: float = 0.2, max_runs: int = 1000) -> list[float]:
+    """Run ``fn`` repeatedly for at least ``min_time`` seconds (and 3 runs); times in ms."""
+    times: list[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(times) < 3 or (time.perf_counter() < deadline and len(times) < max_runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def percentile(values: list[float], q: float) -> float:
+    """The ``q`` quantile (0-1) of ``values``, by linear interpolation."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def micro_benchmarks(sizes: list[str], min_time: float = 0.2) -> list[Timing]:
+    """Time extraction, rendering and prompt assembly for each patient size."""
+    try:
+        import pandas  # noqa: F401
+
+        has_pandas = True
+    except ImportError:
+        has_pandas = False
+
+    assembler = PromptAssembler()
+    timings: list[Timing] = []
+
+    def record(name: str, size: str, items: int, fn: Callable[[], Any]) -> None:
+        times = measure(fn, min_time)
+        timings.append(
+            Timing(name, size, items, len(times), min(times), statistics.median(times))
+        )
+
+    for size in sizes:
+        resources = generate_patient("patient-0", SIZES[size])
+        data = extract_patient_data("patient-0", resources)
+        tables = data.tables
+        total = sum(len(resource_list) for resource_list in resources.values())
+
+        for resource_type, handler in RESOURCE_HANDLERS.items():
+            resource_list = resources[resource_type]
+            handler_name = type(handler).__name__
+            items = len(resource_list)
+            record(
+                f"{handler_name}.extract_fields",
+                size,
+                items,
+                lambda h=handler, rl=resource_list: [h.extract_fields(r) for r in rl],
+            )
+            record(
+                f"{handler_name}.to_records",
+                size,
+                items,
+                lambda h=handler, rl=resource_list: h.to_records(rl),
+            )
+            if has_pandas:
+                record(
+                    f"{handler_name}.to_dataframe",
+                    size,
+                    items,
+                    lambda h=handler, rl=resource_list: h.to_dataframe(rl),
+                )
+            record(
+                f"RecordTable.to_markdown[{resource_type}]",
+                size,
+                items,
+                tables[resource_type].to_markdown,
+            )
+
+        observations = tables["Observation"]
+        record(
+            "compact_observations",
+            size,
+            len(observations),
+            lambda: compact_observations(observations),
+        )
+        record(
+            "PromptAssembler.build_all_section_prompts",
+            size,
+            total,
+            lambda: assembler.build_all_section_prompts(tables),
+        )
+        record("build_section_prompts", size, total, lambda: build_section_prompts(data))
+        record(
+            "extract_patient_data",
+            size,
+            total,
+            lambda: extract_patient_data("patient-0", resources),
+        )
+    return timings
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url}: process exited with {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url}: not ready after {timeout}s")
+
+
+@contextmanager
+def local_stack(
+    profile: PatientProfile,
+    fhir_latency_ms: float,
+    fhir_p99_ms: float,
+    ttft_ms: float,
+    tokens_per_second: float,
+) -> Iterator[str]:
+    """Run the mock FHIR server, mock LLM and the API as processes; yields the API URL.
+
+    Caches are disabled in the API so every request exercises the full path.
+    """
+    fhir_port, llm_port, api_port = _free_port(), _free_port(), _free_port()
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    mock = [sys.executable, "-m", "app.mock"]
+    commands = [
+        (
+            [
+                *mock, "fhir", "--port", str(fhir_port),
+                "--conditions", str(profile.conditions),
+                "--medications", str(profile.medications),
+                "--observations", str(profile.observations),
+                "--allergies", str(profile.allergies),
+                "--observation-tests", str(profile.observation_tests),
+                "--latency-ms", str(fhir_latency_ms),
+                "--p99-ms", str(fhir_p99_ms),
+            ],
+            env,
+            f"http://127.0.0.1:{fhir_port}/metadata",
+        ),
+        (
+            [
+                *mock, "llm", "--port", str(llm_port),
+                "--ttft-ms", str(ttft_ms),
+                "--tokens-per-second", str(tokens_per_second),
+            ],
+            env,
+            f"http://127.0.0.1:{llm_port}/v1/models",
+        ),
+        (
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--port", str(api_port), "--log-level", "warning",
+            ],
+            {
+                **env,
+                "FHIR_BASE_URL": f"http://127.0.0.1:{fhir_port}",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+                "OPENAI_API_KEY": "mock",
+                "FHIR_CACHE_ENABLED": "false",
+                "LLM_CACHE_ENABLED": "false",
+                "MCP_ENABLED": "false",
+            },
+            f"http://127.0.0.1:{api_port}/health",
+        ),
+    ]
+    processes: list[subprocess.Popen] = []
+    try:
+        for command, command_env, ready_url in commands:
+            process = subprocess.Popen(
+                command, cwd=ROOT, env=command_env, stdout=subprocess.DEVNULL
+            )
+            processes.append(process)
+            _wait_ready(ready_url, process)
+        yield f"http://127.0.0.1:{api_port}"
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+
+async def run_load(
+    base_url: str,
+    patient_ids: list[str],
+    concurrency: int,
+    size: str = "",
+    mode: str = "two_stage",
+    timeout: float = 300.0,
+) -> LoadResult:
+    """Request one summary per patient ID with ``concurrency`` requests in flight."""
+    latencies: list[float] = []
+    # Per successful summary: LLM calls, prompt tokens, completion tokens
+    usage: list[tuple[int, int, int]] = []
+    health: list[float] = []
+    errors = 0
+    queue = iter(patient_ids)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            for patient_id in queue:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(
+                        f"/api/v1/summary/{patient_id}", params={"mode": mode}
+                    )
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if not ok:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+                calls = (fastjson.loads(response.content).get("timings") or {}).get("llm", [])
+                usage.append(
+                    (
+                        len(calls),
+                        sum(call["prompt_tokens"] or 0 for call in calls),
+                        sum(call["completion_tokens"] or 0 for call in calls),
+                    )
+                )
+
+        async def probe() -> None:
+            while True:
+                start = time.perf_counter()
+                try:
+                    await client.get("/health")
+                except httpx.HTTPError:
+                    pass
+                health.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(HEALTH_PROBE_INTERVAL)
+
+        prober = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        duration = time.perf_counter() - started
+        prober.cancel()
+
+    def mean(values: list[int]) -> float:
+        return round(statistics.fmean(values), 1) if values else 0.0
+
+    calls, prompt_tokens, completion_tokens = (list(column) for column in zip(*usage or [()]))
+    return LoadResult(
+        size=size,
+        mode=mode,
+        requests=len(patient_ids),
+        concurrency=concurrency,
+        errors=errors,
+        duration_s=round(duration, 3),
+        throughput_rps=round(len(latencies) / duration, 2) if duration else 0.0,
+        mean_ms=round(statistics.fmean(latencies), 1) if latencies else 0.0,
+        p50_ms=round(percentile(latencies, 0.50), 1),
+        p95_ms=round(percentile(latencies, 0.95), 1),
+        p99_ms=round(percentile(latencies, 0.99), 1),
+        llm_calls=mean(calls),
+        prompt_tokens=mean(prompt_tokens),
+        completion_tokens=mean(completion_tokens),
+        health_p50_ms=round(percentile(health, 0.50), 1),
+        health_p99_ms=round(percentile(health, 0.99), 1),
+    )
+
+
+def end_to_end(args: argparse.Namespace, modes: list[str]) -> list[LoadResult]:
+    """Warm up, then load ``/api/v1/summary`` with distinct patients (no coalescing).
+
+    Each mode gets the same patients, one mode after the other.
+    """
+    patient_ids = [f"patient-{i}" for i in range(args.requests)]
+
+    def load(base_url: str) -> list[LoadResult]:
+        asyncio.run(run_load(base_url, ["warmup-0", "warmup-1"], 2))
+        return [
+            asyncio.run(
+                run_load(base_url, patient_ids, args.concurrency, args.e2e_size, mode)
+            )
+            for mode in modes
+        ]
+
+    if args.url:
+        return load(args.url)
+    with local_stack(
+        SIZES[args.e2e_size],
+        args.fhir_latency_ms,
+        args.fhir_p99_ms,
+        args.ttft_ms,
+        args.tokens_per_second,
+    ) as base_url:
+        return load(base_url)
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Metrics that got slower than ``baseline`` by more than ``tolerance`` (a fraction)."""
+    regressions = []
+    before = {(t["name"], t["size"]): t["median_ms"] for t in baseline.get("micro", [])}
+    for timing in current.get("micro", []):
+        old = before.get((timing["name"], timing["size"]))
+        if old and timing["median_ms"] > old * (1 + tolerance):
+            regressions.append(
+                f"{timing['name']} [{timing['size']}]: "
+                f"{old:.3f} -> {timing['median_ms']:.3f} ms ({timing['median_ms'] / old - 1:+.0%})"
+            )
+    before_e2e = {(run["size"], run["mode"]): run for run in _e2e_runs(baseline)}
+    for new_e2e in _e2e_runs(current):
+        old_e2e = before_e2e.get((new_e2e["size"], new_e2e["mode"]))
+        if old_e2e is None:
+            continue
+        label = f"e2e {new_e2e['mode']}"
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            old, new = old_e2e[metric], new_e2e[metric]
+            if old and new > old * (1 + tolerance):
+                change = new / old - 1
+                regressions.append(f"{label} {metric}: {old:.1f} -> {new:.1f} ms ({change:+.0%})")
+        old, new = old_e2e["throughput_rps"], new_e2e["throughput_rps"]
+        if old and new < old * (1 - tolerance):
+            regressions.append(f"{label} throughput: {old:.2f} -> {new:.2f} req/s")
+    return regressions
+
+
+def _e2e_runs(results: dict[str, Any]) -> list[dict[str, Any]]:
+    """End-to-end runs of a results file; older files hold a single two-stage run."""
+    e2e = results.get("e2e") or []
+    runs = [e2e] if isinstance(e2e, dict) else e2e
+    defaults = {"mode": "two_stage", "llm_calls": 0.0}
+    defaults |= {"prompt_tokens": 0.0, "completion_tokens": 0.0}
+    defaults |= {"health_p50_ms": 0.0, "health_p99_ms": 0.0}
+    return [{**defaults, **run} for run in runs]
+
+
+def format_report(results: dict[str, Any]) -> str:
+    lines = [f"{'benchmark':<52} {'size':<6} {'items':>6} {'median ms':>10} {'min ms':>9}"]
+    for t in results["micro"]:
+        lines.append(
+            f"{t['name']:<52} {t['size']:<6} {t['items']:>6} "
+            f"{t['median_ms']:>10.3f} {t['min_ms']:>9.3f}"
+        )
+    runs = {run["mode"]: dict(run) for run in _e2e_runs(results)}
+    for e2e in runs.values():
+        lines += [
+            "",
+            f"/api/v1/summary?mode={e2e['mode']} [{e2e['size']}]: {e2e['requests']} requests, "
+            f"concurrency {e2e['concurrency']}, {e2e['errors']} errors",
+            f"  p50 {e2e['p50_ms']:.1f} ms  p95 {e2e['p95_ms']:.1f} ms  "
+            f"p99 {e2e['p99_ms']:.1f} ms  throughput {e2e['throughput_rps']:.2f} req/s",
+            f"  per summary: {e2e['llm_calls']:.1f} LLM calls, "
+            f"{e2e['prompt_tokens']:.0f} prompt + {e2e['completion_tokens']:.0f} completion tokens",
+            f"  /health during load: p50 {e2e['health_p50_ms']:.1f} ms  "
+            f"p99 {e2e['health_p99_ms']:.1f} ms",
+        ]
+    two_stage, fast = runs.get("two_stage"), runs.get("fast")
+    if two_stage and fast:
+
+        def change(metric: str) -> str:
+            return f"{fast[metric] / two_stage[metric] - 1:+.0%}" if two_stage[metric] else "n/a"
+
+        for run in (two_stage, fast):
+            run["tokens"] = run["prompt_tokens"] + run["completion_tokens"]
+        lines += [
+            "",
+            f"fast vs two_stage: p50 {change('p50_ms')}, p95 {change('p95_ms')}, "
+            f"throughput {change('throughput_rps')}, tokens {change('tokens')}",
+        ]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(SIZES), help="patient sizes to benchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per benchmark")
+    parser.add_argument("--skip-micro", action="store_true", help="only run end-to-end")
+    parser.add_argument("--skip-e2e", action="store_true", help="only run micro-benchmarks")
+    parser.add_argument("--e2e-size", default="small", choices=SIZES)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--modes", default="two_stage,fast", help="summary modes to load, one run each"
+    )
+    parser.add_argument("--url", help="benchmark a running API instead of local stand-ins")
+    parser.add_argument("--fhir-latency-ms", type=float, default=20.0)
+    parser.add_argument("--fhir-p99-ms", type=float, default=100.0)
+    parser.add_argument("--ttft-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)} (choose from {', '.join(SIZES)})")
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in {m.value for m in SummaryMode}]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+
+    results: dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_backend": fastjson.BACKEND,
+        },
+        "micro": [],
+        "e2e": [],
+    }
+    if not args.skip_micro:
+        results["micro"] = [asdict(t) for t in micro_benchmarks(sizes, args.min_time)]
+    if not args.skip_e2e:
+        results["e2e"] = [asdict(run) for run in end_to_end(args, modes)]
+
+    print(format_report(results))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.compare).read_text()), args.tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%}:")
+            print("\n".join(f"  {line}" for line in regressions))
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
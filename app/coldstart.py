@@ -0,0 +1,147 @@
+"""Cold-start profiling for the API process.
+
+Runs ``import app.main`` in fresh interpreters and reports where the time
+goes: import cost per top-level package, ``create_app()``, the lifespan
+startup, and the first response. Background import warm-up is disabled in
+the probe, since it runs after startup and would only add noise to the
+critical path being measured. With ``--budget-ms`` it exits non-zero
+when cold start exceeds the budget, for use as a regression check in CI::
+
+    python -m app.coldstart
+    python -m app.coldstart --budget-ms 1500 --json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from dataclasses import asdict, dataclass, field
+
+# Executed in a fresh interpreter with -X importtime
+_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+t2 = time.perf_counter()
+app.main.create_app()
+t3 = time.perf_counter()
+with TestClient(app.main.app) as client:
+    t4 = time.perf_counter()
+    status = client.get("/health").status_code
+    t5 = time.perf_counter()
+    print(json.dumps({
+        "import_ms": (t1 - t0) * 1000,
+        "create_app_ms": (t3 - t2) * 1000,
+        "startup_ms": (t4 - t3) * 1000,
+        "first_response_ms": (t5 - t4) * 1000,
+        "status": status,
+    }))
+"""
+
+
+@dataclass
+class ColdStartReport:
+    """Timings of one cold start, in milliseconds."""
+
+    import_ms: float
+    create_app_ms: float
+    startup_ms: float
+    first_response_ms: float
+    # Cumulative import time per top-level package, largest first
+    packages: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def cold_start_ms(self) -> float:
+        """Import (with the module-level create_app), lifespan startup and first response."""
+        return self.import_ms + self.startup_ms + self.first_response_ms
+
+
+def parse_importtime(stderr: str) -> dict[str, float]:
+    """Cumulative ``-X importtime`` cost per top-level package, in milliseconds."""
+    packages: dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        root = name.strip().split(".")[0]
+        packages[root] = max(packages.get(root, 0.0), int(cumulative) / 1000)
+    return dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+
+def profile_once() -> ColdStartReport:
+    """Measure one cold start in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1", "WARM_IMPORTS": "false"},
+    )
+    timings = next(
+        (line for line in reversed(result.stdout.splitlines()) if line.startswith("{")), None
+    )
+    if result.returncode != 0 or timings is None:
+        raise RuntimeError(f"Cold start probe failed:\n{result.stderr[-2000:]}")
+    data = json.loads(timings)
+    if data.pop("status") != 200:
+        raise RuntimeError("Cold start probe: /health did not return 200")
+    return ColdStartReport(**data, packages=parse_importtime(result.stderr))
+
+
+def profile(repeat: int = 3) -> ColdStartReport:
+    """Fastest of ``repeat`` cold starts, which is the least noisy estimate."""
+    return min((profile_once() for _ in range(repeat)), key=lambda r: r.cold_start_ms)
+
+
+def format_report(report: ColdStartReport, top: int) -> str:
+    lines = [
+        f"import app.main      {report.import_ms:9.1f} ms",
+        f"create_app()         {report.create_app_ms:9.1f} ms  (warm, included in import)",
+        f"lifespan startup     {report.startup_ms:9.1f} ms",
+        f"first response       {report.first_response_ms:9.1f} ms",
+        f"cold start           {report.cold_start_ms:9.1f} ms",
+        "",
+        "Import cost by package (cumulative):",
+    ]
+    for name, ms in list(report.packages.items())[:top]:
+        lines.append(f"  {name:<28} {ms:9.1f} ms")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, help="fail if cold start exceeds this")
+    parser.add_argument("--repeat", type=int, default=3, help="cold starts to run (fastest wins)")
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = profile(args.repeat)
+    over_budget = args.budget_ms is not None and report.cold_start_ms > args.budget_ms
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    **asdict(report),
+                    "packages": dict(list(report.packages.items())[: args.top]),
+                    "cold_start_ms": report.cold_start_ms,
+                    "budget_ms": args.budget_ms,
+                    "over_budget": over_budget,
+                },
+                indent=2,
+            )
+        )
+    else:
+        print(format_report(report, args.top))
+        if args.budget_ms is not None:
+            verdict = "OVER BUDGET" if over_budget else "within budget"
+            print(f"\nBudget {args.budget_ms:.0f} ms: {verdict}")
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
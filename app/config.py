@@ -10,12 +10,129 @@ class Settings(BaseSettings):
     fhir_base_url: str = "http://hapi.fhir.org/baseR4"
     fhir_timeout: int = 30
 
+    # FHIR Connection Pool Configuration
+    fhir_max_connections: int = 100
+    fhir_max_keepalive_connections: int = 20
+    fhir_keepalive_expiry: float = 30.0
+    fhir_max_connections_per_host: int = 20
+    fhir_http2: bool = False
+
+    # FHIR Search Pagination
+    fhir_page_size: int = 100
+    fhir_max_pages: int = 10
+    fhir_max_resources: int = 1000
+
+    # Send all patient queries as one FHIR batch Bundle (falls back to parallel GETs)
+    fhir_batch_mode: bool = False
+
+    # Request only the elements each resource handler reads (FHIR _elements)
+    fhir_project_elements: bool = True
+
+    # FHIR Response Cache
+    fhir_cache_enabled: bool = True
+    fhir_cache_max_bytes: int = 64 * 1024 * 1024
+    fhir_cache_ttl: int = 60
+    fhir_cache_ttls: dict[str, int] = {
+        "Patient": 3600,
+        "Condition": 600,
+        "MedicationRequest": 300,
+        "Observation": 60,
+        "AllergyIntolerance": 600,
+    }
+    # A cached search older than this is fetched again in full rather than
+    # revalidated: the _lastUpdated probe can't see resources that were deleted
+    fhir_cache_max_age: int = 3600
+
     # OpenAI Configuration
     openai_api_key: str = ""
     openai_model: str = "gpt-4o"
+    # OpenAI-compatible endpoint, e.g. the mock LLM (python -m app.mock llm); empty uses OpenAI
+    openai_base_url: str = ""
     llm_temperature: float = 0.3
     llm_max_tokens: int = 2000
 
+    # LLM Completion Cache
+    llm_cache_enabled: bool = True
+    llm_cache_max_bytes: int = 16 * 1024 * 1024
+    llm_cache_path: str = ""
+    llm_cache_disk_max_bytes: int = 256 * 1024 * 1024
+
+    # Process-wide LLM rate limiting: requests/tokens per minute (0 = no limit)
+    # and retries of 429/5xx responses with jittered exponential backoff
+    llm_rpm_limit: int = 0
+    llm_tpm_limit: int = 0
+    llm_max_retries: int = 4
+    llm_backoff_base: float = 0.5
+    llm_backoff_max: float = 30.0
+
+    # Section Scheduler Configuration
+    llm_section_concurrency: int = 5
+    llm_section_timeout: float = 60.0
+    llm_section_fallback: str = "Section summary unavailable."
+
+    # Render empty sections, and sections with at most this many rows, from a
+    # template instead of calling the LLM (sections not listed: only when empty)
+    section_templates: bool = True
+    section_template_max_rows: dict[str, int] = {"demographics": 1, "allergies": 3}
+
+    # "two_stage" (section calls, then a final call) or "fast" (one combined call);
+    # requests can override it with ?mode=. The fast call's output covers every section.
+    summary_mode: str = "two_stage"
+    llm_fast_max_tokens: int = 4000
+
+    # Token budget: total input tokens across section prompts (lowest-priority
+    # rows are trimmed to fit) and the output cap for each section summary
+    llm_prompt_token_budget: int = 24000
+    llm_section_max_tokens: int = 500
+    # "tiktoken" (falls back to the heuristic if unavailable) or "heuristic"
+    llm_tokenizer: str = "tiktoken"
+
+    # Compact observations to one row per test (latest value + trend stats) before prompting
+    observation_compaction: bool = True
+    observation_trend_window: int = 10
+
+    # Extraction and prompt rendering run inline below offload_min_items resources
+    # (or table rows), in a pool of offload_workers threads above it (0 = always
+    # inline), and prompt rendering in offload_process_workers processes from
+    # offload_process_min_items rows (0 workers = no process pool)
+    offload_workers: int = 4
+    offload_min_items: int = 500
+    offload_process_workers: int = 0
+    offload_process_min_items: int = 5000
+
+    # Event-loop lag sampling interval in seconds (0 disables); see /health/loop
+    loop_lag_interval: float = 0.1
+
+    # Batch Summary Jobs
+    batch_workers: int = 8
+    batch_fhir_concurrency: int = 8
+    batch_llm_concurrency: int = 4
+    batch_max_patients: int = 1000
+    batch_job_ttl: int = 3600
+
+    # FHIR Bulk Data ($export) ingestion; empty disables bulk jobs
+    bulk_data_dir: str = ""
+    bulk_poll_interval: float = 5.0
+    bulk_poll_timeout: float = 3600.0
+
+    # Startup: expose the MCP endpoint, and import heavy modules (openai) in the
+    # background after startup instead of on the first request that needs them
+    mcp_enabled: bool = True
+    # MCP tool calls run at agent priority and may queue behind interactive summaries
+    mcp_tool_timeout: float = 180.0
+    warm_imports: bool = True
+
+    # JSON backend: "auto" picks orjson, then msgspec, then the stdlib
+    json_backend: str = "auto"
+
+    # Include the per-stage timing breakdown in summary responses (/metrics is always on)
+    response_timings: bool = True
+
+    # Trace spans: "" (off), "console", "file" (JSON lines at tracing_file) or
+    # "package.module:factory" returning a custom app.tracing.SpanExporter
+    tracing_exporter: str = ""
+    tracing_file: str = "traces.jsonl"
+
     # Google ADK / Gemini Configuration
     google_api_key: str = ""
 
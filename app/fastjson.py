@@ -0,0 +1,53 @@
+"""JSON encoding and decoding through the fastest installed backend.
+
+orjson is preferred, then msgspec, then the standard library ``json``
+(install the fast ones with ``pip install -e ".[fastjson]"``). Set
+``JSON_BACKEND`` to force one. ``dumps`` always returns compact UTF-8 bytes,
+and ``loads`` accepts bytes or str.
+"""
+
+import json
+from collections.abc import Callable
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from app.config import get_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _select_backend(name: str) -> tuple[str, Callable[[bytes | str], Any], Callable[[Any], bytes]]:
+    if name in ("auto", "orjson") and orjson is not None:
+        return (
+            "orjson",
+            orjson.loads,
+            lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+        )
+    if name in ("auto", "msgspec") and msgspec is not None:
+        return "msgspec", msgspec.json.Decoder().decode, msgspec.json.Encoder().encode
+    if name not in ("auto", "json", "orjson", "msgspec"):
+        raise ValueError(f"Unknown JSON backend: {name}")
+    return "json", json.loads, _stdlib_dumps
+
+
+BACKEND, loads, dumps = _select_backend(get_settings().json_backend)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the selected backend; the app's default response class."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
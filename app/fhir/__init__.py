@@ -1,3 +1,5 @@
+from .cache import FHIRCache
 from .client import FHIRClient
+from .transport import FHIRTransport
 
-__all__ = ["FHIRClient"]
+__all__ = ["FHIRClient", "FHIRTransport", "FHIRCache"]
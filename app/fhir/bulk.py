@@ -0,0 +1,159 @@
+import asyncio
+import re
+from array import array
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app import fastjson
+from app.config import get_settings
+
+# Manifest output types become file names, so only plain resource type names are accepted
+RESOURCE_TYPE = re.compile(r"[A-Za-z]+")
+
+
+def patient_reference(resource: dict[str, Any]) -> str | None:
+    """Return the ID of the patient a resource belongs to."""
+    if resource.get("resourceType") == "Patient":
+        return resource.get("id")
+    for field_name in ("subject", "patient"):
+        reference = (resource.get(field_name) or {}).get("reference", "")
+        if reference.startswith("Patient/"):
+            return reference.split("/", 1)[1]
+        if "/Patient/" in reference:
+            return reference.rsplit("/Patient/", 1)[1]
+    return None
+
+
+class BulkDataIndex:
+    """Byte-offset index over FHIR Bulk Data ``$export`` NDJSON files.
+
+    Building the index streams every file line by line and records, for each
+    patient, the offsets of the lines that reference them. Resources are only
+    materialized when a patient is read, so a cohort can be processed one
+    patient at a time without ever holding a whole file in memory.
+    """
+
+    def __init__(self, files: list[Path], resource_types: list[str]):
+        self.files = files
+        self.resource_types = resource_types
+        # patient ID -> file index -> line offsets
+        self._offsets: dict[str, dict[int, array]] = {}
+        self._patients: set[str] = set()
+
+    @classmethod
+    def build(cls, directory: str | Path, resource_types: list[str]) -> "BulkDataIndex":
+        """Scan all ``*.ndjson`` files in ``directory`` and index them by patient."""
+        files = sorted(Path(directory).glob("*.ndjson"))
+        index = cls(files, resource_types)
+        wanted = set(resource_types)
+        for file_index, path in enumerate(files):
+            with path.open("rb") as f:
+                while True:
+                    offset = f.tell()
+                    line = f.readline()
+                    if not line:
+                        break
+                    if not line.strip():
+                        continue
+                    resource = fastjson.loads(line)
+                    if resource.get("resourceType") not in wanted:
+                        continue
+                    patient_id = patient_reference(resource)
+                    if patient_id is None:
+                        continue
+                    if resource["resourceType"] == "Patient":
+                        index._patients.add(patient_id)
+                    per_file = index._offsets.setdefault(patient_id, {})
+                    per_file.setdefault(file_index, array("Q")).append(offset)
+        return index
+
+    @property
+    def patient_ids(self) -> list[str]:
+        """IDs of patients that have a Patient resource in the export."""
+        return sorted(self._patients)
+
+    def read_patient(self, patient_id: str) -> dict[str, list[dict[str, Any]]]:
+        """Load one patient's resources, grouped by resource type."""
+        resources: dict[str, list[dict[str, Any]]] = {rt: [] for rt in self.resource_types}
+        for file_index, offsets in self._offsets.get(patient_id, {}).items():
+            with self.files[file_index].open("rb") as f:
+                for offset in offsets:
+                    f.seek(offset)
+                    resource = fastjson.loads(f.readline())
+                    resources[resource["resourceType"]].append(resource)
+        return resources
+
+
+class BulkExportClient:
+    """Kicks off a FHIR Bulk Data ``$export`` and downloads its NDJSON output."""
+
+    def __init__(self, http_client: httpx.AsyncClient, base_url: str | None = None):
+        settings = get_settings()
+        self.base_url = base_url or settings.fhir_base_url
+        self.poll_interval = settings.bulk_poll_interval
+        self.poll_timeout = settings.bulk_poll_timeout
+        self._client = http_client
+
+    async def export(
+        self,
+        directory: str | Path,
+        resource_types: list[str],
+        group_id: str | None = None,
+    ) -> Path:
+        """Run the kick-off/poll/download flow and return the output directory."""
+        status_url = await self.kick_off(resource_types, group_id)
+        manifest = await self.wait_for_manifest(status_url)
+        return await self.download(manifest, directory)
+
+    async def kick_off(self, resource_types: list[str], group_id: str | None = None) -> str:
+        """Start an export and return its status polling URL."""
+        path = f"/Group/{group_id}/$export" if group_id else "/Patient/$export"
+        response = await self._client.get(
+            f"{self.base_url.rstrip('/')}{path}",
+            params={"_type": ",".join(resource_types), "_outputFormat": "application/fhir+ndjson"},
+            headers={"Accept": "application/fhir+json", "Prefer": "respond-async"},
+        )
+        if response.status_code != 202:
+            response.raise_for_status()
+            raise RuntimeError(f"Bulk export kick-off returned {response.status_code}")
+        return response.headers["Content-Location"]
+
+    async def wait_for_manifest(self, status_url: str) -> dict[str, Any]:
+        """Poll the status URL until the export completes, honouring Retry-After."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.poll_timeout
+        while True:
+            response = await self._client.get(status_url, headers={"Accept": "application/json"})
+            if response.status_code == 200:
+                return fastjson.loads(response.content)
+            if response.status_code != 202:
+                response.raise_for_status()
+            if loop.time() > deadline:
+                raise TimeoutError(f"Bulk export not ready after {self.poll_timeout}s")
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else self.poll_interval
+            await asyncio.sleep(delay)
+
+    async def download(self, manifest: dict[str, Any], directory: str | Path) -> Path:
+        """Stream each output file listed in the manifest to ``directory``.
+
+        Raises ``ValueError`` if an output's ``type`` is not a resource type name.
+        """
+        outputs = manifest.get("output", [])
+        for output in outputs:
+            resource_type = output.get("type")
+            if not isinstance(resource_type, str) or not RESOURCE_TYPE.fullmatch(resource_type):
+                raise ValueError(f"Invalid output type in bulk export manifest: {resource_type!r}")
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        headers = {"Accept": "application/fhir+ndjson"}
+        for i, output in enumerate(outputs):
+            target = directory / f"{i}.{output['type']}.ndjson"
+            async with self._client.stream("GET", output["url"], headers=headers) as response:
+                response.raise_for_status()
+                with target.open("wb") as f:
+                    async for chunk in response.aiter_bytes():
+                        f.write(chunk)
+        return directory
@@ -0,0 +1,125 @@
+"""Decoding of FHIR Bundle envelopes.
+
+The client only needs a few parts of a Bundle: the entry resources, the
+entry responses of a batch, the ``next`` link, ``meta.lastUpdated``, ``type``
+and ``total``. With msgspec installed, response bodies are decoded straight
+into typed structs for just those parts. Everything else (``fullUrl``,
+``search``, other links, ``id``, the rest of ``meta``) is skipped without
+building Python objects for it. Without msgspec the body is decoded with
+the selected JSON backend and the same fields are picked out of the dict.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from app import fastjson
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+
+@dataclass
+class BundleEntry:
+    """One Bundle entry: its resource and, for batch responses, the response status."""
+
+    resource: dict[str, Any] | None = None
+    status: str = ""
+    etag: str | None = None
+
+
+@dataclass
+class Bundle:
+    """The parts of a FHIR Bundle the client reads."""
+
+    type: str = ""
+    total: int | None = None
+    next_url: str | None = None
+    last_updated: str | None = None
+    entries: list[BundleEntry] = field(default_factory=list)
+
+    @property
+    def resources(self) -> list[dict[str, Any]]:
+        return [entry.resource for entry in self.entries if entry.resource is not None]
+
+
+def bundle_from_dict(data: dict[str, Any]) -> Bundle:
+    """Envelope of an already-decoded Bundle (e.g. nested in a batch response)."""
+    next_url = None
+    for link in data.get("link", []):
+        if link.get("relation") == "next":
+            next_url = link.get("url")
+            break
+    entries = []
+    for entry in data.get("entry", []):
+        response = entry.get("response") or {}
+        entries.append(
+            BundleEntry(
+                resource=entry.get("resource"),
+                status=str(response.get("status", "")),
+                etag=response.get("etag"),
+            )
+        )
+    return Bundle(
+        type=data.get("type", ""),
+        total=data.get("total"),
+        next_url=next_url,
+        last_updated=(data.get("meta") or {}).get("lastUpdated"),
+        entries=entries,
+    )
+
+
+if msgspec is not None:
+
+    class _Link(msgspec.Struct):
+        relation: str = ""
+        url: str | None = None
+
+    class _Meta(msgspec.Struct):
+        lastUpdated: str | None = None
+
+    class _Response(msgspec.Struct):
+        status: str = ""
+        etag: str | None = None
+
+    class _Entry(msgspec.Struct):
+        resource: dict[str, Any] | None = None
+        response: _Response | None = None
+
+    class _Bundle(msgspec.Struct):
+        type: str = ""
+        total: int | None = None
+        meta: _Meta | None = None
+        link: list[_Link] = []
+        entry: list[_Entry] = []
+
+    _bundle_decoder = msgspec.json.Decoder(_Bundle)
+
+    def decode_bundle(content: bytes) -> Bundle:
+        """Decode a Bundle response body into its envelope."""
+        try:
+            raw = _bundle_decoder.decode(content)
+        except msgspec.ValidationError:
+            # Not shaped like the structs expect; take the generic path
+            return bundle_from_dict(fastjson.loads(content))
+        return Bundle(
+            type=raw.type,
+            total=raw.total,
+            next_url=next((link.url for link in raw.link if link.relation == "next"), None),
+            last_updated=raw.meta.lastUpdated if raw.meta else None,
+            entries=[
+                BundleEntry(
+                    resource=entry.resource,
+                    status=entry.response.status if entry.response else "",
+                    etag=entry.response.etag if entry.response else None,
+                )
+                for entry in raw.entry
+            ],
+        )
+
+else:
+
+    def decode_bundle(content: bytes) -> Bundle:
+        """Decode a Bundle response body into its envelope."""
+        return bundle_from_dict(fastjson.loads(content))
@@ -0,0 +1,154 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from app.config import get_settings
+
+CacheKey = tuple[str, str, str | None, tuple[tuple[str, str], ...]]
+
+
+@dataclass
+class CacheEntry:
+    """A cached FHIR read or collected search result."""
+
+    resource_type: str
+    value: Any
+    nbytes: int
+    expires_at: float
+    truncated: bool = False
+    etag: str | None = None
+    last_updated: str | None = None
+    stored_at: float = 0.0
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def age(self) -> float:
+        """Seconds since the entry was fetched (revalidation doesn't reset it)."""
+        return time.monotonic() - self.stored_at
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for the FHIR response cache."""
+
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    revalidated: int = 0
+    evictions: int = 0
+
+
+class FHIRCache:
+    """In-memory LRU cache for FHIR responses with per-resource-type TTLs.
+
+    Entries are keyed by base URL, resource type, resource ID and query params.
+    Once an entry's TTL expires it is kept for revalidation (ETag or
+    ``_lastUpdated``) rather than dropped, so an unchanged patient costs a 304
+    or an empty count query instead of a full download. A ``_lastUpdated``
+    probe misses deletions, so searches older than ``max_age`` are fetched
+    again in full. Entries are evicted least-recently-used first once
+    ``max_bytes`` is exceeded.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int | None = None,
+        ttls: dict[str, int] | None = None,
+        default_ttl: int | None = None,
+        max_age: int | None = None,
+    ):
+        settings = get_settings()
+        self.max_bytes = max_bytes or settings.fhir_cache_max_bytes
+        self.ttls = ttls if ttls is not None else settings.fhir_cache_ttls
+        self.default_ttl = default_ttl if default_ttl is not None else settings.fhir_cache_ttl
+        self.max_age = max_age if max_age is not None else settings.fhir_cache_max_age
+        self.stats = CacheStats()
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._nbytes = 0
+
+    @staticmethod
+    def make_key(
+        base_url: str,
+        resource_type: str,
+        resource_id: str | None = None,
+        params: dict[str, str] | None = None,
+    ) -> CacheKey:
+        return (base_url, resource_type, resource_id, tuple(sorted((params or {}).items())))
+
+    def ttl_for(self, resource_type: str) -> int:
+        return self.ttls.get(resource_type, self.default_ttl)
+
+    def get(self, key: CacheKey) -> CacheEntry | None:
+        """Return the entry for ``key`` (fresh or stale) and mark it recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if entry.is_fresh():
+            self.stats.hits += 1
+        else:
+            self.stats.stale += 1
+        return entry
+
+    def put(
+        self,
+        key: CacheKey,
+        resource_type: str,
+        value: Any,
+        nbytes: int,
+        truncated: bool = False,
+        etag: str | None = None,
+        last_updated: str | None = None,
+    ) -> None:
+        """Store a response, evicting least-recently-used entries over budget."""
+        if nbytes > self.max_bytes:
+            return
+        self.discard(key)
+        now = time.monotonic()
+        self._entries[key] = CacheEntry(
+            resource_type=resource_type,
+            value=value,
+            nbytes=nbytes,
+            expires_at=now + self.ttl_for(resource_type),
+            truncated=truncated,
+            etag=etag,
+            last_updated=last_updated,
+            stored_at=now,
+        )
+        self._nbytes += nbytes
+        while self._nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+            self.stats.evictions += 1
+
+    def refresh(self, key: CacheKey) -> None:
+        """Extend a stale entry's TTL after the server confirmed it is unchanged."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.expires_at = time.monotonic() + self.ttl_for(entry.resource_type)
+            self.stats.revalidated += 1
+
+    def discard(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry.nbytes
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._nbytes = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        """Cache size and hit/miss counters for health and metrics endpoints."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "stale": self.stats.stale,
+            "revalidated": self.stats.revalidated,
+            "evictions": self.stats.evictions,
+        }
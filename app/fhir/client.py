@@ -1,81 +1,414 @@
 import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import aclosing
+from dataclasses import dataclass, field
 from typing import Any
 
 import httpx
 
+from app import fastjson, metrics, tracing
 from app.config import get_settings
+from app.fhir.bundle import Bundle, BundleEntry, bundle_from_dict, decode_bundle
+from app.fhir.cache import CacheEntry, CacheKey, FHIRCache
+
+# Called with each search page's resources as it arrives, while the next page downloads
+PageCallback = Callable[[str, list[dict[str, Any]]], Awaitable[None]]
+
+# Batch POST statuses that mean the server doesn't do batch; other errors may be transient
+BATCH_REJECTED_STATUSES = frozenset({400, 404, 405, 415, 501})
+
+
+@dataclass
+class SearchPage:
+    """One page of a FHIR search result Bundle."""
+
+    resources: list[dict[str, Any]] = field(default_factory=list)
+    next_url: str | None = None
+    nbytes: int = 0
+    last_updated: str | None = None
+
+
+@dataclass
+class FetchStats:
+    """Requests, response bytes and wall time spent fetching one resource type."""
+
+    requests: int = 0
+    bytes: int = 0
+    ms: float = 0.0
 
 
 class FHIRClient:
-    """Async FHIR R4 client for querying resources from HAPI server."""
+    """Async FHIR R4 client for querying resources from HAPI server.
 
-    def __init__(self, base_url: str | None = None):
+    ``batch_unsupported`` holds base URLs that have rejected a batch Bundle,
+    which use parallel GETs instead; pass a shared set (the transport's) so
+    the rejection is remembered beyond this client.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        cache: FHIRCache | None = None,
+        batch_unsupported: set[str] | None = None,
+    ):
         settings = get_settings()
         self.base_url = base_url or settings.fhir_base_url
         self.timeout = settings.fhir_timeout
-        self._client: httpx.AsyncClient | None = None
+        self.page_size = settings.fhir_page_size
+        self.max_pages = settings.fhir_max_pages
+        self.max_resources = settings.fhir_max_resources
+        self.batch_mode = settings.fhir_batch_mode
+        self.project_elements = settings.fhir_project_elements
+        # Resource types whose search results were cut off by the page/resource budget
+        self.truncated: dict[str, bool] = {}
+        # Per resource type ("batch" for the batch POST itself) for this client's requests
+        self.fetch_stats: dict[str, FetchStats] = {}
+        self._client: httpx.AsyncClient | None = http_client
+        # A shared pooled client is owned by the app lifespan, not by this instance
+        self._owns_client = http_client is None
+        self.cache = cache
+        self.batch_unsupported = batch_unsupported if batch_unsupported is not None else set()
 
     async def __aenter__(self) -> "FHIRClient":
-        self._client = httpx.AsyncClient(
-            base_url=self.base_url,
-            timeout=self.timeout,
-            headers={"Accept": "application/fhir+json"},
-        )
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                headers={"Accept": "application/fhir+json"},
+            )
         return self
 
     async def __aexit__(self, *args) -> None:
-        if self._client:
+        if self._client and self._owns_client:
             await self._client.aclose()
 
+    def _record_response(self, resource_type: str, response: httpx.Response) -> None:
+        stats = self.fetch_stats.setdefault(resource_type, FetchStats())
+        stats.requests += 1
+        stats.bytes += len(response.content)
+        metrics.FHIR_REQUESTS.inc(resource_type=resource_type)
+        metrics.FHIR_RESPONSE_BYTES.inc(len(response.content), resource_type=resource_type)
+
+    def _record_fetch(self, resource_type: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self.fetch_stats.setdefault(resource_type, FetchStats()).ms += elapsed * 1000
+        metrics.FHIR_FETCH_SECONDS.observe(elapsed, resource_type=resource_type)
+
     async def get_resource(
-        self, resource_type: str, resource_id: str
+        self,
+        resource_type: str,
+        resource_id: str,
+        params: dict[str, str] | None = None,
     ) -> dict[str, Any] | None:
-        """Fetch a single resource by ID."""
+        """Fetch a single resource by ID.
+
+        With a cache attached, a fresh entry is returned directly and a stale
+        one is revalidated with ``If-None-Match``.
+        """
         if not self._client:
             raise RuntimeError("Client not initialized. Use async context manager.")
 
-        response = await self._client.get(f"/{resource_type}/{resource_id}")
-        if response.status_code == 404:
-            return None
-        response.raise_for_status()
-        return response.json()
+        key = FHIRCache.make_key(self.base_url, resource_type, resource_id, params)
+        entry = self.cache.get(key) if self.cache else None
+        if entry and entry.is_fresh():
+            return entry.value
 
-    async def search_resources(
-        self, resource_type: str, params: dict[str, str]
-    ) -> list[dict[str, Any]]:
-        """Search for resources with given parameters."""
+        with tracing.span("fhir.read", resource_type=resource_type) as span:
+            headers = {"If-None-Match": entry.etag} if entry and entry.etag else None
+            response = await self._client.get(
+                f"/{resource_type}/{resource_id}", params=params, headers=headers
+            )
+            self._record_response(resource_type, response)
+            span.set(status_code=response.status_code, bytes=len(response.content))
+            if response.status_code == 304 and entry:
+                self.cache.refresh(key)
+                return entry.value
+            if response.status_code == 404:
+                if self.cache:
+                    self.cache.discard(key)
+                return None
+            response.raise_for_status()
+            resource = fastjson.loads(response.content)
+        if self.cache:
+            self.cache.put(
+                key,
+                resource_type,
+                resource,
+                nbytes=len(response.content),
+                etag=response.headers.get("ETag"),
+            )
+        return resource
+
+    async def iter_search_pages(
+        self,
+        resource_type: str,
+        params: dict[str, str],
+        max_pages: int | None = None,
+        first_bundle: dict[str, Any] | None = None,
+    ) -> AsyncIterator[SearchPage]:
+        """Yield search result pages, following Bundle ``link[rel=next]``.
+
+        The next page is requested as soon as the current one is parsed, so it
+        downloads while the caller is still working on the current page. If
+        ``first_bundle`` is given (e.g. from a batch response) it is used as the
+        first page instead of issuing the initial search request.
+        """
         if not self._client:
             raise RuntimeError("Client not initialized. Use async context manager.")
 
-        response = await self._client.get(
-            f"/{resource_type}",
-            params={**params, "_format": "json"},
-        )
-        response.raise_for_status()
-        bundle = response.json()
+        pending: asyncio.Future[httpx.Response] | None = None
+        # Only the cache needs the size of an already-parsed first page
+        nbytes = len(fastjson.dumps(first_bundle)) if first_bundle and self.cache else 0
+        if first_bundle is None:
+            pending = asyncio.ensure_future(
+                self._client.get(f"/{resource_type}", params={**params, "_format": "json"})
+            )
+        bundle: Bundle | None = bundle_from_dict(first_bundle) if first_bundle else None
+        pages = 0
+        try:
+            while bundle is not None or pending is not None:
+                if bundle is None:
+                    response = await pending
+                    pending = None
+                    self._record_response(resource_type, response)
+                    response.raise_for_status()
+                    nbytes = len(response.content)
+                    bundle = decode_bundle(response.content)
+                pages += 1
+
+                next_url = bundle.next_url
+                if next_url and (max_pages is None or pages < max_pages):
+                    pending = asyncio.ensure_future(self._client.get(next_url))
+
+                page = SearchPage(
+                    resources=bundle.resources,
+                    next_url=next_url,
+                    nbytes=nbytes,
+                    last_updated=bundle.last_updated,
+                )
+                bundle = None
+                yield page
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def search_resources(
+        self,
+        resource_type: str,
+        params: dict[str, str],
+        max_pages: int | None = 1,
+        max_resources: int | None = None,
+        on_page: PageCallback | None = None,
+    ) -> list[dict[str, Any]]:
+        """Search for resources with given parameters.
+
+        Follows next links up to ``max_pages`` pages (``None`` for all) and stops
+        once ``max_resources`` have been collected. Whether the budget cut off
+        any results is recorded in ``self.truncated[resource_type]``.
+        ``on_page`` is awaited with each fetched page (not with cached results).
+
+        With a cache attached, a fresh result is returned directly and a stale
+        one is revalidated with a ``_lastUpdated`` count query, until it is
+        older than the cache's ``max_age``.
+        """
+        with tracing.span("fhir.search", resource_type=resource_type) as span:
+            key = FHIRCache.make_key(self.base_url, resource_type, params=params)
+            entry = self.cache.get(key) if self.cache else None
+            if entry and (
+                entry.is_fresh() or await self._search_unchanged(resource_type, params, entry)
+            ):
+                if not entry.is_fresh():
+                    self.cache.refresh(key)
+                self.truncated[resource_type] = entry.truncated
+                span.set(cached=True, results=len(entry.value))
+                return entry.value
+
+            pages = self.iter_search_pages(resource_type, params, max_pages=max_pages)
+            results = await self._collect_pages(
+                resource_type, pages, max_resources, cache_key=key, on_page=on_page
+            )
+            span.set(cached=False, results=len(results))
+            return results
+
+    async def _search_unchanged(
+        self, resource_type: str, params: dict[str, str], entry: CacheEntry
+    ) -> bool:
+        """Check whether anything matching a cached search changed since it was fetched."""
+        if not entry.last_updated or entry.age() >= self.cache.max_age:
+            return False
+        probe = {k: v for k, v in params.items() if k not in ("_count", "_elements")}
+        try:
+            response = await self._client.get(
+                f"/{resource_type}",
+                params={
+                    **probe,
+                    "_lastUpdated": f"gt{entry.last_updated}",
+                    "_summary": "count",
+                    "_format": "json",
+                },
+            )
+            self._record_response(resource_type, response)
+            response.raise_for_status()
+            return decode_bundle(response.content).total == 0
+        except (httpx.HTTPError, ValueError):
+            return False
+
+    async def _collect_pages(
+        self,
+        resource_type: str,
+        pages: AsyncIterator[SearchPage],
+        max_resources: int | None,
+        cache_key: CacheKey | None = None,
+        on_page: PageCallback | None = None,
+    ) -> list[dict[str, Any]]:
+        """Drain search pages into a list, enforcing the resource budget.
+
+        ``on_page`` gets the part of each page that fits the budget; the next
+        page is already requested by then, so the two overlap.
+        """
+        results: list[dict[str, Any]] = []
+        truncated = False
+        nbytes = 0
+        last_updated: str | None = None
+
+        async with aclosing(pages):
+            async for page in pages:
+                kept = page.resources
+                if max_resources is not None:
+                    kept = kept[: max_resources - len(results)]
+                results.extend(kept)
+                nbytes += page.nbytes
+                last_updated = last_updated or page.last_updated
+                truncated = page.next_url is not None
+                if on_page is not None and kept:
+                    await on_page(resource_type, kept)
+                if max_resources is not None and len(results) >= max_resources:
+                    truncated = truncated or len(kept) < len(page.resources)
+                    break
 
-        # Extract resources from FHIR Bundle
-        entries = bundle.get("entry", [])
-        return [entry["resource"] for entry in entries if "resource" in entry]
+        self.truncated[resource_type] = truncated
+        if self.cache and cache_key is not None:
+            self.cache.put(
+                cache_key,
+                resource_type,
+                results,
+                nbytes=nbytes,
+                truncated=truncated,
+                last_updated=last_updated,
+            )
+        return results
 
     async def get_patient_resources(
-        self, patient_id: str, resource_types: list[str]
+        self,
+        patient_id: str,
+        resource_types: list[str],
+        elements: dict[str, tuple[str, ...]] | None = None,
+        on_page: PageCallback | None = None,
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Fetch all resource types for a patient.
+
+        Uses a single FHIR ``batch`` Bundle when batch mode is enabled and the
+        server accepts it, otherwise one request per resource type in parallel.
+        ``elements`` maps resource types to the elements to request via
+        ``_elements``; types without an entry are fetched in full. ``on_page``
+        is awaited with each fetched search page (see ``_collect_pages``), so
+        callers can process pages while later ones download.
+        """
+        projection = self._projection_params(elements or {})
+        with tracing.span("fhir.get_patient_resources", patient_id=patient_id) as span:
+            if self.batch_mode and self.base_url not in self.batch_unsupported:
+                cached = self._fresh_from_cache(patient_id, resource_types, projection)
+                missing = [rt for rt in resource_types if rt not in cached]
+                output = (
+                    await self._fetch_batch(patient_id, missing, projection, on_page)
+                    if missing
+                    else {}
+                )
+                if output is not None:
+                    span.set(mode="batch")
+                    return {rt: cached.get(rt, output.get(rt, [])) for rt in resource_types}
+
+            span.set(mode="parallel")
+            return await self._fetch_parallel(patient_id, resource_types, projection, on_page)
+
+    def _patient_cache_key(
+        self, patient_id: str, res_type: str, projection: dict[str, dict[str, str]]
+    ) -> CacheKey:
+        if res_type == "Patient":
+            return FHIRCache.make_key(self.base_url, res_type, patient_id, projection.get(res_type))
+        params = self._patient_search_params(patient_id, projection.get(res_type))
+        return FHIRCache.make_key(self.base_url, res_type, params=params)
+
+    def _fresh_from_cache(
+        self,
+        patient_id: str,
+        resource_types: list[str],
+        projection: dict[str, dict[str, str]],
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Return resource types that can be served from the cache without a request."""
+        if not self.cache:
+            return {}
+        fresh: dict[str, list[dict[str, Any]]] = {}
+        for res_type in resource_types:
+            entry = self.cache.get(self._patient_cache_key(patient_id, res_type, projection))
+            if entry is None or not entry.is_fresh():
+                continue
+            if res_type == "Patient":
+                fresh[res_type] = [entry.value]
+            else:
+                fresh[res_type] = entry.value
+                self.truncated[res_type] = entry.truncated
+        return fresh
+
+    def _projection_params(
+        self, elements: dict[str, tuple[str, ...]]
+    ) -> dict[str, dict[str, str]]:
+        """Build per-type ``_elements`` query params, if projection is enabled."""
+        if not self.project_elements:
+            return {}
+        return {
+            res_type: {"_elements": ",".join(names)}
+            for res_type, names in elements.items()
+            if names
+        }
+
+    def _patient_search_params(
+        self, patient_id: str, projection: dict[str, str] | None = None
+    ) -> dict[str, str]:
+        return {"patient": patient_id, "_count": str(self.page_size), **(projection or {})}
+
+    async def _fetch_parallel(
+        self,
+        patient_id: str,
+        resource_types: list[str],
+        projection: dict[str, dict[str, str]],
+        on_page: PageCallback | None = None,
     ) -> dict[str, list[dict[str, Any]]]:
         """Fetch all resource types for a patient in parallel."""
 
         async def fetch_resource_type(res_type: str) -> tuple[str, list[dict[str, Any]]]:
+            started = time.perf_counter()
             try:
                 if res_type == "Patient":
-                    result = await self.get_resource("Patient", patient_id)
+                    result = await self.get_resource(
+                        "Patient", patient_id, params=projection.get(res_type)
+                    )
                     return (res_type, [result] if result else [])
                 else:
                     results = await self.search_resources(
                         res_type,
-                        {"patient": patient_id, "_count": "100"},
+                        self._patient_search_params(patient_id, projection.get(res_type)),
+                        max_pages=self.max_pages,
+                        max_resources=self.max_resources,
+                        on_page=on_page,
                     )
                     return (res_type, results)
             except httpx.HTTPStatusError:
                 return (res_type, [])
+            finally:
+                self._record_fetch(res_type, started)
 
         # Execute all queries in parallel
         tasks = [fetch_resource_type(rt) for rt in resource_types]
@@ -90,3 +423,99 @@ class FHIRClient:
             output[res_type] = resources
 
         return output
+
+    async def _fetch_batch(
+        self,
+        patient_id: str,
+        resource_types: list[str],
+        projection: dict[str, dict[str, str]],
+        on_page: PageCallback | None = None,
+    ) -> dict[str, list[dict[str, Any]]] | None:
+        """Fetch all resource types in one ``batch`` Bundle POST.
+
+        Returns ``None`` if the batch failed so the caller can fall back to
+        parallel GETs. Only a real rejection (see ``BATCH_REJECTED_STATUSES``,
+        or a reply that isn't a ``batch-response`` Bundle) marks the server as
+        batch-unsupported; timeouts and other errors fall back for this call only.
+        """
+        if not self._client:
+            raise RuntimeError("Client not initialized. Use async context manager.")
+
+        entries = []
+        for res_type in resource_types:
+            if res_type == "Patient":
+                url = str(httpx.URL(f"Patient/{patient_id}", params=projection.get(res_type)))
+            else:
+                params = self._patient_search_params(patient_id, projection.get(res_type))
+                url = str(httpx.URL(res_type, params=params))
+            entries.append({"request": {"method": "GET", "url": url}})
+
+        batch = {"resourceType": "Bundle", "type": "batch", "entry": entries}
+        started = time.perf_counter()
+        try:
+            with tracing.span("fhir.batch", entries=len(entries)) as span:
+                response = await self._client.post(
+                    "/",
+                    content=fastjson.dumps(batch),
+                    headers={"Content-Type": "application/fhir+json"},
+                )
+                span.set(status_code=response.status_code, bytes=len(response.content))
+        except httpx.HTTPError:
+            return None
+        self._record_response("batch", response)
+        self._record_fetch("batch", started)
+        if response.status_code >= 400:
+            if response.status_code in BATCH_REJECTED_STATUSES:
+                self.batch_unsupported.add(self.base_url)
+            return None
+        try:
+            bundle = decode_bundle(response.content)
+            accepted = bundle.type == "batch-response" and len(bundle.entries) == len(entries)
+        except ValueError:
+            accepted = False
+        if not accepted:
+            # Don't pay for a rejected batch again on this server
+            self.batch_unsupported.add(self.base_url)
+            return None
+
+        async def split_entry(
+            res_type: str, entry: BundleEntry
+        ) -> tuple[str, list[dict[str, Any]]]:
+            resource = entry.resource
+            if not entry.status.startswith("2") or resource is None:
+                return (res_type, [])
+            started = time.perf_counter()
+            cache_key = self._patient_cache_key(patient_id, res_type, projection)
+            if res_type == "Patient":
+                if self.cache:
+                    self.cache.put(
+                        cache_key,
+                        res_type,
+                        resource,
+                        nbytes=len(fastjson.dumps(resource)),
+                        etag=entry.etag,
+                    )
+                return (res_type, [resource])
+            try:
+                with tracing.span("fhir.search", resource_type=res_type, batch=True) as span:
+                    pages = self.iter_search_pages(
+                        res_type,
+                        self._patient_search_params(patient_id, projection.get(res_type)),
+                        max_pages=self.max_pages,
+                        first_bundle=resource,
+                    )
+                    results = await self._collect_pages(
+                        res_type, pages, self.max_resources, cache_key=cache_key, on_page=on_page
+                    )
+                    span.set(results=len(results))
+                return (res_type, results)
+            except httpx.HTTPStatusError:
+                return (res_type, [])
+            finally:
+                # Only the pages after the first one, which came in the batch response
+                self._record_fetch(res_type, started)
+
+        results = await asyncio.gather(
+            *(split_entry(rt, entry) for rt, entry in zip(resource_types, bundle.entries))
+        )
+        return dict(results)
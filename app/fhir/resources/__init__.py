@@ -4,6 +4,7 @@ from .condition import ConditionHandler
 from .medication_request import MedicationRequestHandler
 from .observation import ObservationHandler
 from .patient import PatientHandler
+from .records import RecordTable
 
 __all__ = [
     "BaseResourceHandler",
@@ -12,4 +13,5 @@ __all__ = [
     "MedicationRequestHandler",
     "ObservationHandler",
     "AllergyHandler",
+    "RecordTable",
 ]
@@ -1,54 +1,55 @@
-from abc import ABC, abstractmethod
+from abc import ABC
 from typing import Any
 
-import pandas as pd
+from .plan import ExtractionPlan, FieldSpec, codeable_concept, reference_display, safe_get
+from .records import RecordTable
 
 
 class BaseResourceHandler(ABC):
-    """Abstract base class for FHIR resource handlers."""
+    """Abstract base class for FHIR resource handlers.
+
+    Handlers declare their output columns as ``fields``, a mapping of column
+    name to field spec (see ``plan``), which is compiled once per class into
+    an ExtractionPlan. Handlers with logic a spec cannot express may instead
+    override ``extract_fields``.
+    """
 
     resource_type: str = ""
+    # Top-level FHIR elements read by extract_fields, sent as ``_elements``
+    elements: tuple[str, ...] = ()
+    fields: dict[str, FieldSpec] = {}
+    plan: ExtractionPlan | None = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "fields" in cls.__dict__:
+            cls.plan = ExtractionPlan(cls.fields)
 
-    @abstractmethod
     def extract_fields(self, resource: dict[str, Any]) -> dict[str, Any]:
         """Extract relevant clinical fields from a FHIR resource."""
-        pass
+        if self.plan is None:
+            raise NotImplementedError(f"{type(self).__name__} declares no fields")
+        return self.plan.extract(resource)
 
-    def to_dataframe(self, resources: list[dict[str, Any]]) -> pd.DataFrame:
-        """Convert list of resources to pandas DataFrame."""
-        if not resources:
-            return pd.DataFrame()
+    def to_records(self, resources: list[dict[str, Any]]) -> RecordTable:
+        """Convert list of resources to a RecordTable."""
+        overridden = type(self).extract_fields is not BaseResourceHandler.extract_fields
+        if self.plan is not None and not overridden:
+            return self.plan.extract_table(resources)
+        return RecordTable.from_dicts(self.extract_fields(r) for r in resources)
 
-        extracted = [self.extract_fields(r) for r in resources]
-        return pd.DataFrame(extracted)
+    def to_dataframe(self, resources: list[dict[str, Any]]):
+        """Convert list of resources to pandas DataFrame (requires pandas)."""
+        return self.to_records(resources).to_pandas()
 
     def _safe_get(self, data: dict | None, *keys, default: Any = None) -> Any:
         """Safely navigate nested dictionary."""
-        if data is None:
-            return default
-        for key in keys:
-            if isinstance(data, dict):
-                data = data.get(key, default)
-            elif isinstance(data, list) and isinstance(key, int):
-                data = data[key] if len(data) > key else default
-            else:
-                return default
-            if data is None:
-                return default
-        return data
+        return safe_get(data, *keys, default=default)
 
     def _extract_codeable_concept(self, cc: dict | None) -> str:
         """Extract display text from CodeableConcept."""
-        if not cc:
-            return ""
-        # Try coding display first, then text
-        if "coding" in cc and cc["coding"]:
-            coding = cc["coding"][0]
-            return coding.get("display") or coding.get("code", "")
-        return cc.get("text", "")
+        return codeable_concept(cc)
 
     def _extract_reference_display(self, ref: dict | None) -> str:
         """Extract display from Reference."""
-        if not ref:
-            return ""
-        return ref.get("display", ref.get("reference", ""))
+        return reference_display(ref)
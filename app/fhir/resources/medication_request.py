@@ -1,80 +1,64 @@
-from typing import Any
-
 from .base import BaseResourceHandler
+from .plan import choice, codeable, codeable_concept, first, reference_display, value
 
 
-class MedicationRequestHandler(BaseResourceHandler):
-    """Handler for FHIR MedicationRequest resource."""
-
-    resource_type = "MedicationRequest"
-
-    def extract_fields(self, resource: dict[str, Any]) -> dict[str, Any]:
-        dosage = self._extract_dosage(resource)
-        return {
-            "medication_id": resource.get("id", ""),
-            "medication_name": self._extract_medication(resource),
-            "status": resource.get("status", ""),
-            "intent": resource.get("intent", ""),
-            "dosage_text": dosage.get("text", ""),
-            "dose_value": dosage.get("dose_value", ""),
-            "dose_unit": dosage.get("dose_unit", ""),
-            "frequency": dosage.get("frequency", ""),
-            "route": dosage.get("route", ""),
-            "prescribed_date": resource.get("authoredOn", ""),
-            "reason": self._extract_codeable_concept(
-                self._safe_get(resource, "reasonCode", 0)
-            ),
-        }
-
-    def _extract_medication(self, resource: dict) -> str:
-        """Extract medication name from medicationCodeableConcept or reference."""
-        if "medicationCodeableConcept" in resource:
-            return self._extract_codeable_concept(resource["medicationCodeableConcept"])
-        if "medicationReference" in resource:
-            return self._extract_reference_display(resource["medicationReference"])
+def _dose_value(dosage: dict) -> str:
+    dose_and_rate = dosage.get("doseAndRate", [])
+    if not dose_and_rate:
         return ""
+    return str(dose_and_rate[0].get("doseQuantity", {}).get("value", ""))
 
-    def _extract_dosage(self, resource: dict) -> dict[str, str]:
-        """Extract dosage information."""
-        result = {
-            "text": "",
-            "dose_value": "",
-            "dose_unit": "",
-            "frequency": "",
-            "route": "",
-        }
 
-        dosage_instructions = resource.get("dosageInstruction", [])
-        if not dosage_instructions:
-            return result
-
-        dosage = dosage_instructions[0]
+def _dose_unit(dosage: dict) -> str:
+    dose_and_rate = dosage.get("doseAndRate", [])
+    if not dose_and_rate:
+        return ""
+    return dose_and_rate[0].get("doseQuantity", {}).get("unit", "")
 
-        # Text instruction
-        result["text"] = dosage.get("text", "")
 
-        # Dose quantity
-        dose_and_rate = dosage.get("doseAndRate", [])
-        if dose_and_rate:
-            dose_qty = dose_and_rate[0].get("doseQuantity", {})
-            result["dose_value"] = str(dose_qty.get("value", ""))
-            result["dose_unit"] = dose_qty.get("unit", "")
+def _frequency(dosage: dict) -> str:
+    """Frequency from the timing code, falling back to timing.repeat."""
+    timing = dosage.get("timing", {})
+    if not timing:
+        return ""
+    frequency = codeable_concept(timing.get("code", {}))
+    if not frequency:
+        repeat = timing.get("repeat", {})
+        freq = repeat.get("frequency")
+        period = repeat.get("period")
+        period_unit = repeat.get("periodUnit")
+        if freq and period:
+            frequency = f"{freq}x per {period} {period_unit}"
+    return frequency
 
-        # Frequency/timing
-        timing = dosage.get("timing", {})
-        if timing:
-            timing_code = timing.get("code", {})
-            result["frequency"] = self._extract_codeable_concept(timing_code)
-            if not result["frequency"]:
-                # Try to extract from repeat
-                repeat = timing.get("repeat", {})
-                freq = repeat.get("frequency")
-                period = repeat.get("period")
-                period_unit = repeat.get("periodUnit")
-                if freq and period:
-                    result["frequency"] = f"{freq}x per {period} {period_unit}"
 
-        # Route
-        result["route"] = self._extract_codeable_concept(dosage.get("route"))
+class MedicationRequestHandler(BaseResourceHandler):
+    """Handler for FHIR MedicationRequest resource."""
 
-        return result
+    resource_type = "MedicationRequest"
+    elements = (
+        "medication",
+        "status",
+        "intent",
+        "dosageInstruction",
+        "authoredOn",
+        "reasonCode",
+    )
+    fields = {
+        "medication_id": value("id"),
+        "medication_name": choice(
+            "medication",
+            CodeableConcept=codeable_concept,
+            Reference=reference_display,
+        ),
+        "status": value("status"),
+        "intent": value("intent"),
+        # Dosage columns all come from the first dosage instruction
+        "dosage_text": first("dosageInstruction", lambda dosage: dosage.get("text", "")),
+        "dose_value": first("dosageInstruction", _dose_value),
+        "dose_unit": first("dosageInstruction", _dose_unit),
+        "frequency": first("dosageInstruction", _frequency),
+        "route": first("dosageInstruction", lambda dosage: codeable_concept(dosage.get("route"))),
+        "prescribed_date": value("authoredOn"),
+        "reason": codeable("reasonCode", 0),
+    }
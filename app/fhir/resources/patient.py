@@ -1,97 +1,99 @@
 from datetime import date
-from typing import Any
 
 from .base import BaseResourceHandler
+from .plan import codeable, codeable_concept, compute, value
 
 
-class PatientHandler(BaseResourceHandler):
-    """Handler for FHIR Patient resource."""
+def _name(resource: dict) -> str:
+    """Formatted name, preferring the official one."""
+    names = resource.get("name", [])
+    if not names:
+        return ""
 
-    resource_type = "Patient"
+    name = next((n for n in names if n.get("use") == "official"), names[0])
+
+    given = " ".join(name.get("given", []))
+    family = name.get("family", "")
+    return f"{given} {family}".strip()
+
+
+def _age(resource: dict) -> int | None:
+    """Age in years from birthDate."""
+    birth_date = resource.get("birthDate")
+    if not birth_date:
+        return None
+    try:
+        birth = date.fromisoformat(birth_date)
+        today = date.today()
+        age = today.year - birth.year
+        if (today.month, today.day) < (birth.month, birth.day):
+            age -= 1
+        return age
+    except ValueError:
+        return None
+
+
+def _address(resource: dict) -> str:
+    """Formatted first address."""
+    addresses = resource.get("address", [])
+    if not addresses:
+        return ""
+
+    addr = addresses[0]
+    parts = []
+    if addr.get("line"):
+        parts.extend(addr["line"])
+    for part in ("city", "state", "postalCode", "country"):
+        if addr.get(part):
+            parts.append(addr[part])
+
+    return ", ".join(parts)
 
-    def extract_fields(self, resource: dict[str, Any]) -> dict[str, Any]:
-        return {
-            "patient_id": resource.get("id", ""),
-            "full_name": self._extract_name(resource),
-            "birth_date": resource.get("birthDate", ""),
-            "age": self._calculate_age(resource.get("birthDate")),
-            "gender": resource.get("gender", ""),
-            "address": self._extract_address(resource),
-            "phone": self._extract_telecom(resource, "phone"),
-            "email": self._extract_telecom(resource, "email"),
-            "language": self._extract_language(resource),
-            "marital_status": self._extract_codeable_concept(
-                resource.get("maritalStatus")
-            ),
-        }
-
-    def _extract_name(self, resource: dict) -> str:
-        """Extract formatted name from Patient."""
-        names = resource.get("name", [])
-        if not names:
-            return ""
-
-        # Prefer official name, otherwise use first
-        name = next((n for n in names if n.get("use") == "official"), names[0])
-
-        given = " ".join(name.get("given", []))
-        family = name.get("family", "")
-        return f"{given} {family}".strip()
-
-    def _calculate_age(self, birth_date: str | None) -> int | None:
-        """Calculate age from birth date."""
-        if not birth_date:
-            return None
-        try:
-            birth = date.fromisoformat(birth_date)
-            today = date.today()
-            age = today.year - birth.year
-            if (today.month, today.day) < (birth.month, birth.day):
-                age -= 1
-            return age
-        except ValueError:
-            return None
-
-    def _extract_address(self, resource: dict) -> str:
-        """Extract formatted address."""
-        addresses = resource.get("address", [])
-        if not addresses:
-            return ""
-
-        addr = addresses[0]
-        parts = []
-        if addr.get("line"):
-            parts.extend(addr["line"])
-        if addr.get("city"):
-            parts.append(addr["city"])
-        if addr.get("state"):
-            parts.append(addr["state"])
-        if addr.get("postalCode"):
-            parts.append(addr["postalCode"])
-        if addr.get("country"):
-            parts.append(addr["country"])
-
-        return ", ".join(parts)
-
-    def _extract_telecom(self, resource: dict, system: str) -> str:
-        """Extract telecom value by system (phone, email)."""
-        telecoms = resource.get("telecom", [])
-        for telecom in telecoms:
+
+def _telecom(system: str):
+    """Accessor for the first telecom value of ``system`` (phone, email)."""
+
+    def accessor(resource: dict) -> str:
+        for telecom in resource.get("telecom", []):
             if telecom.get("system") == system:
                 return telecom.get("value", "")
         return ""
 
-    def _extract_language(self, resource: dict) -> str:
-        """Extract preferred language."""
-        communications = resource.get("communication", [])
-        if not communications:
-            return ""
-
-        # Prefer preferred language
-        comm = next(
-            (c for c in communications if c.get("preferred")),
-            communications[0] if communications else None,
-        )
-        if comm:
-            return self._extract_codeable_concept(comm.get("language"))
+    return accessor
+
+
+def _language(resource: dict) -> str:
+    """Preferred language, otherwise the first listed."""
+    communications = resource.get("communication", [])
+    if not communications:
         return ""
+
+    comm = next((c for c in communications if c.get("preferred")), communications[0])
+    return codeable_concept(comm.get("language"))
+
+
+class PatientHandler(BaseResourceHandler):
+    """Handler for FHIR Patient resource."""
+
+    resource_type = "Patient"
+    elements = (
+        "name",
+        "birthDate",
+        "gender",
+        "address",
+        "telecom",
+        "communication",
+        "maritalStatus",
+    )
+    fields = {
+        "patient_id": value("id"),
+        "full_name": compute(_name),
+        "birth_date": value("birthDate"),
+        "age": compute(_age),
+        "gender": value("gender"),
+        "address": compute(_address),
+        "phone": compute(_telecom("phone")),
+        "email": compute(_telecom("email")),
+        "language": compute(_language),
+        "marital_status": codeable("maritalStatus"),
+    }
@@ -0,0 +1,240 @@
+"""Declarative field specs for resource handlers, compiled into extraction code.
+
+A handler lists its output columns as ``fields = {"column": spec, ...}``,
+built from the spec constructors below (``value``, ``path``, ``codeable``,
+``choice``, ``first``, ``compute``). ``ExtractionPlan`` compiles the specs
+once per handler class into two generated functions with every accessor
+inlined: one building a row dict, and one running column-wise over a whole
+resource list to produce RecordTable columns. The generated code follows
+the same lookup rules the hand-written handlers used, so output is
+identical.
+"""
+
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from .records import RecordTable
+
+Accessor = Callable[[dict[str, Any]], Any]
+
+
+def codeable_concept(cc: dict | None) -> str:
+    """Extract display text from CodeableConcept."""
+    if not cc:
+        return ""
+    # Try coding display first, then text
+    if "coding" in cc and cc["coding"]:
+        coding = cc["coding"][0]
+        return coding.get("display") or coding.get("code", "")
+    return cc.get("text", "")
+
+
+def reference_display(ref: dict | None) -> str:
+    """Extract display from Reference."""
+    if not ref:
+        return ""
+    return ref.get("display", ref.get("reference", ""))
+
+
+def safe_get(data: Any, *keys, default: Any = None) -> Any:
+    """Safely navigate nested dicts and lists."""
+    if data is None:
+        return default
+    for key in keys:
+        if isinstance(data, dict):
+            data = data.get(key, default)
+        elif isinstance(data, list) and isinstance(key, int):
+            data = data[key] if len(data) > key else default
+        else:
+            return default
+        if data is None:
+            return default
+    return data
+
+
+def get2(data: Any, key: str, subkey: str) -> Any:
+    """``safe_get(data, key, subkey)`` without the generic walk."""
+    if not isinstance(data, dict):
+        return None
+    found = data.get(key)
+    return found.get(subkey) if isinstance(found, dict) else None
+
+
+def identity(value: Any) -> Any:
+    return value
+
+
+class _Namespace:
+    """Globals for generated code: binds helpers and constants to unique names."""
+
+    def __init__(self):
+        self.scope: dict[str, Any] = {}
+        self._temps = 0
+
+    def bind(self, obj: Any) -> str:
+        if obj is None or isinstance(obj, (str, bool, int, float)):
+            return repr(obj)
+        name = f"_b{len(self.scope)}"
+        self.scope[name] = obj
+        return name
+
+    def temp(self) -> str:
+        self._temps += 1
+        return f"_t{self._temps}"
+
+
+class FieldSpec:
+    """One output column: how to read it from a resource bound to ``r``."""
+
+    def expression(self, ns: _Namespace, var: str) -> str:
+        raise NotImplementedError
+
+
+def _inline_codeable_concept(arg: str, ns: _Namespace) -> str:
+    cc, coding = ns.temp(), ns.temp()
+    return (
+        f'("" if not ({cc} := {arg}) else '
+        f'(({coding} := {cc}["coding"][0]).get("display") or {coding}.get("code", "")) '
+        f'if "coding" in {cc} and {cc}["coding"] else {cc}.get("text", ""))'
+    )
+
+
+def _apply(fmt: Callable[[Any], Any], arg: str, ns: _Namespace) -> str:
+    if fmt is identity:
+        return arg
+    if fmt is str:
+        return f"str({arg})"
+    if fmt is codeable_concept:
+        return _inline_codeable_concept(arg, ns)
+    return f"{ns.bind(fmt)}({arg})"
+
+
+class _Value(FieldSpec):
+    def __init__(self, key: str, default: Any):
+        self.key, self.default = key, default
+
+    def expression(self, ns, var):
+        return f"{var}.get({self.key!r}, {ns.bind(self.default)})"
+
+
+class _Path(FieldSpec):
+    def __init__(self, keys: tuple[str | int, ...], default: Any):
+        self.keys, self.default = keys, default
+
+    def expression(self, ns, var):
+        default = ns.bind(self.default)
+        if len(self.keys) == 1:
+            t = ns.temp()
+            return f"({default} if ({t} := {var}.get({self.keys[0]!r})) is None else {t})"
+        keys = ", ".join(repr(k) for k in self.keys)
+        return f"{ns.bind(safe_get)}({var}, {keys}, default={default})"
+
+
+class _Format(FieldSpec):
+    def __init__(self, inner: FieldSpec, fmt: Callable[[Any], Any]):
+        self.inner, self.fmt = inner, fmt
+
+    def expression(self, ns, var):
+        return _apply(self.fmt, self.inner.expression(ns, var), ns)
+
+
+class _Choice(FieldSpec):
+    def __init__(self, base: str, options: dict[str, Callable[[Any], Any]], default: Any):
+        self.base, self.options, self.default = base, options, default
+
+    def expression(self, ns, var):
+        expr = ns.bind(self.default)
+        for suffix, fmt in reversed(self.options.items()):
+            key = repr(f"{self.base}{suffix}")
+            expr = f"{_apply(fmt, f'{var}[{key}]', ns)} if {key} in {var} else {expr}"
+        return f"({expr})"
+
+
+class _First(FieldSpec):
+    def __init__(self, key: str, fmt: Callable[[Any], Any], default: Any):
+        self.key, self.fmt, self.default = key, fmt, default
+
+    def expression(self, ns, var):
+        t = ns.temp()
+        item = _apply(self.fmt, f"{t}[0]", ns)
+        return f"({item} if ({t} := {var}.get({self.key!r}, ())) else {ns.bind(self.default)})"
+
+
+class _Compute(FieldSpec):
+    def __init__(self, fn: Accessor):
+        self.fn = fn
+
+    def expression(self, ns, var):
+        return f"{ns.bind(self.fn)}({var})"
+
+
+def value(key: str, default: Any = "") -> FieldSpec:
+    """Top-level element, like ``resource.get(key, default)``."""
+    return _Value(key, default)
+
+
+def path(*keys: str | int, default: Any = None) -> FieldSpec:
+    """Nested element; any missing step (or ``None``) yields ``default``."""
+    return _Path(keys, default)
+
+
+def codeable(*keys: str | int) -> FieldSpec:
+    """CodeableConcept display text at ``keys``."""
+    return _Format(_Path(keys, None), codeable_concept)
+
+
+def choice(base: str, default: Any = "", **options: Callable[[Any], Any]) -> FieldSpec:
+    """Choice-type element ``base[x]``: the first present type wins, in declared order.
+
+    ``choice("onset", DateTime=identity, Period=...)`` checks ``onsetDateTime``,
+    then ``onsetPeriod``, formatting the found value with the matching function.
+    """
+    return _Choice(base, options, default)
+
+
+def first(key: str, fmt: Callable[[Any], Any], default: Any = "") -> FieldSpec:
+    """Format the first item of a repeating element, or ``default`` if it is empty."""
+    return _First(key, fmt, default)
+
+
+def compute(fn: Accessor) -> FieldSpec:
+    """Arbitrary per-resource function, for fields no spec constructor covers."""
+    return _Compute(fn)
+
+
+class ExtractionPlan:
+    """A handler's field specs, compiled into row and column extraction functions."""
+
+    __slots__ = ("columns", "source", "_extract", "_extract_columns")
+
+    def __init__(self, fields: dict[str, FieldSpec]):
+        self.columns = tuple(fields)
+        ns = _Namespace()
+        expressions = [spec.expression(ns, "r") for spec in fields.values()]
+
+        row = ", ".join(f"{name!r}: {expr}" for name, expr in zip(self.columns, expressions))
+        indices = range(len(expressions))
+        self.source = "\n".join(
+            [
+                "def extract(r):",
+                f"    return {{{row}}}",
+                "",
+                "def extract_columns(resources):",
+                *(f"    c{i} = []; a{i} = c{i}.append" for i in indices),
+                "    for r in resources:",
+                *(f"        a{i}({expr})" for i, expr in enumerate(expressions)),
+                f"    return [{', '.join(f'c{i}' for i in indices)}]",
+            ]
+        )
+        exec(compile(self.source, f"<extraction plan {', '.join(self.columns)}>", "exec"), ns.scope)
+        self._extract = ns.scope["extract"]
+        self._extract_columns = ns.scope["extract_columns"]
+
+    def extract(self, resource: dict[str, Any]) -> dict[str, Any]:
+        return self._extract(resource)
+
+    def extract_table(self, resources: Iterable[dict[str, Any]]) -> RecordTable:
+        resources = resources if isinstance(resources, list) else list(resources)
+        if not resources:
+            return RecordTable()
+        return RecordTable(self.columns, self._extract_columns(resources))
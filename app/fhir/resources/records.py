@@ -0,0 +1,99 @@
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+
+class RecordTable:
+    """Compact column-oriented table of extracted resource fields.
+
+    Rows share one column schema and values are stored one list per column,
+    which is all the summary pipeline needs (emptiness checks, markdown for
+    prompts, JSON records for the API) without building a pandas DataFrame
+    per resource type per request. ``to_pandas`` converts when pandas is
+    installed and a DataFrame is actually wanted.
+    """
+
+    __slots__ = ("columns", "_data")
+
+    def __init__(self, columns: Iterable[str] = (), data: list[list[Any]] | None = None):
+        self.columns: tuple[str, ...] = tuple(columns)
+        self._data: list[list[Any]] = data if data is not None else [[] for _ in self.columns]
+
+    @classmethod
+    def from_dicts(cls, records: Iterable[dict[str, Any]]) -> "RecordTable":
+        """Build a table from dicts that share the first record's keys."""
+        records = iter(records)
+        first = next(records, None)
+        if first is None:
+            return cls()
+        table = cls(first.keys())
+        table.append(first)
+        for record in records:
+            table.append(record)
+        return table
+
+    @classmethod
+    def concat(cls, tables: Iterable["RecordTable"]) -> "RecordTable":
+        """Stack tables that share one column schema; empty tables are skipped."""
+        tables = [table for table in tables if not table.empty]
+        if not tables:
+            return cls()
+        if len(tables) == 1:
+            return tables[0]
+        columns = zip(*(table._data for table in tables))
+        return cls(tables[0].columns, [[v for part in parts for v in part] for parts in columns])
+
+    def append(self, record: dict[str, Any]) -> None:
+        for name, values in zip(self.columns, self._data):
+            values.append(record.get(name))
+
+    def __len__(self) -> int:
+        return len(self._data[0]) if self._data else 0
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    def column(self, name: str) -> list[Any]:
+        return self._data[self.columns.index(name)]
+
+    def rows(self) -> Iterator[tuple[Any, ...]]:
+        return zip(*self._data)
+
+    def take(self, indices: Iterable[int]) -> "RecordTable":
+        """Return a new table with only the rows at ``indices``, in that order."""
+        indices = list(indices)
+        return RecordTable(self.columns, [[values[i] for i in indices] for values in self._data])
+
+    def to_dicts(self) -> list[dict[str, Any]]:
+        """Rows as JSON-ready dicts."""
+        return [dict(zip(self.columns, row)) for row in self.rows()]
+
+    def to_markdown(self) -> str:
+        """Render as a GitHub-flavoured markdown pipe table."""
+        return "\n".join(self.markdown_lines())
+
+    def markdown_lines(self) -> Iterator[str]:
+        """Markdown table lines: header, separator, then one line per row."""
+        if not self.columns:
+            return
+        yield "| " + " | ".join(self.columns) + " |"
+        yield "|" + "|".join("---" for _ in self.columns) + "|"
+        for row in self.rows():
+            yield "| " + " | ".join(_cell(value) for value in row) + " |"
+
+    def to_pandas(self):
+        """Convert to a pandas DataFrame (requires the ``pandas`` extra)."""
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError(
+                "pandas is required for to_pandas(); install with pip install -e '.[pandas]'"
+            ) from e
+        return pd.DataFrame(dict(zip(self.columns, self._data)))
+
+
+def _cell(value: Any) -> str:
+    """Format one value so it can't break the table layout."""
+    if value is None:
+        return ""
+    return str(value).replace("|", "\\|").replace("\n", " ")
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from app.config import get_settings
+
+
+@dataclass
+class PoolStats:
+    """Connection pool usage counters for the shared FHIR transport."""
+
+    requests_total: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    # Requests that found every slot taken (per-host limit, or the pool) and had to wait
+    saturated_total: int = 0
+    host_wait_ms_total: float = 0.0
+
+
+class _MeteredTransport(httpx.AsyncBaseTransport):
+    """Wraps the pooled transport with per-host limits and saturation counters."""
+
+    def __init__(
+        self,
+        transport: httpx.AsyncHTTPTransport,
+        max_connections: int,
+        max_connections_per_host: int | None,
+    ):
+        self._transport = transport
+        self._max_connections = max_connections
+        self._max_per_host = max_connections_per_host
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self.stats = PoolStats()
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore | None:
+        if not self._max_per_host:
+            return None
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self._max_per_host)
+        return self._host_semaphores[host]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self.stats
+        semaphore = self._host_semaphore(request.url.host)
+        # The per-host limit is normally the tighter one (there is one FHIR host)
+        if semaphore is not None and semaphore.locked():
+            stats.saturated_total += 1
+        elif stats.in_flight >= self._max_connections:
+            stats.saturated_total += 1
+        if semaphore is not None:
+            wait_start = time.perf_counter()
+            await semaphore.acquire()
+            stats.host_wait_ms_total += (time.perf_counter() - wait_start) * 1000
+
+        stats.requests_total += 1
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        try:
+            response = await self._transport.handle_async_request(request)
+            # Body is read by the caller; keep the slot until then
+            response.stream = _ReleasingStream(response.stream, self._release, semaphore)
+            return response
+        except BaseException:
+            self._release(semaphore)
+            raise
+
+    def _release(self, semaphore: asyncio.Semaphore | None) -> None:
+        self.stats.in_flight -= 1
+        if semaphore is not None:
+            semaphore.release()
+
+    def pool_connections(self) -> tuple[int, int]:
+        """Return (open, idle) connection counts from the underlying pool."""
+        pool = getattr(self._transport, "_pool", None)
+        connections = getattr(pool, "connections", [])
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return len(connections), idle
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response stream that releases its pool slot exactly once when closed."""
+
+    def __init__(self, stream: Any, release, semaphore: asyncio.Semaphore | None):
+        self._stream = stream
+        self._release = release
+        self._semaphore = semaphore
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release(self._semaphore)
+
+
+class FHIRTransport:
+    """Process-wide pooled HTTP client for the FHIR server.
+
+    Created once in the application lifespan and shared by every request so
+    DNS, TCP and TLS setup is paid once per connection rather than once per
+    summary.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        timeout: float | None = None,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        keepalive_expiry: float | None = None,
+        max_connections_per_host: int | None = None,
+        http2: bool | None = None,
+    ):
+        settings = get_settings()
+        self.base_url = base_url or settings.fhir_base_url
+        self.max_connections = max_connections or settings.fhir_max_connections
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=(
+                max_keepalive_connections or settings.fhir_max_keepalive_connections
+            ),
+            keepalive_expiry=keepalive_expiry or settings.fhir_keepalive_expiry,
+        )
+        self.http2 = settings.fhir_http2 if http2 is None else http2
+        self._transport = _MeteredTransport(
+            httpx.AsyncHTTPTransport(limits=limits, http2=self.http2),
+            max_connections=self.max_connections,
+            max_connections_per_host=(
+                max_connections_per_host or settings.fhir_max_connections_per_host
+            ),
+        )
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout or settings.fhir_timeout,
+            headers={"Accept": "application/fhir+json"},
+            transport=self._transport,
+        )
+        # Base URLs that rejected a batch Bundle, shared by every FHIRClient on this pool
+        self.batch_unsupported: set[str] = set()
+
+    def stats(self) -> dict[str, Any]:
+        """Snapshot of pool usage for health and metrics endpoints."""
+        open_connections, idle_connections = self._transport.pool_connections()
+        stats = self._transport.stats
+        return {
+            "max_connections": self.max_connections,
+            "http2": self.http2,
+            "open_connections": open_connections,
+            "idle_connections": idle_connections,
+            "in_flight": stats.in_flight,
+            "peak_in_flight": stats.peak_in_flight,
+            "requests_total": stats.requests_total,
+            "saturated_total": stats.saturated_total,
+            "host_wait_ms_total": round(stats.host_wait_ms_total, 1),
+        }
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
@@ -1,3 +1,5 @@
+from .cache import LLMCache
 from .client import LLMClient
+from .ratelimit import LLMRateLimiter, Priority
 
-__all__ = ["LLMClient"]
+__all__ = ["LLMClient", "LLMCache", "LLMRateLimiter", "Priority"]
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from app.config import get_settings
+
+
+@dataclass
+class LLMCacheStats:
+    """Hit/miss counters for the LLM completion cache."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+
+class _DiskTier:
+    """SQLite-backed cache tier with least-recently-used size-based eviction.
+
+    Called from ``asyncio.to_thread`` workers, so the shared connection is
+    only used under ``_lock``. Hit timestamps are buffered and written in
+    batches of ``flush_every`` (and before any eviction) rather than
+    committed on every read.
+    """
+
+    def __init__(self, path: str, max_bytes: int, flush_every: int = 64):
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._accessed: dict[str, float] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= self.flush_every:
+                self._flush_accessed()
+                self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, value: str) -> int:
+        """Store a completion and return how many entries were evicted."""
+        size = len(value.encode())
+        with self._lock:
+            # Eviction order must reflect the reads buffered so far
+            self._flush_accessed()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, size, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            evicted = 0
+            total = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM completions"
+            ).fetchone()[0]
+            while total > self.max_bytes:
+                row = self._conn.execute(
+                    "SELECT key, size FROM completions ORDER BY accessed LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    break
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (row[0],))
+                total -= row[1]
+                evicted += 1
+            self._conn.commit()
+            return evicted
+
+    def _flush_accessed(self) -> None:
+        """Write buffered hit timestamps; the caller holds the lock and commits."""
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE completions SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
+
+
+class LLMCache:
+    """Content-addressed cache for LLM completions.
+
+    Keys are a SHA-256 of the model, sampling parameters, system prompt and
+    fully rendered prompt, so an unchanged section costs no tokens and no
+    latency. Completions live in an in-memory LRU tier and, if ``path`` is
+    set, a SQLite tier that survives restarts.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int | None = None,
+        path: str | None = None,
+        disk_max_bytes: int | None = None,
+    ):
+        settings = get_settings()
+        self.max_bytes = max_bytes or settings.llm_cache_max_bytes
+        path = path if path is not None else settings.llm_cache_path
+        self._disk = (
+            _DiskTier(path, disk_max_bytes or settings.llm_cache_disk_max_bytes)
+            if path
+            else None
+        )
+        self.stats = LLMCacheStats()
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._nbytes = 0
+
+    @staticmethod
+    def make_key(
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        system_prompt: str | None,
+        prompt: str,
+    ) -> str:
+        payload = json.dumps(
+            [model, temperature, max_tokens, system_prompt or "", prompt],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, key: str) -> str | None:
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.stats.memory_hits += 1
+            return value
+        if self._disk is not None:
+            value = await asyncio.to_thread(self._disk.get, key)
+            if value is not None:
+                self.stats.disk_hits += 1
+                self._put_memory(key, value)
+                return value
+        self.stats.misses += 1
+        return None
+
+    async def put(self, key: str, value: str) -> None:
+        self.stats.stores += 1
+        self._put_memory(key, value)
+        if self._disk is not None:
+            self.stats.evictions += await asyncio.to_thread(self._disk.put, key, value)
+
+    def _put_memory(self, key: str, value: str) -> None:
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._nbytes -= len(previous.encode())
+        self._memory[key] = value
+        self._nbytes += size
+        while self._nbytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._nbytes -= len(evicted.encode())
+            self.stats.evictions += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Cache size and hit/miss counters for health and metrics endpoints."""
+        return {
+            "entries": len(self._memory),
+            "bytes": self._nbytes,
+            "max_bytes": self.max_bytes,
+            "disk": self._disk is not None,
+            "memory_hits": self.stats.memory_hits,
+            "disk_hits": self.stats.disk_hits,
+            "misses": self.stats.misses,
+            "stores": self.stats.stores,
+            "evictions": self.stats.evictions,
+        }
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
@@ -1,17 +1,174 @@
-from openai import AsyncOpenAI
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
 
+from app import metrics, tracing
 from app.config import get_settings
+from app.llm.cache import LLMCache
+from app.llm.ratelimit import LLMRateLimiter, Priority
+from app.llm.tokens import get_token_counter
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+SECTION_SYSTEM_PROMPT = (
+    "You are a clinical documentation specialist. "
+    "Provide concise, accurate clinical summaries using standard medical terminology. "
+    "Focus on clinically significant information."
+)
+
+FINAL_SYSTEM_PROMPT = (
+    "You are a clinical documentation specialist creating a comprehensive patient summary. "
+    "Synthesize all available clinical data into a cohesive, professionally-formatted narrative "
+    "suitable for healthcare provider review."
+)
+
+
+@dataclass
+class LLMCall:
+    """Timing and token usage of one completion request.
+
+    ``ttft_ms`` runs from rate limiter admission to the first output token
+    (the whole response when not streaming). Token counts come from the
+    provider's usage report, or the local counter when it sends none.
+    """
+
+    stage: str
+    queue_wait_ms: float = 0.0
+    ttft_ms: float | None = None
+    total_ms: float = 0.0
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    cached: bool = False
+
+    def observe(self) -> None:
+        """Record this call in the process-wide metrics."""
+        if self.cached:
+            metrics.LLM_CACHE_HITS.inc(stage=self.stage)
+            return
+        metrics.LLM_QUEUE_WAIT_SECONDS.observe(self.queue_wait_ms / 1000, stage=self.stage)
+        if self.ttft_ms is not None:
+            metrics.LLM_TTFT_SECONDS.observe(self.ttft_ms / 1000, stage=self.stage)
+        metrics.LLM_DURATION_SECONDS.observe(self.total_ms / 1000, stage=self.stage)
+        if self.prompt_tokens is not None:
+            metrics.LLM_TOKENS.inc(self.prompt_tokens, stage=self.stage, type="prompt")
+        if self.completion_tokens is not None:
+            metrics.LLM_TOKENS.inc(self.completion_tokens, stage=self.stage, type="completion")
 
 
 class LLMClient:
     """OpenAI client wrapper for generating clinical summaries."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        cache: LLMCache | None = None,
+        limiter: LLMRateLimiter | None = None,
+        priority: Priority = Priority.INTERACTIVE,
+        slots: asyncio.Semaphore | None = None,
+    ):
         settings = get_settings()
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+        self.api_key = settings.openai_api_key
+        self.base_url = settings.openai_base_url or None
+        self._client: "AsyncOpenAI | None" = None
         self.model = settings.openai_model
         self.temperature = settings.llm_temperature
         self.max_tokens = settings.llm_max_tokens
+        self.section_max_tokens = settings.llm_section_max_tokens
+        self.fast_max_tokens = settings.llm_fast_max_tokens
+        self.cache = cache
+        self.limiter = limiter
+        self.priority = priority
+        # Held for each API request (not cache hits), e.g. to cap batch jobs' LLM calls
+        self.slots = slots
+        # Every request made through this client, in completion order
+        self.calls: list[LLMCall] = []
+
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """OpenAI client, created (and ``openai`` imported) on first use."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            if self.limiter is not None:
+                # The limiter owns retries so they are paced with everyone else's requests
+                self._client = AsyncOpenAI(
+                    api_key=self.api_key, base_url=self.base_url, max_retries=0
+                )
+            else:
+                self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    async def _create(
+        self, messages: list[dict[str, str]], max_tokens: int, call: LLMCall, **kwargs: Any
+    ) -> tuple[Any, float, int]:
+        """Call the chat completions API, through the rate limiter if one is attached.
+
+        Sets ``call.queue_wait_ms`` and returns the response, the time the
+        request (its last attempt, after any retries) was admitted and the
+        tokens reserved for it (0 without a limiter).
+        """
+        queued_at = time.perf_counter()
+        admitted_at = queued_at
+
+        def request():
+            nonlocal admitted_at
+            admitted_at = time.perf_counter()
+            return self.client.chat.completions.create(
+                model=self.model, messages=messages, max_tokens=max_tokens, **kwargs
+            )
+
+        tokens = 0
+        if self.limiter is None:
+            response = await request()
+        else:
+            counter = get_token_counter(self.model)
+            tokens = sum(counter.count(message["content"]) for message in messages) + max_tokens
+            tokens = self.limiter.reservation(tokens)
+            response = await self.limiter.run(request, tokens, self.priority)
+        call.queue_wait_ms = (admitted_at - queued_at) * 1000
+        return response, admitted_at, tokens
+
+    def _finish(
+        self,
+        call: LLMCall,
+        started: float,
+        messages: list[dict[str, str]],
+        content: str,
+        span: tracing.Span | tracing.NoopSpan,
+    ) -> None:
+        """Fill in totals (estimating tokens the provider didn't report) and record the call."""
+        call.total_ms = (time.perf_counter() - started) * 1000
+        if call.prompt_tokens is None or call.completion_tokens is None:
+            counter = get_token_counter(self.model)
+            if call.prompt_tokens is None:
+                call.prompt_tokens = sum(counter.count(m["content"]) for m in messages)
+            if call.completion_tokens is None:
+                call.completion_tokens = counter.count(content)
+        self.calls.append(call)
+        call.observe()
+        span.set(
+            queue_wait_ms=round(call.queue_wait_ms, 1),
+            ttft_ms=round(call.ttft_ms, 1) if call.ttft_ms is not None else None,
+            prompt_tokens=call.prompt_tokens,
+            completion_tokens=call.completion_tokens,
+        )
+
+    def _cache_hit(self, stage: str, span: tracing.Span | tracing.NoopSpan) -> None:
+        call = LLMCall(stage=stage, cached=True)
+        self.calls.append(call)
+        call.observe()
+        span.set(cached=True)
+
+    def _build_messages(self, prompt: str, system_prompt: str | None) -> list[dict[str, str]]:
+        messages = []
+
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
 
     async def generate(
         self,
@@ -19,42 +176,146 @@ class LLMClient:
         system_prompt: str | None = None,
         temperature: float | None = None,
         max_tokens: int | None = None,
+        stage: str = "llm",
     ) -> str:
-        """Generate a completion for the given prompt."""
-        messages = []
+        """Generate a completion for the given prompt.
 
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        With a cache attached, an identical request (model, sampling params,
+        system prompt and prompt) is answered from the cache. ``stage`` labels
+        the call in ``calls`` and the metrics.
+        """
+        temperature = temperature or self.temperature
+        max_tokens = max_tokens or self.max_tokens
 
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=temperature or self.temperature,
-            max_tokens=max_tokens or self.max_tokens,
-        )
+        with tracing.span("llm.generate", stage=stage, model=self.model) as span:
+            key = None
+            if self.cache:
+                key = LLMCache.make_key(self.model, temperature, max_tokens, system_prompt, prompt)
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    self._cache_hit(stage, span)
+                    return cached
+
+            started = time.perf_counter()
+            call = LLMCall(stage=stage)
+            messages = self._build_messages(prompt, system_prompt)
+            async with self.slots or nullcontext():
+                response, admitted_at, _ = await self._create(
+                    messages, max_tokens, call, temperature=temperature
+                )
+            call.ttft_ms = (time.perf_counter() - admitted_at) * 1000
+
+            content = response.choices[0].message.content or ""
+            if response.usage is not None:
+                call.prompt_tokens = response.usage.prompt_tokens
+                call.completion_tokens = response.usage.completion_tokens
+            self._finish(call, started, messages, content, span)
+            if key and content:
+                await self.cache.put(key, content)
+            return content
+
+    async def stream(
+        self,
+        prompt: str,
+        system_prompt: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        stage: str = "llm",
+    ) -> AsyncIterator[str]:
+        """Stream a completion for the given prompt as text deltas.
+
+        A cached completion is yielded as a single delta; a streamed one is
+        stored in the cache once it has finished.
+        """
+        temperature = temperature or self.temperature
+        max_tokens = max_tokens or self.max_tokens
 
-        return response.choices[0].message.content or ""
+        # Not the current span: the caller's code runs between our yields
+        with tracing.start_span("llm.stream", stage=stage, model=self.model) as span:
+            key = None
+            if self.cache:
+                key = LLMCache.make_key(self.model, temperature, max_tokens, system_prompt, prompt)
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    self._cache_hit(stage, span)
+                    yield cached
+                    return
 
-    async def generate_section_summary(self, prompt: str) -> str:
+            started = time.perf_counter()
+            call = LLMCall(stage=stage)
+            messages = self._build_messages(prompt, system_prompt)
+            parts: list[str] = []
+            # The slot is held until the stream ends, not just until it starts
+            async with self.slots or nullcontext():
+                response, admitted_at, reserved = await self._create(
+                    messages,
+                    max_tokens,
+                    call,
+                    temperature=temperature,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+
+                async for chunk in response:
+                    if chunk.usage is not None:
+                        call.prompt_tokens = chunk.usage.prompt_tokens
+                        call.completion_tokens = chunk.usage.completion_tokens
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if call.ttft_ms is None:
+                            call.ttft_ms = (time.perf_counter() - admitted_at) * 1000
+                        parts.append(delta)
+                        yield delta
+
+            content = "".join(parts)
+            self._finish(call, started, messages, content, span)
+            if self.limiter is not None:
+                # From the final chunk's usage, or estimated; an abandoned stream keeps it all
+                self.limiter.settle(reserved, call.prompt_tokens + call.completion_tokens)
+            if key and content:
+                await self.cache.put(key, content)
+
+    async def generate_section_summary(self, prompt: str, stage: str = "section") -> str:
         """Generate a section summary with clinical documentation system prompt."""
         return await self.generate(
             prompt=prompt,
-            system_prompt=(
-                "You are a clinical documentation specialist. "
-                "Provide concise, accurate clinical summaries using standard medical terminology. "
-                "Focus on clinically significant information."
-            ),
-            max_tokens=500,
+            system_prompt=SECTION_SYSTEM_PROMPT,
+            max_tokens=self.section_max_tokens,
+            stage=stage,
         )
 
     async def generate_final_summary(self, prompt: str) -> str:
         """Generate the final comprehensive clinical summary."""
         return await self.generate(
             prompt=prompt,
-            system_prompt=(
-                "You are a clinical documentation specialist creating a comprehensive patient summary. "
-                "Synthesize all available clinical data into a cohesive, professionally-formatted narrative "
-                "suitable for healthcare provider review."
-            ),
+            system_prompt=FINAL_SYSTEM_PROMPT,
+            stage="final",
+        )
+
+    def stream_final_summary(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the final comprehensive clinical summary token by token."""
+        return self.stream(
+            prompt=prompt,
+            system_prompt=FINAL_SYSTEM_PROMPT,
+            stage="final",
+        )
+
+    async def generate_combined_summary(self, prompt: str) -> str:
+        """Generate the section summaries and final summary in one call (fast mode)."""
+        return await self.generate(
+            prompt=prompt,
+            system_prompt=FINAL_SYSTEM_PROMPT,
+            max_tokens=self.fast_max_tokens,
+            stage="fast",
+        )
+
+    def stream_combined_summary(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the single-pass output (fast mode) token by token."""
+        return self.stream(
+            prompt=prompt,
+            system_prompt=FINAL_SYSTEM_PROMPT,
+            max_tokens=self.fast_max_tokens,
+            stage="fast",
         )
@@ -1,5 +1,13 @@
 from .assembler import PromptAssembler
+from .combined_prompt import COMBINED_SUMMARY_PROMPT, CombinedOutputParser
 from .final_prompt import FINAL_SUMMARY_PROMPT
 from .section_prompts import SECTION_PROMPTS, SectionType
 
-__all__ = ["SECTION_PROMPTS", "SectionType", "FINAL_SUMMARY_PROMPT", "PromptAssembler"]
+__all__ = [
+    "SECTION_PROMPTS",
+    "SectionType",
+    "FINAL_SUMMARY_PROMPT",
+    "COMBINED_SUMMARY_PROMPT",
+    "CombinedOutputParser",
+    "PromptAssembler",
+]
@@ -1,11 +1,13 @@
-import pandas as pd
+from app import tracing
+from app.fhir.resources.records import RecordTable
 
+from .combined_prompt import COMBINED_SUMMARY_PROMPT, SUMMARY_TAG, WRITTEN_SECTION_PROMPT
 from .final_prompt import FINAL_SUMMARY_PROMPT
 from .section_prompts import SECTION_PROMPTS, SectionType
 
 
 class PromptAssembler:
-    """Assembles section and final prompts from DataFrames."""
+    """Assembles section and final prompts from extracted record tables."""
 
     RESOURCE_TO_SECTION: dict[str, SectionType] = {
         "Patient": SectionType.DEMOGRAPHICS,
@@ -15,47 +17,97 @@ class PromptAssembler:
         "AllergyIntolerance": SectionType.ALLERGIES,
     }
 
-    def build_section_prompt(self, section_type: SectionType, df: pd.DataFrame) -> str:
-        """Build a single section prompt from DataFrame."""
+    def build_section_prompt(
+        self, section_type: SectionType, table: RecordTable, omitted: int = 0
+    ) -> str:
+        """Build a single section prompt from a record table.
+
+        ``omitted`` is the number of rows dropped to fit the token budget; the
+        prompt says so, so the model doesn't treat the table as complete.
+        """
         template = SECTION_PROMPTS[section_type]
 
-        if df.empty:
+        if table.empty and omitted:
+            data_table = f"*All {omitted} rows omitted to fit the prompt token budget*"
+        elif table.empty:
             data_table = "*No data available for this section*"
         else:
-            data_table = df.to_markdown(index=False)
+            data_table = table.to_markdown()
+            if omitted:
+                data_table += (
+                    f"\n\n*{omitted} lower-priority rows omitted to fit the prompt token budget*"
+                )
 
         return template.format(data_table=data_table)
 
     def build_all_section_prompts(
-        self, dataframes: dict[str, pd.DataFrame]
+        self, tables: dict[str, RecordTable]
     ) -> dict[SectionType, str]:
-        """Build prompts for all sections from resource DataFrames."""
+        """Build prompts for all sections from resource record tables."""
         prompts: dict[SectionType, str] = {}
 
-        for resource_type, df in dataframes.items():
+        for resource_type, table in tables.items():
             section_type = self.RESOURCE_TO_SECTION.get(resource_type)
             if section_type:
-                prompts[section_type] = self.build_section_prompt(section_type, df)
+                prompts[section_type] = self.build_section_prompt(section_type, table)
 
         return prompts
 
+    # Order sections logically
+    SECTION_ORDER = (
+        SectionType.DEMOGRAPHICS,
+        SectionType.CONDITIONS,
+        SectionType.MEDICATIONS,
+        SectionType.OBSERVATIONS,
+        SectionType.ALLERGIES,
+    )
+
     def build_final_prompt(self, section_summaries: dict[SectionType, str]) -> str:
         """Build the final comprehensive summary prompt."""
-        # Order sections logically
-        section_order = [
-            SectionType.DEMOGRAPHICS,
-            SectionType.CONDITIONS,
-            SectionType.MEDICATIONS,
-            SectionType.OBSERVATIONS,
-            SectionType.ALLERGIES,
-        ]
-
-        sections_parts = []
-        for section_type in section_order:
-            if section_type in section_summaries:
-                section_name = section_type.value.replace("_", " ").title()
-                summary = section_summaries[section_type]
-                sections_parts.append(f"### {section_name}\n{summary}")
-
-        sections_text = "\n\n".join(sections_parts)
-        return FINAL_SUMMARY_PROMPT.format(all_sections=sections_text)
+        section_order = self.SECTION_ORDER
+
+        with tracing.span("prompts.build_final", sections=len(section_summaries)):
+            sections_parts = []
+            for section_type in section_order:
+                if section_type in section_summaries:
+                    section_name = section_type.value.replace("_", " ").title()
+                    summary = section_summaries[section_type]
+                    sections_parts.append(f"### {section_name}\n{summary}")
+
+            sections_text = "\n\n".join(sections_parts)
+            return FINAL_SUMMARY_PROMPT.format(all_sections=sections_text)
+
+    def build_combined_prompt(
+        self,
+        section_prompts: dict[SectionType, str],
+        written_sections: dict[SectionType, str] | None = None,
+    ) -> str:
+        """Build the single-pass prompt from the section prompts.
+
+        The model answers with one tagged block per section followed by the
+        final summary, parsed by ``CombinedOutputParser``. ``written_sections``
+        are summaries that already exist; they are context for the final
+        summary and get no tag.
+        """
+        written_sections = written_sections or {}
+        with tracing.span(
+            "prompts.build_combined", sections=len(section_prompts), written=len(written_sections)
+        ):
+            sections = [st for st in self.SECTION_ORDER if st in section_prompts]
+            output_tags = "\n".join(
+                f"<{tag}>...</{tag}>" for tag in [*(st.value for st in sections), SUMMARY_TAG]
+            )
+            parts = []
+            for section_type in self.SECTION_ORDER:
+                if section_type in section_prompts:
+                    parts.append(section_prompts[section_type])
+                elif section_type in written_sections:
+                    parts.append(
+                        WRITTEN_SECTION_PROMPT.format(
+                            title=section_type.value.replace("_", " ").title(),
+                            summary=written_sections[section_type],
+                        )
+                    )
+            return COMBINED_SUMMARY_PROMPT.format(
+                section_prompts="\n\n".join(parts), output_tags=output_tags
+            )
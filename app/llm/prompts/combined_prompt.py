@@ -0,0 +1,125 @@
+import re
+
+from .final_prompt import SUMMARY_STRUCTURE
+from .section_prompts import SectionType
+
+COMBINED_SUMMARY_PROMPT = (
+    "You are creating a comprehensive clinical patient summary directly from the patient's "
+    "clinical data. The data is grouped into sections, each followed by instructions for that "
+    "section's summary.\n"
+    "\n"
+    "{section_prompts}\n"
+    "\n"
+    "---\n"
+    "\n"
+    "# Output Format\n"
+    "\n"
+    "First write each section's summary following its instructions, then the comprehensive "
+    "summary. Put each one inside its own tag, in exactly this order, with nothing outside the "
+    "tags:\n"
+    "\n"
+    "{output_tags}\n"
+    "\n"
+    "The comprehensive summary synthesizes all sections. Structure it as follows:\n"
+    "\n"
+    + SUMMARY_STRUCTURE
+    + "\n"
+    "\n"
+    "Generate the section summaries and the comprehensive clinical summary now:"
+)
+
+# A section summarized without the LLM (e.g. from a template), given as context only
+WRITTEN_SECTION_PROMPT = (
+    "## {title}\n"
+    "\n"
+    "{summary}\n"
+    "\n"
+    "This section is already summarized. Use it in the comprehensive summary, but do not write "
+    "a tag for it."
+)
+
+# Tag holding the comprehensive summary in the single-pass output
+SUMMARY_TAG = "summary"
+
+_OPEN_TAG = re.compile(
+    r"<(" + "|".join([*(s.value for s in SectionType), SUMMARY_TAG]) + r")>"
+)
+_SUMMARY_CLOSE = f"</{SUMMARY_TAG}>"
+
+
+class CombinedOutputParser:
+    """Splits single-pass output into section summaries and the final summary.
+
+    Fed incrementally, so a streamed response yields each section as soon as
+    its closing tag arrives and the final summary as it is written. Output
+    without any tags is taken as the final summary.
+    """
+
+    def __init__(self):
+        self.sections: dict[SectionType, str] = {}
+        self._summary: list[str] = []
+        self._buffer = ""
+        self._raw: list[str] = []
+        self._in_summary = False
+        self._summary_seen = False
+
+    def feed(self, delta: str) -> tuple[list[SectionType], str]:
+        """Consume a chunk; returns the sections completed by it and new summary text."""
+        self._raw.append(delta)
+        self._buffer += delta
+        completed: list[SectionType] = []
+        summary: list[str] = []
+        while True:
+            if self._in_summary:
+                end = self._buffer.find(_SUMMARY_CLOSE)
+                if end == -1:
+                    # Hold back what could be the start of the closing tag
+                    keep = _partial_suffix(self._buffer, _SUMMARY_CLOSE)
+                    summary.append(self._buffer[: len(self._buffer) - keep])
+                    self._buffer = self._buffer[len(self._buffer) - keep :]
+                    break
+                summary.append(self._buffer[:end])
+                self._buffer = self._buffer[end + len(_SUMMARY_CLOSE) :]
+                self._in_summary = False
+                continue
+            match = _OPEN_TAG.search(self._buffer)
+            if match is None:
+                break
+            tag = match.group(1)
+            if tag == SUMMARY_TAG:
+                self._in_summary = self._summary_seen = True
+                self._buffer = self._buffer[match.end() :]
+                continue
+            close = self._buffer.find(f"</{tag}>", match.end())
+            if close == -1:
+                break
+            section_type = SectionType(tag)
+            self.sections[section_type] = self._buffer[match.end() : close].strip()
+            completed.append(section_type)
+            self._buffer = self._buffer[close + len(tag) + 3 :]
+
+        text = "".join(summary)
+        if not self._summary:
+            text = text.lstrip()
+        if text:
+            self._summary.append(text)
+        return completed, text
+
+    def summary(self) -> str:
+        """The final summary once all output has been fed."""
+        if self._in_summary:
+            # Cut off (e.g. by max_tokens) before the closing tag
+            self._summary.append(self._buffer)
+            self._buffer = ""
+            self._in_summary = False
+        if not self._summary_seen and not self.sections:
+            return "".join(self._raw).strip()
+        return "".join(self._summary).strip()
+
+
+def _partial_suffix(text: str, tag: str) -> int:
+    """Length of the longest suffix of ``text`` that is a proper prefix of ``tag``."""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
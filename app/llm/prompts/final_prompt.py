@@ -1,16 +1,5 @@
-FINAL_SUMMARY_PROMPT = """You are creating a comprehensive clinical patient summary based on the following section summaries.
-
-# Section Summaries
-
-{all_sections}
-
----
-
-# Instructions
-
-Synthesize all available information into a unified, professionally-formatted clinical summary. Structure your response as follows:
-
-## 1. Patient Overview
+# Structure and guidelines for the comprehensive summary, shared with the single-pass prompt
+SUMMARY_STRUCTURE = """## 1. Patient Overview
 Brief identification including name, age, gender, and key demographics (2-3 sentences).
 
 ## 2. Active Problem List
@@ -36,6 +25,24 @@ Brief synthesis of the patient's overall clinical picture (2-3 sentences).
 - Prioritize clinically significant information
 - If data is missing for a section, note "No data available" rather than omitting
 - Do not fabricate information not present in the source data
-- Flag any safety-critical information (severe allergies, high-alert medications)
+- Flag any safety-critical information (severe allergies, high-alert medications)"""
+
+FINAL_SUMMARY_PROMPT = (
+    """You are creating a comprehensive clinical patient summary based on the following section summaries.
+
+# Section Summaries
+
+{all_sections}
+
+---
+
+# Instructions
+
+Synthesize all available information into a unified, professionally-formatted clinical summary. Structure your response as follows:
+
+"""
+    + SUMMARY_STRUCTURE
+    + """
 
 Generate the comprehensive clinical summary now:"""
+)
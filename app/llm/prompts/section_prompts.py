@@ -46,7 +46,9 @@ Format as a clear medication summary suitable for clinical review.""",
 
 {data_table}
 
-Provide a clinical interpretation of the observations:
+Provide a clinical interpretation of the observations. When the table has
+count/min/max/trend columns, each test appears once with its latest result and
+the trend of its recent values; earlier abnormal results follow their test.
 
 **Vital Signs** (if present):
 - Recent vital sign values with any abnormalities noted
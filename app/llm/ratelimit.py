@@ -0,0 +1,326 @@
+import asyncio
+import heapq
+import itertools
+import random
+import re
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+# HTTP statuses retried with backoff; 429 also pauses every queued request
+RETRYABLE_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+# Wait times kept per priority for the p95 in snapshots
+WAIT_SAMPLES = 1000
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+class Priority(IntEnum):
+    """LLM request priority classes; lower values are admitted first."""
+
+    INTERACTIVE = 0
+    AGENT = 1
+    BATCH = 2
+
+
+class TokenBucket:
+    """Per-minute allowance that refills continuously. A limit of 0 disables it."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = max(0, per_minute)
+        self.level = float(self.capacity)
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` is available."""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (amount - self.level) * 60 / self.capacity)
+
+    def take(self, amount: float) -> None:
+        if self.enabled:
+            self.level -= amount
+
+    def give(self, amount: float) -> None:
+        if self.enabled:
+            self.level = min(self.capacity, self.level + amount)
+
+    def drain(self, remaining: float) -> None:
+        """Lower the level to what the provider reports as remaining."""
+        if self.enabled:
+            self._refill(time.monotonic())
+            self.level = min(self.level, remaining)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+@dataclass
+class QueueStats:
+    """Queue depth and admission wait times for one priority class."""
+
+    depth: int = 0
+    admitted: int = 0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+    waits: deque = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLES))
+
+    def record(self, wait_ms: float) -> None:
+        self.admitted += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.waits.append(wait_ms)
+
+    def snapshot(self) -> dict[str, Any]:
+        waits = sorted(self.waits)
+        return {
+            "depth": self.depth,
+            "admitted": self.admitted,
+            "avg_wait_ms": round(self.total_wait_ms / self.admitted, 1) if self.admitted else 0.0,
+            "p95_wait_ms": round(waits[int(len(waits) * 0.95)], 1) if waits else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 1),
+        }
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Seconds from a rate-limit reset header such as ``1s``, ``6m0s`` or ``20ms``."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def retry_after(headers: Any) -> float | None:
+    """Seconds the provider asks us to wait, from ``retry-after(-ms)`` or reset headers."""
+    if headers is None:
+        return None
+    if (ms := parse_duration(headers.get("retry-after-ms"))) is not None:
+        return ms / 1000
+    if (seconds := parse_duration(headers.get("retry-after"))) is not None:
+        return seconds
+    resets = [
+        parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+        for kind in ("requests", "tokens")
+        if headers.get(f"x-ratelimit-remaining-{kind}") in ("0", 0)
+    ]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if getattr(exc, "status_code", None) in RETRYABLE_STATUSES:
+        return True
+    try:
+        from openai import APIConnectionError
+    except ImportError:
+        return False
+    return isinstance(exc, APIConnectionError)
+
+
+class LLMRateLimiter:
+    """Process-wide admission control for LLM requests.
+
+    Requests reserve one unit of the requests-per-minute bucket and their
+    estimated tokens (prompt plus ``max_tokens``) from the tokens-per-minute
+    bucket, and are admitted strictly by priority (interactive, then agent,
+    then batch), first come first served within a class. The reservation is
+    corrected to the reported usage once the response arrives, and refunded
+    when an attempt fails. Responses without ``usage`` (streams) are left for
+    the caller to ``settle`` once the usage is known.
+
+    Retryable failures are retried with jittered exponential backoff. A 429
+    pauses admission for every queued request until the provider's
+    ``retry-after`` / ``x-ratelimit-reset-*`` time, and syncs the buckets
+    down to its ``x-ratelimit-remaining-*`` counts, so one rate limit doesn't
+    turn into a storm of them.
+    """
+
+    def __init__(
+        self,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limited = 0
+        self.retries = 0
+        self.failed = 0
+        self.stats = {priority: QueueStats() for priority in Priority}
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._resume_at = 0.0
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        tokens: int,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> T:
+        """Run ``call`` once admitted, retrying retryable failures with backoff."""
+        # Retries keep their place in line ahead of later requests of the same class
+        seq = next(self._seq)
+        attempt = 0
+        while True:
+            reserved = await self.acquire(tokens, priority, seq)
+            try:
+                response = await call()
+            except Exception as e:
+                # A failed request uses no tokens; a 429 then drains the buckets in _backoff
+                self.settle(reserved, 0)
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    self.failed += 1
+                    raise
+                self.retries += 1
+                await self._backoff(e, attempt)
+                attempt += 1
+                continue
+            usage = getattr(getattr(response, "usage", None), "total_tokens", None)
+            if usage is not None:
+                self.settle(reserved, usage)
+            return response
+
+    async def acquire(
+        self, tokens: int, priority: Priority = Priority.INTERACTIVE, seq: int | None = None
+    ) -> int:
+        """Wait for admission and return the number of tokens reserved."""
+        tokens = self.reservation(tokens)
+        waiter = _Waiter(
+            priority,
+            next(self._seq) if seq is None else seq,
+            tokens,
+            asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._queue, waiter)
+        stats = self.stats[priority]
+        stats.depth += 1
+        queued_at = time.perf_counter()
+        try:
+            self._dispatch()
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.settle(tokens, 0)
+            # A cancelled waiter is dropped from the queue on the next dispatch
+            self._dispatch()
+            raise
+        finally:
+            stats.depth -= 1
+        stats.record((time.perf_counter() - queued_at) * 1000)
+        return tokens
+
+    def reservation(self, tokens: int) -> int:
+        """Tokens reserved for a request estimated at ``tokens``."""
+        if self.tokens.enabled:
+            # A request larger than the whole allowance would never be admitted
+            return min(tokens, self.tokens.capacity)
+        return tokens
+
+    def settle(self, reserved: int, used: int) -> None:
+        """Correct a reservation to the tokens actually used."""
+        if used < reserved:
+            self.tokens.give(reserved - used)
+        else:
+            self.tokens.take(used - reserved)
+
+    def pause(self, seconds: float) -> None:
+        """Hold admission of all queued requests for ``seconds``."""
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def _dispatch(self) -> None:
+        """Admit queued requests in priority order while the buckets allow."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._queue:
+            head = self._queue[0]
+            if head.future.done():
+                heapq.heappop(self._queue)
+                continue
+            delay = max(
+                self._resume_at - now,
+                self.requests.delay(1, now),
+                self.tokens.delay(head.tokens, now),
+            )
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(head.tokens)
+            head.future.set_result(None)
+
+    async def _backoff(self, exc: Exception, attempt: int) -> None:
+        exponential = min(self.backoff_max, self.backoff_base * 2**attempt)
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None)
+        if getattr(exc, "status_code", None) == 429:
+            self.rate_limited += 1
+            if headers is not None:
+                for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                    remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                    if remaining is not None and remaining.isdigit():
+                        bucket.drain(int(remaining))
+            suggested = retry_after(headers)
+            if suggested is not None:
+                # Never retry before the provider's reset; jitter spreads the herd
+                delay = min(self.backoff_max, suggested) + random.uniform(0, self.backoff_base)
+            else:
+                delay = exponential / 2 + random.uniform(0, exponential / 2)
+            self.pause(delay)
+            return
+        await asyncio.sleep(random.uniform(0, exponential))
+
+    def snapshot(self) -> dict[str, Any]:
+        """Bucket levels, per-priority queue metrics and retry counters."""
+        now = time.monotonic()
+        for bucket in (self.requests, self.tokens):
+            bucket.delay(0, now)
+        return {
+            "rpm_limit": self.requests.capacity,
+            "tpm_limit": self.tokens.capacity,
+            "available_requests": int(self.requests.level) if self.requests.enabled else None,
+            "available_tokens": int(self.tokens.level) if self.tokens.enabled else None,
+            "paused_ms": int(max(0.0, self._resume_at - now) * 1000),
+            "queues": {
+                priority.name.lower(): self.stats[priority].snapshot() for priority in Priority
+            },
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "failed": self.failed,
+        }
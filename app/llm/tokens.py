@@ -0,0 +1,42 @@
+import math
+from functools import lru_cache
+
+from app.config import get_settings
+
+# Characters per token assumed without a tokenizer. Markdown tables of codes,
+# dates and numbers tokenize denser than prose, so this errs on the high side.
+HEURISTIC_CHARS_PER_TOKEN = 3.0
+
+
+class TokenCounter:
+    """Counts prompt tokens with tiktoken when available, else a character heuristic."""
+
+    def __init__(self, model: str, use_tiktoken: bool = True):
+        self.model = model
+        self.tokenizer = "heuristic"
+        self._encode = None
+        if not use_tiktoken:
+            return
+        try:
+            import tiktoken
+
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # Not installed, or the encoding file could not be fetched
+            return
+        self.tokenizer = f"tiktoken:{encoding.name}"
+        self._encode = encoding.encode_ordinary
+
+    def count(self, text: str) -> int:
+        if self._encode is None:
+            return math.ceil(len(text) / HEURISTIC_CHARS_PER_TOKEN)
+        return len(self._encode(text))
+
+
+@lru_cache
+def get_token_counter(model: str) -> TokenCounter:
+    """Shared counter per model; tokenizer files are loaded once."""
+    return TokenCounter(model, use_tiktoken=get_settings().llm_tokenizer != "heuristic")
@@ -0,0 +1,58 @@
+import asyncio
+import contextlib
+from collections import deque
+from typing import Any
+
+from app import metrics
+
+# Lag samples kept for the percentiles in snapshots (a minute at the default interval)
+LAG_SAMPLES = 600
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag: how late a ``sleep(interval)`` wakes up.
+
+    Anything that blocks the loop (CPU-bound work, synchronous I/O) delays
+    every sleeper by the same amount, so the lag is how long the loop was
+    unavailable to other requests, ``/health`` included.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.samples = 0
+        self.max_lag_ms = 0.0
+        self.lags: deque[float] = deque(maxlen=LAG_SAMPLES)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._sample())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            metrics.EVENT_LOOP_LAG_SECONDS.observe(lag)
+            self.samples += 1
+            self.max_lag_ms = max(self.max_lag_ms, lag * 1000)
+            self.lags.append(lag * 1000)
+
+    def snapshot(self) -> dict[str, Any]:
+        lags = sorted(self.lags)
+        return {
+            "interval_ms": round(self.interval * 1000, 1),
+            "samples": self.samples,
+            "last_lag_ms": round(self.lags[-1], 1) if self.lags else 0.0,
+            "p50_lag_ms": round(lags[len(lags) // 2], 1) if lags else 0.0,
+            "p99_lag_ms": round(lags[int(len(lags) * 0.99)], 1) if lags else 0.0,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+        }
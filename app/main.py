@@ -1,11 +1,33 @@
+import asyncio
+import importlib
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_mcp import FastApiMCP
 
-from app.api.routes import health_router, summary_router
+from app import tracing
+from app.api.dependencies import REQUEST_SOURCE_HEADER
+from app.api.routes import batch_router, health_router, metrics_router, summary_router
 from app.config import get_settings
+from app.fastjson import FastJSONResponse
+from app.fhir.cache import FHIRCache
+from app.fhir.transport import FHIRTransport
+from app.llm.cache import LLMCache
+from app.llm.ratelimit import LLMRateLimiter
+from app.llm.tokens import get_token_counter
+from app.looplag import LoopLagMonitor
+from app.processing import offload
+from app.processing.jobs import BatchJobManager
+
+# Imported lazily on first use; preloaded off the event loop after startup
+WARM_IMPORTS = ("openai",)
+
+
+def _warm_imports(model: str) -> None:
+    for module in WARM_IMPORTS:
+        importlib.import_module(module)
+    # Loads (and on first run, downloads) the tokenizer used by the prompt budget
+    get_token_counter(model)
 
 
 @asynccontextmanager
@@ -15,8 +37,58 @@ async def lifespan(app: FastAPI):
     print(f"Starting Clinical Summary API")
     print(f"FHIR Server: {settings.fhir_base_url}")
     print(f"LLM Model: {settings.openai_model}")
+    app.state.fhir_transport = FHIRTransport()
+    app.state.fhir_cache = FHIRCache() if settings.fhir_cache_enabled else None
+    app.state.llm_cache = LLMCache() if settings.llm_cache_enabled else None
+    app.state.llm_limiter = LLMRateLimiter(
+        rpm=settings.llm_rpm_limit,
+        tpm=settings.llm_tpm_limit,
+        max_retries=settings.llm_max_retries,
+        backoff_base=settings.llm_backoff_base,
+        backoff_max=settings.llm_backoff_max,
+    )
+    tracing.set_exporter(
+        tracing.create_exporter(settings.tracing_exporter, settings.tracing_file)
+    )
+    app.state.offloader = offload.Offloader(
+        workers=settings.offload_workers,
+        min_items=settings.offload_min_items,
+        process_workers=settings.offload_process_workers,
+        process_min_items=settings.offload_process_min_items,
+        initializer=get_token_counter,
+        initargs=(settings.openai_model,),
+    )
+    offload.set_offloader(app.state.offloader)
+    app.state.loop_lag = None
+    if settings.loop_lag_interval > 0:
+        app.state.loop_lag = LoopLagMonitor(settings.loop_lag_interval)
+        app.state.loop_lag.start()
+    app.state.batch_jobs = BatchJobManager(
+        app.state.fhir_transport,
+        app.state.fhir_cache,
+        app.state.llm_cache,
+        app.state.llm_limiter,
+    )
+    if settings.mcp_enabled and not getattr(app.state, "mcp_mounted", False):
+        # Mounted here rather than in create_app so importing app.main stays light
+        await asyncio.to_thread(importlib.import_module, "fastapi_mcp")
+        mount_mcp(app)
+        app.state.mcp_mounted = True
+    warm = None
+    if settings.warm_imports:
+        warm = asyncio.create_task(asyncio.to_thread(_warm_imports, settings.openai_model))
     yield
     print("Shutting down...")
+    if warm:
+        await asyncio.gather(warm, return_exceptions=True)
+    await app.state.batch_jobs.aclose()
+    await app.state.fhir_transport.aclose()
+    if app.state.loop_lag:
+        await app.state.loop_lag.aclose()
+    offload.set_offloader(None)
+    if app.state.llm_cache:
+        app.state.llm_cache.close()
+    tracing.set_exporter(None)
 
 
 def create_app() -> FastAPI:
@@ -34,6 +106,7 @@ def create_app() -> FastAPI:
         version="1.0.0",
         lifespan=lifespan,
         debug=settings.debug,
+        default_response_class=FastJSONResponse,
     )
 
     # CORS middleware
@@ -44,18 +117,45 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Added last so it is outermost and times the whole request
+    app.add_middleware(tracing.TraceMiddleware)
 
     # Include routers
     app.include_router(health_router)
+    app.include_router(metrics_router)
+    app.include_router(batch_router)
     app.include_router(summary_router)
 
+    return app
+
+
+def mount_mcp(app: FastAPI) -> None:
+    """Expose the summary operations as MCP tools at /mcp.
+
+    Called from the lifespan when ``MCP_ENABLED`` is set, so ``fastapi_mcp``
+    is only loaded by a worker that is starting up to serve it.
+    Tool calls are tagged with ``REQUEST_SOURCE_HEADER`` so their LLM requests
+    are scheduled at agent priority, and carry the trace context so an agent's
+    tool calls join its trace.
+    """
+    import httpx
+    from fastapi_mcp import FastApiMCP
+
     mcp = FastApiMCP(
         app,
         include_operations=["get_patient_summary", "get_patient_resources"],
+        http_client=httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+            base_url="http://apiserver",
+            headers={REQUEST_SOURCE_HEADER: "mcp"},
+            timeout=get_settings().mcp_tool_timeout,
+            # Parent the tool's request under the /mcp request span when there is one
+            event_hooks={"request": [tracing.inject_traceparent]},
+        ),
+        # Otherwise the caller's own traceparent is forwarded as is
+        headers=["authorization", tracing.TRACEPARENT],
     )
     mcp.mount_http()
 
-    return app
-
 
 app = create_app()
@@ -0,0 +1,207 @@
+"""Process-wide counters and histograms in the Prometheus text format.
+
+Metrics are module-level and label values are passed per observation::
+
+    FHIR_RESPONSE_BYTES.inc(len(body), resource_type="Observation")
+    LLM_DURATION_SECONDS.observe(1.8, stage="final")
+
+``render()`` produces the exposition served at ``/metrics``.
+"""
+
+import threading
+from collections.abc import Iterable
+
+# Seconds; spans FHIR round trips through slow LLM completions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing total per label set."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {_format(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count of observations per label set."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (non-cumulative), sum, count
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, totals = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def samples(self) -> list[str]:
+        lines = []
+        with self._lock:
+            values = sorted((key, (list(c), list(t))) for key, (c, t) in self._values.items())
+        for key, (counts, (total, count)) in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format(bound)
+                labels = _labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format(total)}")
+            lines.append(f"{self.name}_count{labels} {int(count)}")
+        return lines
+
+
+class Registry:
+    """Every metric created in the process, rendered in registration order."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    return REGISTRY.render()
+
+
+FHIR_FETCH_SECONDS = Histogram(
+    "fhir_fetch_seconds",
+    "Wall time to fetch one resource type for a patient, including pagination",
+    ["resource_type"],
+)
+FHIR_REQUESTS = Counter(
+    "fhir_requests_total", "HTTP requests sent to the FHIR server", ["resource_type"]
+)
+FHIR_RESPONSE_BYTES = Counter(
+    "fhir_response_bytes_total",
+    "Response body bytes received from the FHIR server",
+    ["resource_type"],
+)
+EXTRACTION_SECONDS = Histogram(
+    "extraction_seconds",
+    "Time to extract one resource type into a record table",
+    ["resource_type"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+PROMPT_BUILD_SECONDS = Histogram(
+    "prompt_build_seconds",
+    "Time to build all section prompts (compaction, token budget, rendering)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "llm_queue_wait_seconds", "Time an LLM request waited for rate limiter admission", ["stage"]
+)
+LLM_TTFT_SECONDS = Histogram(
+    "llm_time_to_first_token_seconds", "Time from admission to the first output token", ["stage"]
+)
+LLM_DURATION_SECONDS = Histogram(
+    "llm_request_seconds", "Total LLM request time including queue wait", ["stage"]
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens reported by the LLM provider", ["stage", "type"]
+)
+LLM_CACHE_HITS = Counter(
+    "llm_cache_hits_total", "LLM requests answered from the completion cache", ["stage"]
+)
+OFFLOAD_SECONDS = Histogram(
+    "offload_seconds",
+    "Time a CPU-bound stage took where it ran (inline, thread or process), including queueing",
+    ["stage", "target"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop woke a periodic sleeper; time the loop was blocked",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+SUMMARY_SECTIONS = Counter(
+    "summary_sections_total",
+    "Section summaries by how they were produced (llm, template or fallback)",
+    ["section", "source"],
+)
+SUMMARY_SECONDS = Histogram(
+    "summary_seconds", "End-to-end patient summary processing time", ["mode"]
+)
@@ -0,0 +1,13 @@
+from .fhir_server import LatencyModel, MockFHIRConfig, create_fhir_app
+from .llm_server import MockLLMConfig, create_llm_app
+from .synthetic import PatientProfile, generate_patient
+
+__all__ = [
+    "create_fhir_app",
+    "create_llm_app",
+    "generate_patient",
+    "LatencyModel",
+    "MockFHIRConfig",
+    "MockLLMConfig",
+    "PatientProfile",
+]
@@ -0,0 +1,78 @@
+"""Run the mock FHIR server or mock LLM for offline load testing.
+
+    python -m app.mock fhir --port 8081 --observations 500 --latency-ms 40 --p99-ms 250
+    python -m app.mock llm --port 8082 --ttft-ms 300 --tokens-per-second 80
+
+Then start the API with ``FHIR_BASE_URL=http://localhost:8081`` and
+``OPENAI_BASE_URL=http://localhost:8082/v1``.
+"""
+
+import argparse
+
+import uvicorn
+
+from app.mock import (
+    LatencyModel,
+    MockFHIRConfig,
+    MockLLMConfig,
+    PatientProfile,
+    create_fhir_app,
+    create_llm_app,
+)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    servers = parser.add_subparsers(dest="server", required=True)
+
+    fhir = servers.add_parser("fhir", help="mock FHIR R4 server")
+    fhir.add_argument("--port", type=int, default=8081)
+    fhir.add_argument("--conditions", type=int, default=12)
+    fhir.add_argument("--medications", type=int, default=15)
+    fhir.add_argument("--observations", type=int, default=200)
+    fhir.add_argument("--allergies", type=int, default=3)
+    fhir.add_argument("--observation-tests", type=int, default=12, help="distinct LOINC codes")
+    fhir.add_argument("--narrative-bytes", type=int, default=0, help="text.div size per resource")
+    fhir.add_argument("--latency-ms", type=float, default=0.0, help="median response latency")
+    fhir.add_argument("--p99-ms", type=float, default=0.0, help="99th percentile latency")
+    fhir.add_argument("--patients", type=int, default=0, help="serve only patient-0..N-1")
+    fhir.add_argument("--seed", type=int, default=0)
+
+    llm = servers.add_parser("llm", help="mock OpenAI-compatible endpoint")
+    llm.add_argument("--port", type=int, default=8082)
+    llm.add_argument("--ttft-ms", type=float, default=300.0, help="time to first token")
+    llm.add_argument("--tokens-per-second", type=float, default=80.0)
+    llm.add_argument("--output-tokens", type=int, default=150)
+    llm.add_argument("--rpm", type=int, default=0, help="answer 429 above this many requests/min")
+
+    args = parser.parse_args(argv)
+    if args.server == "fhir":
+        app = create_fhir_app(
+            MockFHIRConfig(
+                profile=PatientProfile(
+                    conditions=args.conditions,
+                    medications=args.medications,
+                    observations=args.observations,
+                    allergies=args.allergies,
+                    observation_tests=args.observation_tests,
+                    narrative_bytes=args.narrative_bytes,
+                ),
+                latency=LatencyModel(median_ms=args.latency_ms, p99_ms=args.p99_ms),
+                patient_count=args.patients,
+                seed=args.seed,
+            )
+        )
+    else:
+        app = create_llm_app(
+            MockLLMConfig(
+                time_to_first_token_ms=args.ttft_ms,
+                tokens_per_second=args.tokens_per_second,
+                output_tokens=args.output_tokens,
+                rpm=args.rpm,
+            )
+        )
+    uvicorn.run(app, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Mock FHIR R4 server serving synthetic patients.
+
+Supports what ``FHIRClient`` uses: reads with ETags and ``If-None-Match``,
+patient-scoped searches with ``_count`` paging and ``_elements`` projection,
+``_summary=count`` revalidation probes, and ``batch`` Bundles POSTed to the
+base URL. Every patient ID exists (generated on first use) unless
+``patient_count`` restricts them to ``patient-0`` .. ``patient-{n-1}``.
+"""
+
+import asyncio
+import math
+import random
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from fastapi import FastAPI, Request, Response
+
+from app import fastjson
+from app.mock.synthetic import LAST_UPDATED, PatientProfile, generate_patient
+
+FHIR_JSON = "application/fhir+json"
+ETAG = 'W/"1"'
+
+SEARCH_TYPES = ("Condition", "MedicationRequest", "Observation", "AllergyIntolerance")
+
+
+@dataclass
+class LatencyModel:
+    """Log-normal response latency from a median and a 99th percentile, in milliseconds."""
+
+    median_ms: float = 0.0
+    p99_ms: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        """One latency in seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        if self.p99_ms <= self.median_ms:
+            return self.median_ms / 1000
+        # 2.326 is the standard normal's 99th percentile
+        sigma = math.log(self.p99_ms / self.median_ms) / 2.326
+        return rng.lognormvariate(math.log(self.median_ms), sigma) / 1000
+
+
+@dataclass
+class MockFHIRConfig:
+    """Patient shape, per-request latency and patient ID space of the mock server."""
+
+    profile: PatientProfile = field(default_factory=PatientProfile)
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    patient_count: int = 0
+    seed: int = 0
+    max_page_size: int = 1000
+
+
+class MockFHIRServer:
+    """Request handling behind the mock server's routes."""
+
+    def __init__(self, config: MockFHIRConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.requests = 0
+        self._patient = lru_cache(maxsize=1024)(self._generate)
+
+    def _generate(self, patient_id: str) -> dict[str, list[dict[str, Any]]] | None:
+        count = self.config.patient_count
+        if count:
+            prefix, _, index = patient_id.rpartition("-")
+            if prefix != "patient" or not index.isdigit() or int(index) >= count:
+                return None
+        return generate_patient(patient_id, self.config.profile, self.config.seed)
+
+    def exists(self, patient_id: str) -> bool:
+        return self._patient(patient_id) is not None
+
+    async def delay(self) -> None:
+        self.requests += 1
+        latency = self.config.latency.sample(self.rng)
+        if latency:
+            await asyncio.sleep(latency)
+
+    def read(self, resource_type: str, resource_id: str, params: dict[str, str]) -> tuple[int, Any]:
+        if resource_type != "Patient":
+            return 404, _outcome("not-supported", f"Reads of {resource_type} are not supported")
+        data = self._patient(resource_id)
+        if data is None:
+            return 404, _outcome("not-found", f"Patient/{resource_id} not found")
+        return 200, _project(data["Patient"][0], params.get("_elements"))
+
+    def search(self, resource_type: str, params: dict[str, str], base_url: str) -> tuple[int, Any]:
+        if resource_type not in SEARCH_TYPES:
+            return 404, _outcome("not-supported", f"Search of {resource_type} is not supported")
+        patient_id = params.get("patient", "").removeprefix("Patient/")
+        data = self._patient(patient_id) if patient_id else None
+        matches = data[resource_type] if data else []
+
+        since = params.get("_lastUpdated", "")
+        if since.startswith("gt") and since[2:] >= LAST_UPDATED:
+            matches = []
+        if params.get("_summary") == "count":
+            return 200, {"resourceType": "Bundle", "type": "searchset", "total": len(matches)}
+
+        count = min(int(params.get("_count", 100)), self.config.max_page_size)
+        offset = int(params.get("_getpagesoffset", 0))
+        page = matches[offset : offset + count]
+        bundle: dict[str, Any] = {
+            "resourceType": "Bundle",
+            "type": "searchset",
+            "total": len(matches),
+            "meta": {"lastUpdated": LAST_UPDATED},
+            "link": [],
+            "entry": [
+                {
+                    "fullUrl": f"{base_url}/{resource_type}/{resource['id']}",
+                    "resource": _project(resource, params.get("_elements")),
+                    "search": {"mode": "match"},
+                }
+                for resource in page
+            ],
+        }
+        if offset + count < len(matches):
+            next_params = {**params, "_getpagesoffset": str(offset + count)}
+            next_url = f"{base_url}/{resource_type}?{urlencode(next_params)}"
+            bundle["link"].append({"relation": "next", "url": next_url})
+        return 200, bundle
+
+    def batch(self, bundle: dict[str, Any], base_url: str) -> tuple[int, Any]:
+        if bundle.get("resourceType") != "Bundle" or bundle.get("type") != "batch":
+            return 400, _outcome("invalid", "Expected a batch Bundle")
+        entries = []
+        for entry in bundle.get("entry", []):
+            url = urlsplit(entry.get("request", {}).get("url", ""))
+            params = dict(parse_qsl(url.query))
+            parts = url.path.strip("/").split("/")
+            if len(parts) == 2:
+                status, resource = self.read(parts[0], parts[1], params)
+            else:
+                status, resource = self.search(parts[0], params, base_url)
+            response = {"status": f"{status} {'OK' if status == 200 else 'Not Found'}"}
+            if status == 200 and len(parts) == 2:
+                response["etag"] = ETAG
+            entries.append({"resource": resource, "response": response})
+        return 200, {"resourceType": "Bundle", "type": "batch-response", "entry": entries}
+
+
+def _project(resource: dict[str, Any], elements: str | None) -> dict[str, Any]:
+    """Apply ``_elements``: keep the listed top-level elements plus mandatory ones.
+
+    A choice element is requested by its base name (``value`` for ``value[x]``),
+    which keeps every typed variant such as ``valueQuantity``.
+    """
+    if not elements:
+        return resource
+    keep = {"resourceType", "id", "meta", *elements.split(",")}
+    return {key: value for key, value in resource.items() if _kept(key, keep)}
+
+
+def _kept(key: str, keep: set[str]) -> bool:
+    if key in keep:
+        return True
+    # value[x]: the base name followed by a capitalised type, e.g. valueQuantity
+    for i in range(1, len(key)):
+        if key[i].isupper():
+            return key[:i] in keep
+    return False
+
+
+def _outcome(code: str, diagnostics: str) -> dict[str, Any]:
+    return {
+        "resourceType": "OperationOutcome",
+        "issue": [{"severity": "error", "code": code, "diagnostics": diagnostics}],
+    }
+
+
+def _response(status: int, body: Any, headers: dict[str, str] | None = None) -> Response:
+    return Response(fastjson.dumps(body), status_code=status, media_type=FHIR_JSON, headers=headers)
+
+
+def create_fhir_app(config: MockFHIRConfig | None = None) -> FastAPI:
+    """FastAPI app for the mock FHIR server; point ``FHIR_BASE_URL`` at its root."""
+    server = MockFHIRServer(config or MockFHIRConfig())
+    app = FastAPI(title="Mock FHIR R4 Server", openapi_url=None)
+    app.state.server = server
+
+    def base_url(request: Request) -> str:
+        return str(request.base_url).rstrip("/")
+
+    @app.get("/metadata")
+    async def metadata() -> Response:
+        return _response(
+            200,
+            {
+                "resourceType": "CapabilityStatement",
+                "status": "active",
+                "fhirVersion": "4.0.1",
+                "format": ["json"],
+            },
+        )
+
+    @app.get("/{resource_type}/{resource_id}")
+    async def read(resource_type: str, resource_id: str, request: Request) -> Response:
+        await server.delay()
+        revalidating = request.headers.get("if-none-match") == ETAG
+        if revalidating and resource_type == "Patient" and server.exists(resource_id):
+            return Response(status_code=304, headers={"ETag": ETAG})
+        status, body = server.read(resource_type, resource_id, dict(request.query_params))
+        return _response(status, body, {"ETag": ETAG} if status == 200 else None)
+
+    @app.get("/{resource_type}")
+    async def search(resource_type: str, request: Request) -> Response:
+        await server.delay()
+        status, body = server.search(resource_type, dict(request.query_params), base_url(request))
+        return _response(status, body)
+
+    @app.post("/")
+    async def batch(request: Request) -> Response:
+        await server.delay()
+        try:
+            bundle = fastjson.loads(await request.body())
+        except ValueError:
+            return _response(400, _outcome("invalid", "Malformed JSON"))
+        status, body = server.batch(bundle, base_url(request))
+        return _response(status, body)
+
+    return app
@@ -0,0 +1,213 @@
+"""Mock OpenAI-compatible chat completions endpoint.
+
+Completions are deterministic: the text is derived from a hash of the
+model and messages, so repeated benchmark runs produce identical output.
+When the prompt asks for tagged output (``<tag>...</tag>`` lines, as the
+single-pass summary prompt does), each tag gets ``output_tokens`` words.
+Timing follows a simple model, time-to-first-token then a steady
+``tokens_per_second``, for both plain and streamed (SSE) responses. With
+``rpm`` set, requests over the per-minute allowance get OpenAI-style 429s
+with ``retry-after-ms`` and ``x-ratelimit-*`` headers.
+"""
+
+import asyncio
+import hashlib
+import random
+import re
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app import fastjson
+from app.llm.tokens import TokenCounter
+
+_WORDS = (
+    "patient", "presents", "with", "stable", "chronic", "hypertension", "and", "type", "2",
+    "diabetes", "mellitus", "currently", "managed", "on", "metformin", "lisinopril", "recent",
+    "labs", "show", "elevated", "glucose", "HbA1c", "within", "target", "range", "no", "acute",
+    "findings", "blood", "pressure", "controlled", "continue", "current", "regimen", "monitor",
+    "renal", "function", "known", "penicillin", "allergy", "reaction", "hives", "history", "of",
+)
+
+_OUTPUT_TAG = re.compile(r"^<([a-z_]+)>\.\.\.</\1>$", re.MULTILINE)
+
+
+@dataclass
+class MockLLMConfig:
+    """Output length, timing and rate limit of the mock LLM."""
+
+    time_to_first_token_ms: float = 300.0
+    tokens_per_second: float = 80.0
+    # Completion length (per tag for tagged output), capped by the request's max_tokens
+    output_tokens: int = 150
+    rpm: int = 0
+
+
+class MockLLM:
+    """Completion generation and rate limiting behind the mock endpoint."""
+
+    def __init__(self, config: MockLLMConfig):
+        self.config = config
+        self.counter = TokenCounter("mock", use_tiktoken=False)
+        self.requests = 0
+        self.rate_limited = 0
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+
+    def completion_parts(self, body: dict[str, Any]) -> list[str]:
+        """Deterministic completion for a request as text deltas, one word (token) each."""
+        digest = hashlib.sha256(
+            fastjson.dumps([body.get("model"), body.get("messages")])
+        ).hexdigest()
+        rng = random.Random(digest)
+        prompt = str((body.get("messages") or [{}])[-1].get("content", ""))
+        tags = _OUTPUT_TAG.findall(prompt)
+        limit = body.get("max_tokens") or body.get("max_completion_tokens")
+        per_tag = self.config.output_tokens
+        if limit:
+            per_tag = min(per_tag, max(1, limit // max(1, len(tags))))
+        if not tags:
+            return self._sentence(rng, per_tag)
+        parts = []
+        for tag in tags:
+            sentence = self._sentence(rng, per_tag)
+            sentence[0] = f"<{tag}>{sentence[0]}"
+            sentence[-1] += f"</{tag}>\n"
+            parts.extend(sentence)
+        return parts
+
+    def _sentence(self, rng: random.Random, count: int) -> list[str]:
+        words = [rng.choice(_WORDS) for _ in range(max(1, count))]
+        words[0] = words[0][:1].upper() + words[0][1:]
+        words[-1] += "."
+        return [words[0], *(f" {word}" for word in words[1:])]
+
+    def prompt_tokens(self, body: dict[str, Any]) -> int:
+        return sum(self.counter.count(str(m.get("content", ""))) for m in body.get("messages", []))
+
+    def check_rate_limit(self) -> dict[str, str] | None:
+        """Count a request against the per-minute window; headers for a 429 if over it."""
+        self.requests += 1
+        if not self.config.rpm:
+            return None
+        now = time.monotonic()
+        if now - self._window_start >= 60:
+            self._window_start = now
+            self._window_requests = 0
+        self._window_requests += 1
+        if self._window_requests <= self.config.rpm:
+            return None
+        self.rate_limited += 1
+        reset = 60 - (now - self._window_start)
+        return {
+            "retry-after-ms": str(int(reset * 1000)),
+            "x-ratelimit-limit-requests": str(self.config.rpm),
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": f"{reset:.3f}s",
+        }
+
+    def token_interval(self) -> float:
+        return 1 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0.0
+
+
+def _chunk(completion_id: str, model: str, created: int, delta: dict, finish: str | None) -> bytes:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+    }
+    return b"data: " + fastjson.dumps(chunk) + b"\n\n"
+
+
+def create_llm_app(config: MockLLMConfig | None = None) -> FastAPI:
+    """FastAPI app for the mock LLM; point ``OPENAI_BASE_URL`` at ``<root>/v1``."""
+    llm = MockLLM(config or MockLLMConfig())
+    app = FastAPI(title="Mock OpenAI-compatible API", openapi_url=None)
+    app.state.llm = llm
+
+    @app.get("/v1/models")
+    async def models() -> dict[str, Any]:
+        return {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Response:
+        body = fastjson.loads(await request.body())
+        headers = llm.check_rate_limit()
+        if headers is not None:
+            error = {
+                "error": {
+                    "message": "Rate limit reached for requests",
+                    "type": "requests",
+                    "code": "rate_limit_exceeded",
+                }
+            }
+            return Response(
+                fastjson.dumps(error),
+                status_code=429,
+                media_type="application/json",
+                headers=headers,
+            )
+
+        model = body.get("model", "mock")
+        parts = llm.completion_parts(body)
+        prompt_tokens = llm.prompt_tokens(body)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(parts),
+            "total_tokens": prompt_tokens + len(parts),
+        }
+        completion_id = f"chatcmpl-mock-{llm.requests}"
+        created = int(time.time())
+        ttft = llm.config.time_to_first_token_ms / 1000
+        interval = llm.token_interval()
+
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+            async def events() -> AsyncIterator[bytes]:
+                await asyncio.sleep(ttft)
+                yield _chunk(completion_id, model, created, {"role": "assistant"}, None)
+                for i, part in enumerate(parts):
+                    if i:
+                        await asyncio.sleep(interval)
+                    yield _chunk(completion_id, model, created, {"content": part}, None)
+                yield _chunk(completion_id, model, created, {}, "stop")
+                if include_usage:
+                    final = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [],
+                        "usage": usage,
+                    }
+                    yield b"data: " + fastjson.dumps(final) + b"\n\n"
+                yield b"data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(ttft + interval * (len(parts) - 1))
+        text = "".join(parts)
+        completion = {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": usage,
+        }
+        return Response(fastjson.dumps(completion), media_type="application/json")
+
+    return app
@@ -0,0 +1,321 @@
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any
+
+# Every synthetic resource carries this meta.lastUpdated, so cache
+# revalidation (``_lastUpdated=gt...``) always reports "unchanged"
+LAST_UPDATED = "2024-06-01T00:00:00Z"
+
+_TODAY = date(2024, 6, 1)
+
+_GIVEN = ("James", "Maria", "Robert", "Linda", "Wei", "Aisha", "Carlos", "Priya", "Olga")
+_FAMILY = ("Smith", "Garcia", "Chen", "Okafor", "Novak", "Patel", "Kim", "Müller", "Silva")
+_CITIES = (("Boston", "MA"), ("Austin", "TX"), ("Denver", "CO"), ("Seattle", "WA"))
+
+# (SNOMED code, display)
+_CONDITIONS = (
+    ("44054006", "Type 2 diabetes mellitus"),
+    ("38341003", "Essential hypertension"),
+    ("55822004", "Hyperlipidemia"),
+    ("195967001", "Asthma"),
+    ("13645005", "Chronic obstructive pulmonary disease"),
+    ("49436004", "Atrial fibrillation"),
+    ("431855005", "Chronic kidney disease stage 1"),
+    ("35489007", "Depressive disorder"),
+    ("399211009", "History of myocardial infarction"),
+    ("40055000", "Chronic sinusitis"),
+    ("239873007", "Osteoarthritis of knee"),
+    ("73211009", "Diabetes mellitus"),
+)
+
+# (RxNorm code, display, dose, unit, times per day)
+_MEDICATIONS = (
+    ("860975", "Metformin 500 MG Oral Tablet", 500, "mg", 2),
+    ("314076", "Lisinopril 10 MG Oral Tablet", 10, "mg", 1),
+    ("617314", "Atorvastatin 20 MG Oral Tablet", 20, "mg", 1),
+    ("745679", "Albuterol 90 MCG Inhaler", 2, "puff", 4),
+    ("855332", "Warfarin 5 MG Oral Tablet", 5, "mg", 1),
+    ("310798", "Hydrochlorothiazide 25 MG Oral Tablet", 25, "mg", 1),
+    ("312938", "Sertraline 50 MG Oral Tablet", 50, "mg", 1),
+    ("198211", "Simvastatin 40 MG Oral Tablet", 40, "mg", 1),
+    ("197361", "Amlodipine 5 MG Oral Tablet", 5, "mg", 1),
+    ("308136", "Amoxicillin 500 MG Oral Capsule", 500, "mg", 3),
+)
+
+# (LOINC code, display, category, unit, low, high)
+_TESTS = (
+    ("8867-4", "Heart rate", "vital-signs", "/min", 60, 100),
+    ("8480-6", "Systolic blood pressure", "vital-signs", "mm[Hg]", 90, 130),
+    ("8462-4", "Diastolic blood pressure", "vital-signs", "mm[Hg]", 60, 85),
+    ("8310-5", "Body temperature", "vital-signs", "Cel", 36.1, 37.2),
+    ("9279-1", "Respiratory rate", "vital-signs", "/min", 12, 20),
+    ("59408-5", "Oxygen saturation", "vital-signs", "%", 94, 100),
+    ("29463-7", "Body weight", "vital-signs", "kg", 50, 100),
+    ("2339-0", "Glucose", "laboratory", "mg/dL", 70, 99),
+    ("4548-4", "Hemoglobin A1c", "laboratory", "%", 4.0, 5.6),
+    ("2160-0", "Creatinine", "laboratory", "mg/dL", 0.6, 1.3),
+    ("2951-2", "Sodium", "laboratory", "mmol/L", 135, 145),
+    ("2823-3", "Potassium", "laboratory", "mmol/L", 3.5, 5.1),
+    ("2093-3", "Total cholesterol", "laboratory", "mg/dL", 125, 200),
+    ("2085-9", "HDL cholesterol", "laboratory", "mg/dL", 40, 80),
+    ("13457-7", "LDL cholesterol", "laboratory", "mg/dL", 50, 130),
+    ("718-7", "Hemoglobin", "laboratory", "g/dL", 12.0, 17.5),
+    ("6690-2", "Leukocytes", "laboratory", "10*3/uL", 4.5, 11.0),
+    ("777-3", "Platelets", "laboratory", "10*3/uL", 150, 400),
+    ("1742-6", "Alanine aminotransferase", "laboratory", "U/L", 7, 56),
+    ("6301-6", "INR", "laboratory", "{INR}", 0.8, 1.1),
+)
+
+# (SNOMED code, display, category, reaction)
+_ALLERGENS = (
+    ("91936005", "Penicillin", "medication", "Hives"),
+    ("300913006", "Shellfish", "food", "Anaphylaxis"),
+    ("91935009", "Peanut", "food", "Swelling of lips"),
+    ("418689008", "Grass pollen", "environment", "Rhinitis"),
+    ("294505008", "Amoxicillin", "medication", "Rash"),
+    ("232347008", "Dander", "environment", "Wheezing"),
+)
+
+
+@dataclass
+class PatientProfile:
+    """Shape of one synthetic patient record.
+
+    ``narrative_bytes`` pads every resource with a ``text.div`` narrative of
+    that size, for testing payload size (and ``_elements`` projection).
+    """
+
+    conditions: int = 12
+    medications: int = 15
+    observations: int = 200
+    allergies: int = 3
+    observation_tests: int = 12
+    abnormal_rate: float = 0.15
+    narrative_bytes: int = 0
+
+
+def _codeable(system: str, code: str, display: str) -> dict[str, Any]:
+    return {"coding": [{"system": system, "code": code, "display": display}], "text": display}
+
+
+def _status(code: str, system: str) -> dict[str, Any]:
+    return {"coding": [{"system": system, "code": code}]}
+
+
+def _days_ago(rng: random.Random, max_days: int) -> date:
+    return _TODAY - timedelta(days=rng.randrange(max_days))
+
+
+class _Builder:
+    def __init__(self, patient_id: str, profile: PatientProfile, seed: int):
+        self.patient_id = patient_id
+        self.profile = profile
+        self.rng = random.Random(f"{seed}:{patient_id}")
+        self.narrative = (
+            {"status": "generated", "div": f"<div>{'x' * profile.narrative_bytes}</div>"}
+            if profile.narrative_bytes
+            else None
+        )
+
+    def resource(self, resource_type: str, index: int, **fields: Any) -> dict[str, Any]:
+        resource = {
+            "resourceType": resource_type,
+            "id": f"{self.patient_id}-{resource_type.lower()}-{index}",
+            "meta": {"versionId": "1", "lastUpdated": LAST_UPDATED},
+        }
+        if self.narrative:
+            resource["text"] = self.narrative
+        if resource_type != "Patient":
+            resource["subject" if resource_type != "AllergyIntolerance" else "patient"] = {
+                "reference": f"Patient/{self.patient_id}"
+            }
+        resource.update(fields)
+        return resource
+
+    def patient(self) -> dict[str, Any]:
+        rng = self.rng
+        city, state = rng.choice(_CITIES)
+        given = rng.choice(_GIVEN)
+        family = rng.choice(_FAMILY)
+        birth = _TODAY - timedelta(days=rng.randrange(20 * 365, 90 * 365))
+        return self.resource(
+            "Patient",
+            0,
+            id=self.patient_id,
+            name=[{"use": "official", "family": family, "given": [given]}],
+            gender=rng.choice(("male", "female")),
+            birthDate=birth.isoformat(),
+            address=[
+                {
+                    "line": [f"{rng.randrange(1, 999)} Main St"],
+                    "city": city,
+                    "state": state,
+                    "postalCode": f"{rng.randrange(10000, 99999)}",
+                }
+            ],
+            telecom=[
+                {"system": "phone", "value": f"555-{rng.randrange(1000, 9999)}", "use": "home"},
+                {"system": "email", "value": f"{given.lower()}.{family.lower()}@example.org"},
+            ],
+            communication=[{"language": _codeable("urn:ietf:bcp:47", "en", "English")}],
+            maritalStatus=_codeable(
+                "http://terminology.hl7.org/CodeSystem/v3-MaritalStatus", "M", "Married"
+            ),
+        )
+
+    def conditions(self) -> list[dict[str, Any]]:
+        rng = self.rng
+        resources = []
+        for i in range(self.profile.conditions):
+            code, display = _CONDITIONS[i % len(_CONDITIONS)]
+            active = rng.random() < 0.7
+            onset = _days_ago(rng, 3650)
+            condition = self.resource(
+                "Condition",
+                i,
+                code=_codeable("http://snomed.info/sct", code, display),
+                clinicalStatus=_status(
+                    "active" if active else "resolved",
+                    "http://terminology.hl7.org/CodeSystem/condition-clinical",
+                ),
+                verificationStatus=_status(
+                    "confirmed", "http://terminology.hl7.org/CodeSystem/condition-ver-status"
+                ),
+                category=[
+                    _codeable(
+                        "http://terminology.hl7.org/CodeSystem/condition-category",
+                        "problem-list-item",
+                        "Problem List Item",
+                    )
+                ],
+                onsetDateTime=onset.isoformat(),
+                recordedDate=onset.isoformat(),
+            )
+            if not active:
+                condition["abatementDateTime"] = (onset + timedelta(days=90)).isoformat()
+            resources.append(condition)
+        return resources
+
+    def medications(self) -> list[dict[str, Any]]:
+        rng = self.rng
+        resources = []
+        for i in range(self.profile.medications):
+            code, display, dose, unit, per_day = _MEDICATIONS[i % len(_MEDICATIONS)]
+            _, reason = rng.choice(_CONDITIONS)
+            resources.append(
+                self.resource(
+                    "MedicationRequest",
+                    i,
+                    status=rng.choice(("active", "active", "completed", "stopped")),
+                    intent="order",
+                    medicationCodeableConcept=_codeable(
+                        "http://www.nlm.nih.gov/research/umls/rxnorm", code, display
+                    ),
+                    authoredOn=_days_ago(rng, 1825).isoformat(),
+                    reasonCode=[{"text": reason}],
+                    dosageInstruction=[
+                        {
+                            "text": f"{dose} {unit} {per_day} times daily",
+                            "timing": {
+                                "repeat": {"frequency": per_day, "period": 1, "periodUnit": "d"}
+                            },
+                            "route": _codeable("http://snomed.info/sct", "26643006", "Oral"),
+                            "doseAndRate": [{"doseQuantity": {"value": dose, "unit": unit}}],
+                        }
+                    ],
+                )
+            )
+        return resources
+
+    def observations(self) -> list[dict[str, Any]]:
+        rng = self.rng
+        profile = self.profile
+        tests = _TESTS[: max(1, min(profile.observation_tests, len(_TESTS)))]
+        resources = []
+        for i in range(profile.observations):
+            code, display, category, unit, low, high = tests[i % len(tests)]
+            span = high - low
+            if rng.random() < profile.abnormal_rate:
+                value = high + span * rng.uniform(0.05, 0.5)
+                flag = ("H", "High")
+            else:
+                value = low + span * rng.uniform(0.1, 0.9)
+                flag = ("N", "Normal")
+            precision = 0 if isinstance(low, int) and isinstance(high, int) else 1
+            resources.append(
+                self.resource(
+                    "Observation",
+                    i,
+                    status="final",
+                    category=[
+                        _codeable(
+                            "http://terminology.hl7.org/CodeSystem/observation-category",
+                            category,
+                            category.replace("-", " ").title(),
+                        )
+                    ],
+                    code=_codeable("http://loinc.org", code, display),
+                    effectiveDateTime=f"{_days_ago(rng, 1095).isoformat()}T09:00:00Z",
+                    valueQuantity={"value": round(value, precision), "unit": unit},
+                    interpretation=[
+                        _codeable(
+                            "http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation",
+                            *flag,
+                        )
+                    ],
+                    referenceRange=[
+                        {"low": {"value": low, "unit": unit}, "high": {"value": high, "unit": unit}}
+                    ],
+                )
+            )
+        return resources
+
+    def allergies(self) -> list[dict[str, Any]]:
+        rng = self.rng
+        resources = []
+        for i in range(self.profile.allergies):
+            code, display, category, reaction = _ALLERGENS[i % len(_ALLERGENS)]
+            resources.append(
+                self.resource(
+                    "AllergyIntolerance",
+                    i,
+                    code=_codeable("http://snomed.info/sct", code, display),
+                    clinicalStatus=_status(
+                        "active",
+                        "http://terminology.hl7.org/CodeSystem/allergyintolerance-clinical",
+                    ),
+                    verificationStatus=_status(
+                        "confirmed",
+                        "http://terminology.hl7.org/CodeSystem/allergyintolerance-verification",
+                    ),
+                    type="allergy",
+                    category=[category],
+                    criticality=rng.choice(("low", "high")),
+                    onsetDateTime=_days_ago(rng, 7300).isoformat(),
+                    reaction=[
+                        {
+                            "manifestation": [{"text": reaction}],
+                            "severity": rng.choice(("mild", "moderate", "severe")),
+                        }
+                    ],
+                )
+            )
+        return resources
+
+
+def generate_patient(
+    patient_id: str, profile: PatientProfile | None = None, seed: int = 0
+) -> dict[str, list[dict[str, Any]]]:
+    """Synthetic FHIR R4 resources for one patient, keyed by resource type.
+
+    Output is deterministic for a given ``patient_id``, ``profile`` and ``seed``.
+    """
+    builder = _Builder(patient_id, profile or PatientProfile(), seed)
+    return {
+        "Patient": [builder.patient()],
+        "Condition": builder.conditions(),
+        "MedicationRequest": builder.medications(),
+        "Observation": builder.observations(),
+        "AllergyIntolerance": builder.allergies(),
+    }
@@ -0,0 +1,4 @@
+from .scheduler import SectionResult, SectionScheduler
+from .singleflight import SingleFlight
+
+__all__ = ["SectionScheduler", "SectionResult", "SingleFlight"]
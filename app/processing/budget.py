@@ -0,0 +1,122 @@
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.fhir.resources import RecordTable
+from app.llm.prompts import SECTION_PROMPTS, PromptAssembler, SectionType
+from app.llm.tokens import TokenCounter
+from app.processing.compaction import is_abnormal
+
+# Sections trimmed first to last when the prompts exceed the budget
+TRIM_ORDER = ("Observation", "MedicationRequest", "Condition", "Patient", "AllergyIntolerance")
+
+ACTIVE_STATUSES = frozenset({"active", "recurrence", "relapse", "on-hold", "draft"})
+
+
+@dataclass
+class BudgetReport:
+    """Token accounting for one patient's section prompts."""
+
+    tokenizer: str
+    budget: int
+    prompt_tokens: int = 0
+    section_tokens: dict[str, int] = field(default_factory=dict)
+    trimmed_rows: dict[str, int] = field(default_factory=dict)
+
+
+def _status_then_date(status_column: str, date_columns: tuple[str, ...]):
+    """Inactive rows before active ones, oldest first within each."""
+
+    def keys(table: RecordTable) -> list[Any]:
+        statuses = table.column(status_column)
+        dates = [table.column(name) for name in date_columns if name in table.columns]
+        return [
+            (
+                str(statuses[i] or "").lower() in ACTIVE_STATUSES,
+                next((str(column[i]) for column in dates if column[i]), ""),
+            )
+            for i in range(len(table))
+        ]
+
+    return keys
+
+
+def _observation_keys(table: RecordTable) -> list[Any]:
+    """Normal results before abnormal ones, oldest first within each."""
+    interpretations = table.column("interpretation")
+    dates = table.column("effective_date")
+    return [(is_abnormal(interp), date or "") for interp, date in zip(interpretations, dates)]
+
+
+# Sort keys per resource type; rows with the lowest keys are trimmed first
+ROW_PRIORITY: dict[str, Callable[[RecordTable], list[Any]]] = {
+    "Observation": _observation_keys,
+    "MedicationRequest": _status_then_date("status", ("prescribed_date",)),
+    "Condition": _status_then_date("clinical_status", ("recorded_date", "onset_date")),
+    "AllergyIntolerance": _status_then_date("clinical_status", ("onset_date",)),
+}
+
+
+class PromptBudget:
+    """Fits section prompts into a total input token budget.
+
+    Each prompt costs its template and table header plus one line per row.
+    While the total is over budget, rows are dropped section by section in
+    ``TRIM_ORDER`` (allergies last), lowest priority first: normal before
+    abnormal observations, inactive before active medications, conditions
+    and allergies, oldest first within each.
+    """
+
+    def __init__(self, counter: TokenCounter, budget: int):
+        self.counter = counter
+        self.budget = budget
+        self.assembler = PromptAssembler()
+
+    def build_prompts(
+        self, tables: dict[str, RecordTable]
+    ) -> tuple[dict[SectionType, str], BudgetReport]:
+        sections = {
+            resource_type: section_type
+            for resource_type, section_type in PromptAssembler.RESOURCE_TO_SECTION.items()
+            if resource_type in tables
+        }
+        fixed: dict[str, int] = {}
+        row_tokens: dict[str, list[int]] = {}
+        for resource_type, section_type in sections.items():
+            lines = list(tables[resource_type].markdown_lines())
+            header = "\n".join(lines[:2]) or "*No data available for this section*"
+            fixed[resource_type] = self.counter.count(
+                SECTION_PROMPTS[section_type].format(data_table=header)
+            )
+            # +1 for the newline joining the row to the table
+            row_tokens[resource_type] = [self.counter.count(line) + 1 for line in lines[2:]]
+
+        total = sum(fixed.values()) + sum(sum(tokens) for tokens in row_tokens.values())
+        dropped: dict[str, set[int]] = {resource_type: set() for resource_type in sections}
+        for resource_type in TRIM_ORDER:
+            if total <= self.budget:
+                break
+            if resource_type not in sections or not row_tokens[resource_type]:
+                continue
+            table = tables[resource_type]
+            priority = ROW_PRIORITY.get(resource_type)
+            keys = priority(table) if priority else [0] * len(table)
+            for i in sorted(range(len(table)), key=keys.__getitem__):
+                if total <= self.budget:
+                    break
+                dropped[resource_type].add(i)
+                total -= row_tokens[resource_type][i]
+
+        prompts: dict[SectionType, str] = {}
+        report = BudgetReport(tokenizer=self.counter.tokenizer, budget=self.budget)
+        for resource_type, section_type in sections.items():
+            table = tables[resource_type]
+            omitted = dropped[resource_type]
+            if omitted:
+                table = table.take(i for i in range(len(table)) if i not in omitted)
+                report.trimmed_rows[section_type.value] = len(omitted)
+            prompt = self.assembler.build_section_prompt(section_type, table, omitted=len(omitted))
+            prompts[section_type] = prompt
+            report.section_tokens[section_type.value] = self.counter.count(prompt)
+        report.prompt_tokens = sum(report.section_tokens.values())
+        return prompts, report
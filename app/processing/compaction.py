@@ -0,0 +1,121 @@
+import math
+import statistics
+from typing import Any
+
+from app.fhir.resources import RecordTable
+
+# Interpretations that don't mark a result as abnormal (compared lowercased)
+NORMAL_INTERPRETATIONS = frozenset({"n", "normal", "neg", "negative", "nd", "not detected"})
+
+# Relative change across the window below which a series counts as stable
+TREND_THRESHOLD = 0.05
+
+COMPACT_COLUMNS = (
+    "observation_name",
+    "loinc_code",
+    "category",
+    "row",
+    "value",
+    "unit",
+    "effective_date",
+    "interpretation",
+    "reference_range",
+    "count",
+    "min",
+    "max",
+    "trend",
+)
+
+
+def is_abnormal(interpretation: str | None) -> bool:
+    """Whether an extracted interpretation flags the result as abnormal (H, L, A, ...)."""
+    return bool(interpretation) and interpretation.strip().lower() not in NORMAL_INTERPRETATIONS
+
+
+def compact_observations(table: RecordTable, window: int = 10) -> RecordTable:
+    """Reduce an Observation table to one row per test.
+
+    Observations are grouped by ``loinc_code`` (falling back to the name for
+    uncoded ones). Each group keeps its latest result with interpretation and
+    reference range, plus the result ``count`` and ``min``/``max``/``trend``
+    of the last ``window`` numeric values. Earlier results with an abnormal
+    interpretation are always kept, listed under their test as
+    ``earlier abnormal`` rows. The output grows with the number of distinct
+    tests rather than the number of results.
+    """
+    if table.empty:
+        return table
+
+    names = table.column("observation_name")
+    codes = table.column("loinc_code")
+    categories = table.column("category")
+    values = table.column("value")
+    units = table.column("unit")
+    dates = table.column("effective_date")
+    interpretations = table.column("interpretation")
+    ranges = table.column("reference_range")
+    numbers = [_number(value) for value in values]
+
+    groups: dict[str, list[int]] = {}
+    for i, (code, name) in enumerate(zip(codes, names)):
+        groups.setdefault(code or name or "", []).append(i)
+
+    def result_row(i: int, row: str) -> dict[str, Any]:
+        return {
+            "observation_name": names[i],
+            "loinc_code": codes[i],
+            "category": categories[i],
+            "row": row,
+            "value": values[i],
+            "unit": units[i],
+            "effective_date": dates[i],
+            "interpretation": interpretations[i],
+            "reference_range": ranges[i],
+        }
+
+    compacted = RecordTable(COMPACT_COLUMNS)
+    ordered = sorted(groups.values(), key=lambda g: (categories[g[0]] or "", names[g[0]] or ""))
+    for indices in ordered:
+        indices.sort(key=lambda i: dates[i] or "")
+        latest = indices[-1]
+        series = [numbers[i] for i in indices if numbers[i] is not None][-window:]
+        compacted.append(
+            {
+                **result_row(latest, "latest"),
+                "count": len(indices),
+                "min": _format_number(min(series)) if series else None,
+                "max": _format_number(max(series)) if series else None,
+                "trend": _trend(series),
+            }
+        )
+        for i in reversed(indices[:-1]):
+            if is_abnormal(interpretations[i]):
+                # Code, category and range repeat the test's latest row above
+                earlier = result_row(i, "earlier abnormal")
+                earlier.update(loinc_code=None, category=None, reference_range=None)
+                compacted.append(earlier)
+    return compacted
+
+
+def _number(value: Any) -> float | None:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _format_number(number: float) -> str:
+    return f"{number:g}"
+
+
+def _trend(series: list[float]) -> str | None:
+    """``rising``/``falling``/``stable`` from the least-squares slope over the series."""
+    if len(series) < 2:
+        return None
+    slope = statistics.linear_regression(range(len(series)), series).slope
+    change = slope * (len(series) - 1)
+    scale = abs(statistics.fmean(series)) or (max(series) - min(series)) or 1.0
+    if abs(change) <= TREND_THRESHOLD * scale:
+        return "stable"
+    return "rising" if change > 0 else "falling"
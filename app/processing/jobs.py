@@ -0,0 +1,280 @@
+import asyncio
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import httpx
+from fastapi import HTTPException
+
+from app import tracing
+from app.config import get_settings
+from app.fhir.bulk import BulkDataIndex, BulkExportClient
+from app.fhir.cache import FHIRCache
+from app.fhir.client import FHIRClient
+from app.fhir.transport import FHIRTransport
+from app.llm.cache import LLMCache
+from app.llm.client import LLMClient
+from app.llm.ratelimit import LLMRateLimiter, Priority
+from app.processing.pipeline import (
+    RESOURCE_HANDLERS,
+    PatientData,
+    extract_patient_data_async,
+    fetch_patient_data,
+    summarize_patient_data,
+)
+
+
+@dataclass
+class BatchJob:
+    """A cohort summarization job and the results collected so far."""
+
+    job_id: str
+    patient_ids: list[str]
+    status: str = "queued"
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: datetime | None = None
+    results: list[dict[str, Any]] = field(default_factory=list)
+    failed: int = 0
+    error: str | None = None
+    _updated: asyncio.Condition = field(default_factory=asyncio.Condition, repr=False)
+    _task: asyncio.Task | None = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "cancelled", "failed")
+
+    async def add_result(self, result: dict[str, Any]) -> None:
+        self.results.append(result)
+        if result["status"] != "ok":
+            self.failed += 1
+        async with self._updated:
+            self._updated.notify_all()
+
+    async def finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = datetime.utcnow()
+        async with self._updated:
+            self._updated.notify_all()
+
+    async def iter_results(self) -> AsyncIterator[dict[str, Any]]:
+        """Yield results as they arrive until the job finishes."""
+        index = 0
+        while True:
+            while index < len(self.results):
+                yield self.results[index]
+                index += 1
+            if self.done:
+                return
+            async with self._updated:
+                await self._updated.wait_for(lambda: len(self.results) > index or self.done)
+
+
+class BatchJobManager:
+    """Runs cohort summary jobs through a bounded async worker pool.
+
+    Each job gets ``workers`` workers. FHIR fetches and individual LLM
+    requests are gated by separate process-wide semaphores so a large cohort
+    can't flood either the FHIR server or the LLM provider, regardless of how
+    many jobs are running. LLM requests are admitted at batch priority, behind
+    interactive and MCP traffic.
+
+    Bulk jobs read patients from FHIR Bulk Data NDJSON files (an existing
+    export under ``bulk_data_dir`` or a fresh ``$export`` kick-off) instead of
+    issuing REST queries per patient.
+    """
+
+    def __init__(
+        self,
+        transport: FHIRTransport | None = None,
+        fhir_cache: FHIRCache | None = None,
+        llm_cache: LLMCache | None = None,
+        llm_limiter: LLMRateLimiter | None = None,
+    ):
+        settings = get_settings()
+        self.transport = transport
+        self.fhir_cache = fhir_cache
+        self.llm_cache = llm_cache
+        self.llm_limiter = llm_limiter
+        self.workers = max(1, settings.batch_workers)
+        self.max_patients = settings.batch_max_patients
+        self.job_ttl = settings.batch_job_ttl
+        self.bulk_data_dir = settings.bulk_data_dir
+        self._fhir_slots = asyncio.Semaphore(max(1, settings.batch_fhir_concurrency))
+        self._llm_slots = asyncio.Semaphore(max(1, settings.batch_llm_concurrency))
+        self._jobs: dict[str, BatchJob] = {}
+
+    def submit(self, patient_ids: list[str]) -> BatchJob:
+        """Create a job and start processing it in the background."""
+        if len(patient_ids) > self.max_patients:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch exceeds {self.max_patients} patients",
+            )
+        self._expire_finished()
+
+        # Preserve order, drop duplicate IDs
+        job = BatchJob(job_id=uuid.uuid4().hex, patient_ids=list(dict.fromkeys(patient_ids)))
+        self._jobs[job.job_id] = job
+        job._task = asyncio.create_task(self._run(job, self._summarize))
+        return job
+
+    def submit_bulk(self, export_dir: str | None = None, group_id: str | None = None) -> BatchJob:
+        """Create a job over Bulk Data NDJSON files and start it in the background.
+
+        ``export_dir`` names an existing export relative to ``bulk_data_dir``;
+        without it a new ``$export`` (optionally for ``group_id``) is kicked off
+        against the FHIR server and downloaded first.
+        """
+        if not self.bulk_data_dir:
+            raise HTTPException(status_code=400, detail="Bulk Data ingestion is not configured")
+        self._expire_finished()
+
+        root = Path(self.bulk_data_dir).resolve()
+        job = BatchJob(job_id=uuid.uuid4().hex, patient_ids=[])
+        if export_dir:
+            directory = (root / export_dir).resolve()
+            if not directory.is_relative_to(root) or not directory.is_dir():
+                raise HTTPException(status_code=404, detail=f"Export {export_dir} not found")
+        else:
+            directory = root / job.job_id
+        resource_types = list(RESOURCE_HANDLERS.keys())
+        index: BulkDataIndex | None = None
+
+        async def prepare() -> list[str]:
+            nonlocal index
+            if not export_dir:
+                await self._export(directory, resource_types, group_id)
+            index = await asyncio.to_thread(BulkDataIndex.build, directory, resource_types)
+            return index.patient_ids
+
+        async def summarize(patient_id: str) -> dict[str, Any]:
+            async def load() -> PatientData:
+                resources = await asyncio.to_thread(index.read_patient, patient_id)
+                return await extract_patient_data_async(patient_id, resources)
+
+            return await self._summarize_data(patient_id, load)
+
+        self._jobs[job.job_id] = job
+        job._task = asyncio.create_task(self._run(job, summarize, prepare))
+        return job
+
+    async def _export(
+        self, directory: Path, resource_types: list[str], group_id: str | None
+    ) -> None:
+        if self.transport is not None:
+            await BulkExportClient(self.transport.client).export(
+                directory, resource_types, group_id
+            )
+            return
+        async with httpx.AsyncClient(timeout=get_settings().fhir_timeout) as client:
+            await BulkExportClient(client).export(directory, resource_types, group_id)
+
+    def get(self, job_id: str) -> BatchJob:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Batch job {job_id} not found")
+        return job
+
+    async def cancel(self, job_id: str) -> BatchJob:
+        job = self.get(job_id)
+        if job._task and not job._task.done():
+            job._task.cancel()
+            await asyncio.gather(job._task, return_exceptions=True)
+        return job
+
+    async def aclose(self) -> None:
+        for job_id in list(self._jobs):
+            await self.cancel(job_id)
+
+    def _expire_finished(self) -> None:
+        now = datetime.utcnow()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at and (now - job.finished_at).total_seconds() > self.job_ttl:
+                del self._jobs[job_id]
+
+    async def _run(
+        self,
+        job: BatchJob,
+        summarize: Callable[[str], Awaitable[dict[str, Any]]],
+        prepare: Callable[[], Awaitable[list[str]]] | None = None,
+    ) -> None:
+        queue: asyncio.Queue[str] = asyncio.Queue()
+
+        async def worker() -> None:
+            while True:
+                try:
+                    patient_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await job.add_result(await summarize(patient_id))
+
+        # A job always ends finished, whichever phase it is cancelled or fails in
+        try:
+            if prepare is not None:
+                job.status = "preparing"
+                job.patient_ids = await prepare()
+            for patient_id in job.patient_ids:
+                queue.put_nowait(patient_id)
+
+            job.status = "running"
+            workers = [asyncio.create_task(worker()) for _ in range(self.workers)]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+        except asyncio.CancelledError:
+            await job.finish("cancelled")
+            raise
+        except Exception as e:
+            job.error = str(e)
+            await job.finish("failed")
+            return
+        await job.finish("completed")
+
+    async def _summarize(self, patient_id: str) -> dict[str, Any]:
+        """Fetch a patient over REST and summarize them."""
+
+        async def load() -> PatientData:
+            async with self._fhir_slots:
+                async with FHIRClient(
+                    http_client=self.transport.client if self.transport else None,
+                    cache=self.fhir_cache,
+                    batch_unsupported=(
+                        self.transport.batch_unsupported if self.transport else None
+                    ),
+                ) as fhir_client:
+                    return await fetch_patient_data(patient_id, fhir_client)
+
+        return await self._summarize_data(patient_id, load)
+
+    async def _summarize_data(
+        self, patient_id: str, load: Callable[[], Awaitable[PatientData]]
+    ) -> dict[str, Any]:
+        """Load one patient's data and summarize it, capturing failures as results."""
+        started_at = time.time()
+        try:
+            # Each patient is its own trace rather than part of the request that started the job
+            with tracing.span("batch.patient", new_trace=True, patient_id=patient_id):
+                data = await load()
+                data.started_at = started_at
+                llm = LLMClient(
+                    cache=self.llm_cache,
+                    limiter=self.llm_limiter,
+                    priority=Priority.BATCH,
+                    slots=self._llm_slots,
+                )
+                summary = await summarize_patient_data(data, llm)
+        except HTTPException as e:
+            return {"patient_id": patient_id, "status": "error", "detail": e.detail}
+        except Exception as e:
+            return {"patient_id": patient_id, "status": "error", "detail": str(e)}
+        return {
+            "patient_id": patient_id,
+            "status": "ok",
+            "summary": summary.model_dump(mode="json"),
+        }
@@ -0,0 +1,145 @@
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from app import metrics, tracing
+
+T = TypeVar("T")
+
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+
+
+class Offloader:
+    """Runs CPU-bound pipeline stages off the event loop, sized by their input.
+
+    Work on fewer than ``min_items`` items runs inline, where an executor
+    hop would cost more than it saves. Larger work goes to a thread pool so
+    the loop keeps serving other requests while it runs. Stages that allow
+    it (``process_ok``) go to a process pool from ``process_min_items`` on,
+    so big payloads don't hold the GIL either; their function, arguments
+    and result must pickle, and spans and metrics recorded inside are lost.
+    ``workers=0`` runs everything inline; ``process_workers=0`` disables
+    the process pool. ``initializer(*initargs)`` runs once in each worker
+    process, e.g. to load a tokenizer before the first task.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        min_items: int = 500,
+        process_workers: int = 0,
+        process_min_items: int = 5000,
+        initializer: Callable[..., Any] | None = None,
+        initargs: tuple = (),
+    ):
+        self.workers = max(0, workers)
+        self.min_items = min_items
+        self.process_workers = max(0, process_workers)
+        self.process_min_items = process_min_items
+        self.initializer = initializer
+        self.initargs = initargs
+        self._threads = (
+            ThreadPoolExecutor(self.workers, thread_name_prefix="offload") if self.workers else None
+        )
+        self._processes: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._counts = {INLINE: 0, THREAD: 0, PROCESS: 0}
+        self._in_flight = 0
+
+    def target(self, items: int, process_ok: bool = False) -> str:
+        """Where work on ``items`` items runs: inline, thread or process."""
+        if process_ok and self.process_workers and items >= self.process_min_items:
+            return PROCESS
+        if self._threads is not None and items >= self.min_items:
+            return THREAD
+        return INLINE
+
+    async def run(
+        self,
+        stage: str,
+        items: int,
+        func: Callable[..., T],
+        *args: Any,
+        process_ok: bool = False,
+    ) -> T:
+        """Call ``func(*args)`` inline or in an executor, depending on ``items``."""
+        target = self.target(items, process_ok)
+        with self._lock:
+            self._counts[target] += 1
+            self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            with tracing.span("offload", stage=stage, target=target, items=items):
+                if target == INLINE:
+                    return func(*args)
+                loop = asyncio.get_running_loop()
+                if target == PROCESS:
+                    return await loop.run_in_executor(self._process_pool(), func, *args)
+                # Threads run in a copy of the context so spans nest under this one
+                call = functools.partial(contextvars.copy_context().run, func, *args)
+                return await loop.run_in_executor(self._threads, call)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            metrics.OFFLOAD_SECONDS.observe(
+                time.perf_counter() - started, stage=stage, target=target
+            )
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        # Spawned, not forked: the parent has a running event loop and threads
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.initializer,
+                    initargs=self.initargs,
+                )
+            return self._processes
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "min_items": self.min_items,
+                "process_workers": self.process_workers,
+                "process_min_items": self.process_min_items,
+                "in_flight": self._in_flight,
+                "runs": dict(self._counts),
+            }
+
+    def shutdown(self) -> None:
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            # Joined so the workers' semaphores are released before exit
+            self._processes.shutdown(wait=True, cancel_futures=True)
+
+
+_offloader: Offloader | None = None
+
+
+def set_offloader(offloader: Offloader | None) -> None:
+    """Install the process-wide offloader (``None`` runs everything inline)."""
+    global _offloader
+    previous, _offloader = _offloader, offloader
+    if previous is not None and previous is not offloader:
+        previous.shutdown()
+
+
+async def run(
+    stage: str, items: int, func: Callable[..., T], *args: Any, process_ok: bool = False
+) -> T:
+    """Run ``func(*args)`` through the installed offloader, or inline without one."""
+    offloader = _offloader
+    if offloader is None:
+        return func(*args)
+    return await offloader.run(stage, items, func, *args, process_ok=process_ok)
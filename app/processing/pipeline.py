@@ -0,0 +1,523 @@
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException
+
+from app import metrics, tracing
+from app.config import get_settings
+from app.fhir.client import FetchStats, FHIRClient
+from app.fhir.resources import (
+    AllergyHandler,
+    ConditionHandler,
+    MedicationRequestHandler,
+    ObservationHandler,
+    PatientHandler,
+    RecordTable,
+)
+from app.llm.client import LLMCall, LLMClient
+from app.llm.prompts import CombinedOutputParser, PromptAssembler, SectionType
+from app.llm.tokens import get_token_counter
+from app.processing import offload
+from app.processing.budget import BudgetReport, PromptBudget
+from app.processing.compaction import compact_observations
+from app.processing.scheduler import SectionResult, SectionScheduler
+from app.processing.templates import render_small_sections
+from app.schemas.requests import SummaryMode
+from app.schemas.responses import (
+    DataAvailability,
+    FHIRFetchTiming,
+    LLMCallTiming,
+    PatientSummaryResponse,
+    SchedulerStats,
+    SectionSource,
+    SectionSummaries,
+    StageTimings,
+    TokenBudgetStats,
+)
+
+# Resource handlers mapping
+RESOURCE_HANDLERS = {
+    "Patient": PatientHandler(),
+    "Condition": ConditionHandler(),
+    "MedicationRequest": MedicationRequestHandler(),
+    "Observation": ObservationHandler(),
+    "AllergyIntolerance": AllergyHandler(),
+}
+
+# Elements each handler reads, requested from the server via _elements
+RESOURCE_ELEMENTS = {
+    resource_type: handler.elements for resource_type, handler in RESOURCE_HANDLERS.items()
+}
+
+
+@dataclass
+class PipelineTimings:
+    """Time spent in the stages before the LLM calls."""
+
+    # Empty when the data did not come from the FHIR REST API (e.g. Bulk Data)
+    fhir: dict[str, FetchStats] = field(default_factory=dict)
+    extraction_ms: dict[str, float] = field(default_factory=dict)
+    prompt_build_ms: float = 0.0
+
+
+@dataclass
+class PageExtractor:
+    """Extracts search pages into record tables as they arrive.
+
+    Passed to ``FHIRClient.get_patient_resources`` as ``on_page``, so each
+    page is extracted while the next one downloads. A resource type counts
+    as extracted only if its pages add up to everything that was fetched;
+    the rest (the Patient read, cached results, failed searches) is left to
+    ``extract_patient_data``.
+    """
+
+    parts: dict[str, list[RecordTable]] = field(default_factory=dict)
+    extracted: dict[str, int] = field(default_factory=dict)
+    ms: dict[str, float] = field(default_factory=dict)
+
+    async def __call__(self, resource_type: str, resources: list[dict[str, Any]]) -> None:
+        handler = RESOURCE_HANDLERS.get(resource_type)
+        if handler is None:
+            return
+        started = time.perf_counter()
+        with tracing.span("extract.page", resource_type=resource_type) as span:
+            table = await offload.run("extract", len(resources), handler.to_records, resources)
+            span.set(resources=len(resources), rows=len(table))
+        self.ms[resource_type] = (
+            self.ms.get(resource_type, 0.0) + (time.perf_counter() - started) * 1000
+        )
+        self.parts.setdefault(resource_type, []).append(table)
+        self.extracted[resource_type] = self.extracted.get(resource_type, 0) + len(resources)
+
+    def tables(self, resources: dict[str, list[dict[str, Any]]]) -> dict[str, RecordTable]:
+        """Tables for the resource types whose fetched resources were all extracted."""
+        return {
+            resource_type: RecordTable.concat(parts)
+            for resource_type, parts in self.parts.items()
+            if self.extracted[resource_type] == len(resources.get(resource_type, []))
+        }
+
+
+@dataclass
+class PatientData:
+    """Extracted FHIR data for one patient, ready for prompt assembly."""
+
+    patient_id: str
+    tables: dict[str, RecordTable]
+    data_availability: DataAvailability
+    started_at: float = field(default_factory=time.time)
+    timings: PipelineTimings = field(default_factory=PipelineTimings)
+
+
+async def fetch_patient_data(
+    patient_id: str, fhir_client: FHIRClient, started_at: float | None = None
+) -> PatientData:
+    """Fetch all FHIR resources for a patient and extract them into record tables.
+
+    Search pages are extracted as they arrive, overlapping the next page's
+    download; whatever was not extracted that way is extracted at the end.
+    """
+    started_at = started_at or time.time()
+    pages = PageExtractor()
+
+    # Step 1: Fetch all FHIR resources in parallel
+    try:
+        resources = await fhir_client.get_patient_resources(
+            patient_id=patient_id,
+            resource_types=list(RESOURCE_HANDLERS.keys()),
+            elements=RESOURCE_ELEMENTS,
+            on_page=pages,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"FHIR query failed: {str(e)}",
+        )
+    truncated = [rt for rt, was_cut in fhir_client.truncated.items() if was_cut]
+
+    # Check if patient exists
+    if not resources.get("Patient"):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Patient {patient_id} not found in FHIR server",
+        )
+
+    extracted = pages.tables(resources)
+    data = await extract_patient_data_async(
+        patient_id, resources, truncated, started_at, extracted
+    )
+    for resource_type in extracted:
+        data.timings.extraction_ms[resource_type] = pages.ms[resource_type]
+        metrics.EXTRACTION_SECONDS.observe(
+            pages.ms[resource_type] / 1000, resource_type=resource_type
+        )
+    data.timings.fhir = fhir_client.fetch_stats
+    return data
+
+
+async def extract_patient_data_async(
+    patient_id: str,
+    resources: dict[str, list[dict[str, Any]]],
+    truncated: list[str] | None = None,
+    started_at: float | None = None,
+    extracted: dict[str, RecordTable] | None = None,
+) -> PatientData:
+    """``extract_patient_data`` in the offload thread pool for patients with many resources.
+
+    Never in a process: pickling raw resources costs more than extracting them.
+    """
+    extracted = extracted or {}
+    return await offload.run(
+        "extract",
+        sum(len(rs) for rt, rs in resources.items() if rt not in extracted),
+        extract_patient_data,
+        patient_id,
+        resources,
+        truncated,
+        started_at,
+        extracted,
+    )
+
+
+def extract_patient_data(
+    patient_id: str,
+    resources: dict[str, list[dict[str, Any]]],
+    truncated: list[str] | None = None,
+    started_at: float | None = None,
+    extracted: dict[str, RecordTable] | None = None,
+) -> PatientData:
+    """Extract raw FHIR resources (from REST or Bulk Data) into record tables.
+
+    Resource types in ``extracted`` already have their table (e.g. built page
+    by page) and are not extracted again. CPU-bound; async callers use
+    ``extract_patient_data_async``.
+    """
+    # Step 2: Extract resources into record tables
+    tables = {}
+    data_availability = {}
+    timings = PipelineTimings()
+    extracted = extracted or {}
+
+    for resource_type, handler in RESOURCE_HANDLERS.items():
+        if resource_type in extracted:
+            tables[resource_type] = extracted[resource_type]
+            data_availability[resource_type] = not extracted[resource_type].empty
+            continue
+        resource_list = resources.get(resource_type, [])
+        started = time.perf_counter()
+        with tracing.span("extract", resource_type=resource_type) as span:
+            table = handler.to_records(resource_list)
+            span.set(resources=len(resource_list), rows=len(table))
+        elapsed = time.perf_counter() - started
+        timings.extraction_ms[resource_type] = elapsed * 1000
+        metrics.EXTRACTION_SECONDS.observe(elapsed, resource_type=resource_type)
+        tables[resource_type] = table
+        data_availability[resource_type] = not table.empty
+
+    return PatientData(
+        patient_id=patient_id,
+        tables=tables,
+        data_availability=DataAvailability(**data_availability, truncated=truncated or []),
+        started_at=started_at or time.time(),
+        timings=timings,
+    )
+
+
+def build_section_scheduler(llm: LLMClient) -> SectionScheduler:
+    """Section scheduler configured from settings."""
+    settings = get_settings()
+    return SectionScheduler(
+        llm.generate_section_summary,
+        max_concurrency=settings.llm_section_concurrency,
+        timeout=settings.llm_section_timeout,
+        fallback=settings.llm_section_fallback,
+    )
+
+
+def build_section_prompts(
+    data: PatientData,
+) -> tuple[dict[SectionType, str], dict[SectionType, SectionResult], BudgetReport]:
+    """Build section prompts within the token budget.
+
+    Observations are compacted to one row per test first. Empty and small
+    sections (``section_template_max_rows``) are rendered from templates and
+    get no prompt. If the remaining prompts are still over
+    ``llm_prompt_token_budget``, the lowest-priority rows are trimmed.
+    Returns the prompts, the templated section results and the budget report.
+    CPU-bound; async callers use ``build_section_prompts_async``.
+    """
+    settings = get_settings()
+    with tracing.span("prompts.build_sections") as span:
+        tables = data.tables
+        if settings.observation_compaction and "Observation" in tables:
+            tables = {
+                **tables,
+                "Observation": compact_observations(
+                    tables["Observation"], window=settings.observation_trend_window
+                ),
+            }
+        templated = {}
+        if settings.section_templates:
+            rendered = render_small_sections(tables, settings.section_template_max_rows)
+            templated = {
+                section_type: SectionResult(section_type, summary, templated=True)
+                for section_type, summary in rendered.items()
+            }
+            tables = {
+                resource_type: table
+                for resource_type, table in tables.items()
+                if PromptAssembler.RESOURCE_TO_SECTION.get(resource_type) not in templated
+            }
+        budget = PromptBudget(
+            get_token_counter(settings.openai_model), settings.llm_prompt_token_budget
+        )
+        prompts, report = budget.build_prompts(tables)
+        span.set(
+            prompt_tokens=report.prompt_tokens,
+            trimmed_rows=sum(report.trimmed_rows.values()),
+            templated=len(templated),
+        )
+    return prompts, templated, report
+
+
+async def build_section_prompts_async(
+    data: PatientData,
+) -> tuple[dict[SectionType, str], dict[SectionType, SectionResult], BudgetReport]:
+    """``build_section_prompts`` off the event loop for patients with many rows.
+
+    Above the offload thresholds it runs in the thread pool, or for the
+    largest patients in the process pool (record tables pickle cheaply), so
+    its duration is measured where it ran and recorded here.
+    """
+    items = sum(len(table) for table in data.tables.values())
+    result, elapsed = await offload.run(
+        "prompts", items, _timed_section_prompts, data, process_ok=True
+    )
+    data.timings.prompt_build_ms = elapsed * 1000
+    metrics.PROMPT_BUILD_SECONDS.observe(elapsed)
+    return result
+
+
+def _timed_section_prompts(
+    data: PatientData,
+) -> tuple[tuple[dict[SectionType, str], dict[SectionType, SectionResult], BudgetReport], float]:
+    started = time.perf_counter()
+    result = build_section_prompts(data)
+    return result, time.perf_counter() - started
+
+
+def merge_section_results(
+    *results: dict[SectionType, SectionResult],
+) -> dict[SectionType, SectionResult]:
+    """Templated and LLM section results combined, in section order."""
+    merged = {st: result for group in results for st, result in group.items()}
+    return {st: merged[st] for st in PromptAssembler.SECTION_ORDER if st in merged}
+
+
+def resolve_mode(mode: SummaryMode | None) -> SummaryMode:
+    """The requested summary mode, or the configured default."""
+    return mode or SummaryMode(get_settings().summary_mode)
+
+
+async def summarize_patient_data(
+    data: PatientData, llm: LLMClient, mode: SummaryMode | None = None
+) -> PatientSummaryResponse:
+    """Run the LLM summarization over extracted patient data.
+
+    Two-stage by default; ``SummaryMode.FAST`` makes a single combined call.
+    """
+    if resolve_mode(mode) is SummaryMode.FAST:
+        return await summarize_patient_data_fast(data, llm)
+
+    # Step 3: Build section prompts, rendering empty and small sections directly
+    assembler = PromptAssembler()
+    section_prompts, templated, budget_report = await build_section_prompts_async(data)
+
+    # Step 4: Generate the remaining section summaries concurrently
+    section_results = merge_section_results(
+        templated, await build_section_scheduler(llm).run(section_prompts)
+    )
+    section_summaries = {
+        section_type: result.summary for section_type, result in section_results.items()
+    }
+
+    # Step 5: Generate final comprehensive summary once the last section returns
+    final_start = time.perf_counter()
+    final_prompt = assembler.build_final_prompt(section_summaries)
+    final_summary = await llm.generate_final_summary(final_prompt)
+    final_llm_ms = (time.perf_counter() - final_start) * 1000
+
+    # Step 6: Build response
+    return build_summary_response(
+        data,
+        section_results,
+        final_summary,
+        final_llm_ms,
+        budget_report,
+        final_prompt,
+        llm_calls=llm.calls,
+    )
+
+
+async def summarize_patient_data_fast(
+    data: PatientData, llm: LLMClient
+) -> PatientSummaryResponse:
+    """Generate the section summaries and final summary in one LLM call.
+
+    The combined prompt carries every section prompt (within the same token
+    budget) and the templated sections as context; the tagged output is split
+    back into sections.
+    """
+    assembler = PromptAssembler()
+    section_prompts, templated, budget_report = await build_section_prompts_async(data)
+    combined_prompt = assembler.build_combined_prompt(
+        section_prompts, {st: result.summary for st, result in templated.items()}
+    )
+
+    start = time.perf_counter()
+    parser = CombinedOutputParser()
+    parser.feed(await llm.generate_combined_summary(combined_prompt))
+    llm_ms = (time.perf_counter() - start) * 1000
+
+    return build_summary_response(
+        data,
+        merge_section_results(templated, fast_section_results(parser, section_prompts)),
+        parser.summary(),
+        llm_ms,
+        budget_report,
+        combined_prompt,
+        llm_calls=llm.calls,
+        mode=SummaryMode.FAST,
+    )
+
+
+def fast_section_results(
+    parser: CombinedOutputParser, section_prompts: dict[SectionType, str]
+) -> dict[SectionType, SectionResult]:
+    """Section results parsed from single-pass output; missing sections get the fallback."""
+    fallback = get_settings().llm_section_fallback
+    results = {}
+    for section_type in section_prompts:
+        summary = parser.sections.get(section_type)
+        results[section_type] = SectionResult(
+            section_type=section_type,
+            summary=summary or fallback,
+            fallback=not summary,
+            error=None if summary else "missing from the combined output",
+        )
+    return results
+
+
+async def generate_summary(
+    patient_id: str, fhir_client: FHIRClient, llm: LLMClient, mode: SummaryMode | None = None
+) -> PatientSummaryResponse:
+    """Run the FHIR fetch, extraction and LLM pipeline for one patient."""
+    data = await fetch_patient_data(patient_id, fhir_client)
+    return await summarize_patient_data(data, llm, mode)
+
+
+def build_summary_response(
+    data: PatientData,
+    section_results: dict[SectionType, SectionResult],
+    final_summary: str,
+    final_llm_ms: float,
+    budget_report: BudgetReport | None = None,
+    final_prompt: str = "",
+    llm_calls: list[LLMCall] | None = None,
+    mode: SummaryMode = SummaryMode.TWO_STAGE,
+) -> PatientSummaryResponse:
+    """Assemble the API response from section results and the final summary."""
+    settings = get_settings()
+    token_budget = None
+    if budget_report is not None:
+        counter = get_token_counter(settings.openai_model)
+        token_budget = TokenBudgetStats(
+            tokenizer=budget_report.tokenizer,
+            budget=budget_report.budget,
+            section_prompt_tokens=budget_report.prompt_tokens,
+            final_prompt_tokens=counter.count(final_prompt),
+            sections=budget_report.section_tokens,
+            trimmed_rows=budget_report.trimmed_rows,
+        )
+    elapsed = time.time() - data.started_at
+    metrics.SUMMARY_SECONDS.observe(elapsed, mode=mode.value)
+    processing_time = int(elapsed * 1000)
+    timings = build_stage_timings(data, llm_calls or []) if settings.response_timings else None
+    section_summaries = {
+        section_type: result.summary for section_type, result in section_results.items()
+    }
+    section_sources = {
+        section_type.value: section_source(result)
+        for section_type, result in section_results.items()
+    }
+    for section, source in section_sources.items():
+        metrics.SUMMARY_SECTIONS.inc(section=section, source=source.value)
+
+    return PatientSummaryResponse(
+        patient_id=data.patient_id,
+        generated_at=datetime.utcnow(),
+        summary=final_summary,
+        sections=SectionSummaries(
+            demographics=section_summaries.get(SectionType.DEMOGRAPHICS),
+            conditions=section_summaries.get(SectionType.CONDITIONS),
+            medications=section_summaries.get(SectionType.MEDICATIONS),
+            observations=section_summaries.get(SectionType.OBSERVATIONS),
+            allergies=section_summaries.get(SectionType.ALLERGIES),
+        ),
+        section_sources=section_sources,
+        data_availability=data.data_availability,
+        processing_time_ms=processing_time,
+        model=settings.openai_model,
+        mode=mode,
+        scheduler=SchedulerStats(
+            section_wait_ms=int(sum(r.wait_ms for r in section_results.values())),
+            section_llm_ms=int(sum(r.llm_ms for r in section_results.values())),
+            final_llm_ms=int(final_llm_ms),
+            fallback_sections=[
+                section_type.value
+                for section_type, result in section_results.items()
+                if result.fallback
+            ],
+        ),
+        token_budget=token_budget,
+        timings=timings,
+    )
+
+
+def section_source(result: SectionResult) -> SectionSource:
+    """How a section result was produced."""
+    if result.templated:
+        return SectionSource.TEMPLATE
+    if result.fallback:
+        return SectionSource.FALLBACK
+    return SectionSource.LLM
+
+
+def build_stage_timings(data: PatientData, llm_calls: list[LLMCall]) -> StageTimings:
+    """Per-stage timing breakdown for the response, rounded to 0.1 ms."""
+    fhir = {
+        resource_type: FHIRFetchTiming(
+            ms=round(stats.ms, 1), requests=stats.requests, bytes=stats.bytes
+        )
+        for resource_type, stats in data.timings.fhir.items()
+    }
+    return StageTimings(
+        fhir=fhir,
+        fhir_bytes=sum(stats.bytes for stats in data.timings.fhir.values()),
+        extraction_ms={rt: round(ms, 1) for rt, ms in data.timings.extraction_ms.items()},
+        prompt_build_ms=round(data.timings.prompt_build_ms, 1),
+        llm=[
+            LLMCallTiming(
+                stage=call.stage,
+                queue_wait_ms=round(call.queue_wait_ms, 1),
+                ttft_ms=round(call.ttft_ms, 1) if call.ttft_ms is not None else None,
+                total_ms=round(call.total_ms, 1),
+                prompt_tokens=call.prompt_tokens,
+                completion_tokens=call.completion_tokens,
+                cached=call.cached,
+            )
+            for call in llm_calls
+        ],
+    )
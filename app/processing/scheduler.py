@@ -0,0 +1,87 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+
+from app.llm.prompts import SectionType
+
+
+@dataclass
+class SectionResult:
+    """Outcome of a single scheduled section LLM call."""
+
+    section_type: SectionType
+    summary: str
+    wait_ms: float = 0.0
+    llm_ms: float = 0.0
+    fallback: bool = False
+    # Rendered from a template without an LLM call
+    templated: bool = False
+    error: str | None = None
+
+
+class SectionScheduler:
+    """Runs section LLM calls concurrently under a bounded concurrency cap.
+
+    Each section waits for a free slot, then gets ``timeout`` seconds for its
+    LLM call. Sections that time out or fail are filled with ``fallback`` so
+    one slow section never fails the whole summary. ``generate`` is called
+    with the prompt and the section name, which labels the LLM call.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str, str], Awaitable[str]],
+        max_concurrency: int = 5,
+        timeout: float | None = None,
+        fallback: str = "",
+    ):
+        self.generate = generate
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.fallback = fallback
+
+    async def run(self, prompts: dict[SectionType, str]) -> dict[SectionType, SectionResult]:
+        """Generate all section summaries, preserving the order of ``prompts``."""
+        results = {result.section_type: result async for result in self.iter_results(prompts)}
+        return {section_type: results[section_type] for section_type in prompts}
+
+    async def iter_results(
+        self, prompts: dict[SectionType, str]
+    ) -> AsyncIterator[SectionResult]:
+        """Yield section results in completion order, as soon as each one finishes."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [
+            asyncio.ensure_future(self._run_section(semaphore, section_type, prompt))
+            for section_type, prompt in prompts.items()
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _run_section(
+        self, semaphore: asyncio.Semaphore, section_type: SectionType, prompt: str
+    ) -> SectionResult:
+        queued_at = time.perf_counter()
+        async with semaphore:
+            started_at = time.perf_counter()
+            result = SectionResult(
+                section_type=section_type,
+                summary=self.fallback,
+                wait_ms=(started_at - queued_at) * 1000,
+            )
+            try:
+                result.summary = await asyncio.wait_for(
+                    self.generate(prompt, section_type.value), timeout=self.timeout
+                )
+            except asyncio.TimeoutError:
+                result.fallback = True
+                result.error = f"timed out after {self.timeout}s"
+            except Exception as e:
+                result.fallback = True
+                result.error = str(e)
+            result.llm_ms = (time.perf_counter() - started_at) * 1000
+            return result
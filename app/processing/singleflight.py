@@ -0,0 +1,58 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight(Generic[T]):
+    task: "asyncio.Task[T]"
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one shared computation.
+
+    The first caller for a key starts the work as a task; callers that arrive
+    while it is running attach to the same task and receive its result (or
+    exception). A cancelled caller only detaches itself: the shared task is
+    cancelled only once no caller is waiting on it any more.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight[Any]] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(task=asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Forget it now: a caller arriving before the task finishes starts afresh
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    def _forget(self, key: Hashable, flight: _Flight[Any]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the exception as retrieved if every waiter already detached
+        if not flight.task.cancelled():
+            flight.task.exception()
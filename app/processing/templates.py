@@ -0,0 +1,134 @@
+from collections.abc import Callable
+from typing import Any
+
+from app.fhir.resources import RecordTable
+from app.llm.prompts import PromptAssembler, SectionType
+
+Row = dict[str, Any]
+
+
+def _join(*parts: Any, sep: str = ", ") -> str:
+    """Join the non-empty parts."""
+    return sep.join(str(part) for part in parts if part not in (None, ""))
+
+
+def _bullets(table: RecordTable, line: Callable[[Row], str]) -> str:
+    return "\n".join(f"- {line(row)}" for row in table.to_dicts())
+
+
+def _demographics(table: RecordTable) -> str:
+    if table.empty:
+        return "No demographic information recorded."
+    sentences = []
+    for row in table.to_dicts():
+        age = f"{row['age']}-year-old" if row.get("age") is not None else ""
+        who = _join(age, row.get("gender"), sep=" ")
+        born = f"born {row['birth_date']}" if row.get("birth_date") else ""
+        sentences.append(_join(row.get("full_name") or "Name not recorded", who, born) + ".")
+        details = _join(
+            f"Language: {row['language']}" if row.get("language") else "",
+            f"marital status: {row['marital_status']}" if row.get("marital_status") else "",
+            f"phone: {row['phone']}" if row.get("phone") else "",
+            f"email: {row['email']}" if row.get("email") else "",
+            f"address: {row['address']}" if row.get("address") else "",
+            sep="; ",
+        )
+        if details:
+            sentences.append(details[0].upper() + details[1:] + ".")
+    return " ".join(sentences)
+
+
+def _conditions(table: RecordTable) -> str:
+    if table.empty:
+        return "No conditions recorded."
+
+    def line(row: Row) -> str:
+        onset = f"onset {row['onset_date']}" if row.get("onset_date") else ""
+        details = _join(row.get("clinical_status"), row.get("severity"), onset)
+        name = row.get("condition_name") or "Unnamed condition"
+        return f"{name} ({details})" if details else name
+
+    return _bullets(table, line)
+
+
+def _medications(table: RecordTable) -> str:
+    if table.empty:
+        return "No medications recorded."
+
+    def line(row: Row) -> str:
+        dose = row.get("dosage_text") or _join(
+            _join(row.get("dose_value"), row.get("dose_unit"), sep=" "),
+            row.get("route"),
+            row.get("frequency"),
+        )
+        since = f"prescribed {row['prescribed_date']}" if row.get("prescribed_date") else ""
+        name = row.get("medication_name") or "Unnamed medication"
+        details = _join(row.get("status"), since, row.get("reason"))
+        text = f"{name}: {dose}" if dose else name
+        return f"{text} ({details})" if details else text
+
+    return _bullets(table, line)
+
+
+def _observations(table: RecordTable) -> str:
+    if table.empty:
+        return "No vital signs or laboratory results recorded."
+
+    def line(row: Row) -> str:
+        result = _join(row.get("value"), row.get("unit"), sep=" ") or "no value"
+        details = _join(row.get("interpretation"), row.get("effective_date"))
+        name = row.get("observation_name") or "Unnamed observation"
+        return f"{name}: {result}" + (f" ({details})" if details else "")
+
+    return _bullets(table, line)
+
+
+def _allergies(table: RecordTable) -> str:
+    if table.empty:
+        return "No allergies or intolerances recorded."
+
+    def line(row: Row) -> str:
+        name = row.get("allergen") or "Unnamed allergen"
+        if str(row.get("criticality") or "").lower() == "high":
+            name = f"**{name} (high criticality)**"
+        reaction = _join(row.get("reaction"), row.get("reaction_severity"), sep=" - ")
+        details = _join(row.get("category"), row.get("clinical_status"))
+        return _join(
+            name,
+            f"reaction: {reaction}" if reaction else "",
+            f"({details})" if details else "",
+            sep=" ",
+        )
+
+    return _bullets(table, line)
+
+
+# Deterministic renderers for sections too small to need the LLM
+SECTION_TEMPLATES: dict[SectionType, Callable[[RecordTable], str]] = {
+    SectionType.DEMOGRAPHICS: _demographics,
+    SectionType.CONDITIONS: _conditions,
+    SectionType.MEDICATIONS: _medications,
+    SectionType.OBSERVATIONS: _observations,
+    SectionType.ALLERGIES: _allergies,
+}
+
+
+def render_section(section_type: SectionType, table: RecordTable) -> str:
+    """Render a section summary directly from its rows."""
+    return SECTION_TEMPLATES[section_type](table)
+
+
+def render_small_sections(
+    tables: dict[str, RecordTable], max_rows: dict[str, int]
+) -> dict[SectionType, str]:
+    """Template summaries for sections with at most ``max_rows[section]`` rows.
+
+    Empty sections are always rendered; sections missing from ``max_rows``
+    are rendered only when empty.
+    """
+    rendered = {}
+    for resource_type, table in tables.items():
+        section_type = PromptAssembler.RESOURCE_TO_SECTION.get(resource_type)
+        if section_type and len(table) <= max_rows.get(section_type.value, 0):
+            rendered[section_type] = render_section(section_type, table)
+    return rendered
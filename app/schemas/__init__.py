@@ -1,13 +1,31 @@
+from .requests import BatchSummaryRequest, BulkSummaryRequest, SummaryMode
 from .responses import (
+    BatchJobStatus,
     DataAvailability,
     ErrorResponse,
+    FHIRFetchTiming,
+    LLMCallTiming,
     PatientSummaryResponse,
+    SchedulerStats,
+    SectionSource,
     SectionSummaries,
+    StageTimings,
+    TokenBudgetStats,
 )
 
 __all__ = [
     "PatientSummaryResponse",
     "SectionSummaries",
+    "SectionSource",
     "DataAvailability",
     "ErrorResponse",
+    "SchedulerStats",
+    "TokenBudgetStats",
+    "StageTimings",
+    "FHIRFetchTiming",
+    "LLMCallTiming",
+    "BatchSummaryRequest",
+    "BatchJobStatus",
+    "BulkSummaryRequest",
+    "SummaryMode",
 ]
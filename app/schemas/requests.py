@@ -0,0 +1,35 @@
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+
+class SummaryMode(str, Enum):
+    """How the LLM stage turns patient data into a summary."""
+
+    # One call per section, then a final call over the section summaries
+    TWO_STAGE = "two_stage"
+    # One call producing the section summaries and the final summary together
+    FAST = "fast"
+
+
+class BatchSummaryRequest(BaseModel):
+    """Request to summarize a cohort of patients."""
+
+    patient_ids: list[str] = Field(
+        min_length=1, description="FHIR Patient resource IDs to summarize"
+    )
+
+
+class BulkSummaryRequest(BaseModel):
+    """Request to summarize every patient in a FHIR Bulk Data export."""
+
+    export_dir: str | None = Field(
+        default=None,
+        description=(
+            "Existing export directory, relative to the configured bulk data directory. "
+            "If omitted, a new $export is kicked off against the FHIR server."
+        ),
+    )
+    group_id: str | None = Field(
+        default=None, description="Export only this Group's patients (kick-off only)"
+    )
@@ -1,7 +1,10 @@
 from datetime import datetime
+from enum import Enum
 
 from pydantic import BaseModel, Field
 
+from .requests import SummaryMode
+
 
 class DataAvailability(BaseModel):
     """Indicates which FHIR resource types had data available."""
@@ -11,10 +14,14 @@ class DataAvailability(BaseModel):
     MedicationRequest: bool = False
     Observation: bool = False
     AllergyIntolerance: bool = False
+    truncated: list[str] = Field(
+        default_factory=list,
+        description="Resource types whose results were cut off by the pagination budget",
+    )
 
 
 class SectionSummaries(BaseModel):
-    """Individual section summaries generated by LLM."""
+    """Individual section summaries generated by LLM or rendered from a template."""
 
     demographics: str | None = None
     conditions: str | None = None
@@ -23,6 +30,84 @@ class SectionSummaries(BaseModel):
     allergies: str | None = None
 
 
+class SectionSource(str, Enum):
+    """How a section summary was produced."""
+
+    LLM = "llm"
+    TEMPLATE = "template"
+    FALLBACK = "fallback"
+
+
+class SchedulerStats(BaseModel):
+    """Time spent in the section scheduler, split into queueing and LLM calls."""
+
+    section_wait_ms: int = Field(description="Total time sections waited for a free slot")
+    section_llm_ms: int = Field(description="Total time spent in section LLM calls")
+    final_llm_ms: int = Field(
+        description="Time spent generating the final summary (the single call in fast mode)"
+    )
+    fallback_sections: list[str] = Field(
+        default_factory=list,
+        description=(
+            "Sections that timed out or failed (or, in fast mode, were missing from the "
+            "output) and used the fallback text"
+        ),
+    )
+
+
+class TokenBudgetStats(BaseModel):
+    """Prompt token accounting against the section input budget."""
+
+    tokenizer: str = Field(description="tiktoken encoding used, or 'heuristic'")
+    budget: int = Field(description="Input token budget across all section prompts")
+    section_prompt_tokens: int = Field(description="Tokens in all section prompts as sent")
+    final_prompt_tokens: int = Field(
+        description="Tokens in the final summary prompt (the single prompt in fast mode)"
+    )
+    sections: dict[str, int] = Field(description="Prompt tokens per section")
+    trimmed_rows: dict[str, int] = Field(
+        default_factory=dict, description="Rows dropped per section to fit the budget"
+    )
+
+
+class FHIRFetchTiming(BaseModel):
+    """Requests and wall time spent fetching one resource type."""
+
+    ms: float = Field(description="Wall time including pagination")
+    requests: int = Field(description="HTTP requests sent")
+    bytes: int = Field(description="Response body bytes received")
+
+
+class LLMCallTiming(BaseModel):
+    """Timing and token usage of one LLM request."""
+
+    stage: str = Field(description="Section name, or 'final' for the final summary")
+    queue_wait_ms: float = Field(description="Time waiting for rate limiter admission")
+    ttft_ms: float | None = Field(
+        default=None, description="Time from admission to the first output token"
+    )
+    total_ms: float = Field(description="Total time including queue wait")
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    cached: bool = Field(default=False, description="Answered from the completion cache")
+
+
+class StageTimings(BaseModel):
+    """Where the time went: FHIR fetches, extraction, prompt assembly and LLM calls."""
+
+    fhir: dict[str, FHIRFetchTiming] = Field(
+        default_factory=dict, description="Per resource type, or 'batch' for the batch request"
+    )
+    fhir_bytes: int = Field(default=0, description="Total FHIR response bytes")
+    extraction_ms: dict[str, float] = Field(
+        default_factory=dict, description="Record extraction time per resource type"
+    )
+    prompt_build_ms: float = Field(
+        default=0.0, description="Compaction, token budgeting and prompt rendering"
+    )
+    llm: list[LLMCallTiming] = Field(default_factory=list, description="In completion order")
+
+
 class PatientSummaryResponse(BaseModel):
     """Complete patient summary response."""
 
@@ -32,11 +117,45 @@ class PatientSummaryResponse(BaseModel):
     sections: SectionSummaries = Field(
         description="Individual section summaries for each resource type"
     )
+    section_sources: dict[str, SectionSource] = Field(
+        default_factory=dict,
+        description=(
+            "How each section was produced: llm, template (empty or small sections, "
+            "rendered without the LLM) or fallback"
+        ),
+    )
     data_availability: DataAvailability = Field(
         description="Indicates which resource types had data"
     )
     processing_time_ms: int = Field(description="Total processing time in milliseconds")
     model: str = Field(description="LLM model used for generation")
+    mode: SummaryMode = Field(
+        default=SummaryMode.TWO_STAGE, description="two_stage or single-pass fast summary"
+    )
+    scheduler: SchedulerStats | None = Field(
+        default=None, description="Section scheduler timing breakdown"
+    )
+    token_budget: TokenBudgetStats | None = Field(
+        default=None, description="Prompt token usage against the budget"
+    )
+    timings: StageTimings | None = Field(
+        default=None, description="Per-stage timing breakdown"
+    )
+
+
+class BatchJobStatus(BaseModel):
+    """Progress of a cohort summarization job."""
+
+    job_id: str
+    status: str = Field(
+        description="queued, preparing, running, completed, cancelled or failed"
+    )
+    total: int = Field(description="Number of patients in the job")
+    completed: int = Field(description="Patients processed so far, including failures")
+    failed: int = Field(description="Patients whose summary failed")
+    created_at: datetime
+    finished_at: datetime | None = None
+    error: str | None = Field(default=None, description="Why the job failed, if it did")
 
 
 class ErrorResponse(BaseModel):
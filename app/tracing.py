@@ -0,0 +1,408 @@
+"""Request tracing: nested timing spans with W3C trace context propagation.
+
+Spans nest through a context variable, so work started inside a span
+(including tasks it spawns) becomes its child. Incoming ``traceparent``
+headers continue the caller's trace; outgoing MCP tool calls carry the
+current one. When the outermost span in the process (usually the HTTP
+request) ends, its whole span tree is handed to the configured exporter::
+
+    with tracing.span("fhir.search", resource_type="Observation") as span:
+        results = ...
+        span.set(results=len(results))
+
+Exporters: ``console`` prints a waterfall per request, ``file`` appends
+JSON lines that this module renders as waterfalls, slowest first::
+
+    python -m app.tracing traces.jsonl --slowest 5
+    python -m app.tracing traces.jsonl --trace 4bf92f3577b34da6a3ce929d0e0e4736
+"""
+
+import argparse
+import importlib
+import re
+import secrets
+import sys
+import threading
+import time
+from collections.abc import Iterable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, TextIO
+
+from app import fastjson
+
+TRACEPARENT = "traceparent"
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+@dataclass
+class _LocalTrace:
+    """Spans of one trace finished in this process under the same local root."""
+
+    spans: list["Span"] = field(default_factory=list)
+    exported: bool = False
+
+
+@dataclass
+class Span:
+    """A named, timed operation within a trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    # Epoch seconds
+    start: float = 0.0
+    duration_ms: float | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+    _local: _LocalTrace | None = field(default=None, repr=False)
+    _root: bool = field(default=False, repr=False)
+    _started: float = field(default=0.0, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        """Add or overwrite attributes."""
+        self.attributes.update(attributes)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self, error: BaseException | str | None = None) -> None:
+        """Finish the span; the local root exports everything finished under it."""
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if error is not None:
+            self.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+        local = self._local
+        if local is None:
+            return
+        local.spans.append(self)
+        if self._root:
+            local.exported = True
+            _export(local.spans)
+        elif local.exported:
+            # Outlived its root (e.g. a task still running after the response was sent)
+            _export([self])
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end(exc)
+
+
+class NoopSpan:
+    """Stand-in when tracing is disabled; accepts and drops everything."""
+
+    traceparent = None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self, error: BaseException | str | None = None) -> None:
+        pass
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class SpanExporter:
+    """Receives finished spans; subclass and override ``export``."""
+
+    def export(self, spans: list[Span]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class ConsoleExporter(SpanExporter):
+    """Prints each request's spans as an indented waterfall."""
+
+    def __init__(self, stream: TextIO | None = None):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        text = format_waterfall([span.to_dict() for span in spans])
+        with self._lock:
+            print(text, file=self.stream or sys.stderr, flush=True)
+
+
+class FileExporter(SpanExporter):
+    """Appends spans as JSON lines, one span per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+
+    def export(self, spans: list[Span]) -> None:
+        data = b"".join(fastjson.dumps(span.to_dict()) + b"\n" for span in spans)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(data)
+                self._file.flush()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+_exporter: SpanExporter | None = None
+_current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def create_exporter(spec: str, path: str = "traces.jsonl") -> SpanExporter | None:
+    """Exporter for a ``TRACING_EXPORTER`` value.
+
+    ``""`` disables tracing, ``console`` and ``file`` are built in, and
+    ``package.module:factory`` calls ``factory()`` for a custom exporter
+    (e.g. one that forwards to an OpenTelemetry collector).
+    """
+    if not spec:
+        return None
+    if spec == "console":
+        return ConsoleExporter()
+    if spec == "file":
+        return FileExporter(path)
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Unknown tracing exporter {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+def set_exporter(exporter: SpanExporter | None) -> None:
+    """Install the process-wide exporter (``None`` disables tracing)."""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not None and previous is not exporter:
+        previous.shutdown()
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def _export(spans: list[Span]) -> None:
+    exporter = _exporter
+    if exporter is None:
+        return
+    try:
+        exporter.export(spans)
+    except Exception as e:
+        # Tracing must never fail the request it is observing
+        print(f"Trace export failed: {e}", file=sys.stderr)
+
+
+def parse_traceparent(header: str | None) -> tuple[str, str] | None:
+    """``(trace_id, parent span_id)`` from a W3C ``traceparent`` header, if valid."""
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if match is None or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return match.group(1), match.group(2)
+
+
+def start_span(
+    name: str, traceparent: str | None = None, new_trace: bool = False, **attributes: Any
+) -> Span | NoopSpan:
+    """Start a span as a child of the current one without making it current.
+
+    Call ``end()`` when done. With no current span (or ``new_trace``) it
+    starts a local root, continuing the trace in ``traceparent`` if given.
+    """
+    if _exporter is None:
+        return NOOP_SPAN
+    parent = None if new_trace else _current.get()
+    if parent is not None and parent._local is not None and not parent._local.exported:
+        trace_id, parent_id, local, root = parent.trace_id, parent.span_id, parent._local, False
+    else:
+        remote = parse_traceparent(traceparent)
+        trace_id, parent_id = remote if remote else (secrets.token_hex(16), None)
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        local, root = _LocalTrace(), True
+    return Span(
+        name=name,
+        trace_id=trace_id,
+        span_id=secrets.token_hex(8),
+        parent_id=parent_id,
+        start=time.time(),
+        attributes=attributes,
+        _local=local,
+        _root=root,
+        _started=time.perf_counter(),
+    )
+
+
+class span:
+    """Context manager running its body inside a new current span.
+
+    Exceptions are recorded on the span and re-raised.
+    """
+
+    def __init__(
+        self, name: str, traceparent: str | None = None, new_trace: bool = False, **attributes: Any
+    ):
+        self._span = start_span(name, traceparent, new_trace, **attributes)
+        self._token = None
+
+    def __enter__(self) -> Span | NoopSpan:
+        if isinstance(self._span, Span):
+            self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._token is not None:
+            try:
+                _current.reset(self._token)
+            except ValueError:
+                # Exited from another context (e.g. an async generator closed elsewhere)
+                pass
+        self._span.end(exc)
+
+
+def current_traceparent() -> str | None:
+    """``traceparent`` header value for the current span, if it is still open."""
+    current = _current.get()
+    if current is None or current.duration_ms is not None:
+        return None
+    return current.traceparent
+
+
+async def inject_traceparent(request: Any) -> None:
+    """httpx request hook propagating the current span to the callee."""
+    header = current_traceparent()
+    if header:
+        request.headers[TRACEPARENT] = header
+
+
+class TraceMiddleware:
+    """ASGI middleware wrapping each HTTP request in a root span.
+
+    Continues the caller's trace when the request carries ``traceparent``.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or _exporter is None:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or ())
+        header = headers.get(TRACEPARENT.encode())
+        with span(
+            f"{scope['method']} {scope['path']}",
+            traceparent=header.decode("latin-1") if header else None,
+            method=scope["method"],
+            path=scope["path"],
+        ) as request_span:
+
+            async def send_with_status(message: dict) -> None:
+                if message["type"] == "http.response.start":
+                    request_span.set(status_code=message["status"])
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
+
+
+def format_waterfall(spans: list[dict[str, Any]], width: int = 40) -> str:
+    """Render one trace's spans as an indented waterfall with timeline bars."""
+    if not spans:
+        return ""
+    by_id = {s["span_id"]: s for s in spans}
+    children: dict[str | None, list[dict[str, Any]]] = {}
+    for s in spans:
+        parent = s["parent_id"] if s["parent_id"] in by_id else None
+        children.setdefault(parent, []).append(s)
+    for group in children.values():
+        group.sort(key=lambda s: s["start"])
+
+    start = min(s["start"] for s in spans)
+    end = max(s["start"] + (s["duration_ms"] or 0) / 1000 for s in spans)
+    total_ms = max((end - start) * 1000, 1e-3)
+    roots = children.get(None, [])
+    lines = [f"trace {spans[0]['trace_id']}  {total_ms:.1f} ms  {roots[0]['name']}"]
+
+    def walk(s: dict[str, Any], depth: int) -> None:
+        offset_ms = (s["start"] - start) * 1000
+        duration = s["duration_ms"] or 0
+        first = int(offset_ms / total_ms * width)
+        length = max(1, round(duration / total_ms * width))
+        bar = (" " * first + "#" * length)[:width].ljust(width)
+        attrs = " ".join(f"{k}={v}" for k, v in s["attributes"].items())
+        error = f"  ERROR {s['error']}" if s.get("error") else ""
+        lines.append(
+            f"  {offset_ms:8.1f} {duration:9.1f} ms |{bar}| "
+            f"{'  ' * depth}{s['name']} {attrs}{error}".rstrip()
+        )
+        for child in children.get(s["span_id"], []):
+            walk(child, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+def load_traces(lines: Iterable[str]) -> dict[str, list[dict[str, Any]]]:
+    """Spans from a ``file`` exporter's output, grouped by trace ID."""
+    traces: dict[str, list[dict[str, Any]]] = {}
+    for line in lines:
+        if line.strip():
+            s = fastjson.loads(line)
+            traces.setdefault(s["trace_id"], []).append(s)
+    return traces
+
+
+def trace_duration_ms(spans: list[dict[str, Any]]) -> float:
+    start = min(s["start"] for s in spans)
+    return max((s["start"] - start) * 1000 + (s["duration_ms"] or 0) for s in spans)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Render traces written by the file exporter")
+    parser.add_argument("path", help="JSON lines file (TRACING_FILE)")
+    parser.add_argument("--trace", help="render only this trace ID")
+    parser.add_argument("--slowest", type=int, default=5, help="traces to render, slowest first")
+    parser.add_argument("--width", type=int, default=40, help="timeline bar width")
+    args = parser.parse_args(argv)
+
+    with open(args.path, encoding="utf-8") as f:
+        traces = load_traces(f)
+    if args.trace:
+        if args.trace not in traces:
+            print(f"Trace {args.trace} not found", file=sys.stderr)
+            return 1
+        selected = [traces[args.trace]]
+    else:
+        selected = sorted(traces.values(), key=trace_duration_ms, reverse=True)[: args.slowest]
+    print("\n\n".join(format_waterfall(spans, args.width) for spans in selected))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
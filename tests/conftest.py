@@ -89,3 +89,61 @@ def sample_medication_request_resource():
         ],
         "authoredOn": "2024-01-15",
     }
+
+
+@pytest.fixture
+def sample_observation_resource():
+    """Sample FHIR Observation resource (lab result) for testing."""
+    return {
+        "resourceType": "Observation",
+        "id": "obs-123",
+        "status": "final",
+        "category": [
+            {
+                "coding": [
+                    {
+                        "system": "http://terminology.hl7.org/CodeSystem/observation-category",
+                        "code": "laboratory",
+                        "display": "Laboratory",
+                    }
+                ]
+            }
+        ],
+        "code": {
+            "coding": [
+                {
+                    "system": "http://loinc.org",
+                    "code": "4548-4",
+                    "display": "Hemoglobin A1c/Hemoglobin.total in Blood",
+                }
+            ]
+        },
+        "effectiveDateTime": "2024-01-10",
+        "valueQuantity": {"value": 7.2, "unit": "%"},
+        "interpretation": [{"coding": [{"code": "H", "display": "High"}]}],
+        "referenceRange": [
+            {"low": {"value": 4.0, "unit": "%"}, "high": {"value": 5.6, "unit": "%"}}
+        ],
+    }
+
+
+@pytest.fixture
+def sample_allergy_resource():
+    """Sample FHIR AllergyIntolerance resource for testing."""
+    return {
+        "resourceType": "AllergyIntolerance",
+        "id": "allergy-123",
+        "clinicalStatus": {"coding": [{"code": "active", "display": "Active"}]},
+        "verificationStatus": {"coding": [{"code": "confirmed", "display": "Confirmed"}]},
+        "type": "allergy",
+        "category": ["medication"],
+        "criticality": "high",
+        "code": {"coding": [{"code": "7980", "display": "Penicillin G"}]},
+        "onsetDateTime": "2010-06-01",
+        "reaction": [
+            {
+                "manifestation": [{"coding": [{"display": "Hives"}]}],
+                "severity": "moderate",
+            }
+        ],
+    }
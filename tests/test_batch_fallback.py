@@ -0,0 +1,69 @@
+import json
+
+import httpx
+import pytest
+
+from app.fhir.client import FHIRClient
+
+
+def _transport(patient: dict, batch_reply) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            return batch_reply(request)
+        if request.url.path.startswith("/Patient/"):
+            return httpx.Response(200, json=patient)
+        return httpx.Response(200, json={"resourceType": "Bundle", "type": "searchset"})
+
+    return httpx.MockTransport(handler)
+
+
+def _status(code: int):
+    return lambda request: httpx.Response(code, json={"resourceType": "OperationOutcome"})
+
+
+def _timeout(request: httpx.Request) -> httpx.Response:
+    raise httpx.ReadTimeout("timed out", request=request)
+
+
+def _not_a_batch_response(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, content=json.dumps({"resourceType": "Bundle", "type": "searchset"}))
+
+
+@pytest.mark.parametrize(
+    "batch_reply, rejected",
+    [
+        (_status(405), True),
+        (_status(501), True),
+        (_not_a_batch_response, True),
+        (_status(503), False),
+        (_status(500), False),
+        (_timeout, False),
+    ],
+)
+async def test_only_real_rejections_disable_batch(sample_patient_resource, batch_reply, rejected):
+    unsupported: set[str] = set()
+    http = httpx.AsyncClient(
+        transport=_transport(sample_patient_resource, batch_reply), base_url="http://fhir"
+    )
+    client = FHIRClient(base_url="http://fhir", http_client=http, batch_unsupported=unsupported)
+    client.batch_mode = True
+
+    resources = await client.get_patient_resources("test-patient-123", ["Patient", "Condition"])
+
+    # Either way this call falls back to parallel GETs
+    assert resources["Patient"] == [sample_patient_resource]
+    assert ("http://fhir" in unsupported) is rejected
+
+
+async def test_rejection_is_not_shared_between_unrelated_clients(sample_patient_resource):
+    http = httpx.AsyncClient(
+        transport=_transport(sample_patient_resource, _status(405)), base_url="http://fhir"
+    )
+    first = FHIRClient(base_url="http://fhir", http_client=http)
+    first.batch_mode = True
+    await first.get_patient_resources("test-patient-123", ["Patient"])
+
+    second = FHIRClient(base_url="http://fhir", http_client=http)
+
+    assert "http://fhir" in first.batch_unsupported
+    assert second.batch_unsupported == set()
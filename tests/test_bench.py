@@ -0,0 +1,63 @@
+import json
+
+from app.bench import _e2e_runs, compare, main, micro_benchmarks
+
+
+def test_micro_benchmarks_time_every_stage():
+    timings = micro_benchmarks(["tiny"], min_time=0.001)
+
+    names = {timing.name for timing in timings}
+    assert "PatientHandler.to_records" in names
+    assert "build_section_prompts" in names
+    assert "extract_patient_data" in names
+    assert all(timing.size == "tiny" and timing.runs >= 1 for timing in timings)
+    assert all(0 <= timing.min_ms <= timing.median_ms for timing in timings)
+
+
+def test_main_writes_results_and_compares_against_them(tmp_path, capsys):
+    output = tmp_path / "bench.json"
+    args = ["--sizes", "tiny", "--skip-e2e", "--min-time", "0.001"]
+
+    assert main([*args, "--output", str(output)]) == 0
+
+    results = json.loads(output.read_text())
+    assert results["meta"]["python"]
+    assert results["micro"] and results["e2e"] == []
+    assert {"name", "size", "items", "runs", "min_ms", "median_ms"} <= set(results["micro"][0])
+    assert "extract_patient_data" in capsys.readouterr().out
+
+    # Against itself nothing regresses, whatever the timing noise: tolerance is huge
+    assert main([*args, "--compare", str(output), "--tolerance", "1000"]) == 0
+
+
+def test_compare_reports_slower_micro_and_e2e_metrics():
+    micro = {"name": "extract", "size": "tiny", "median_ms": 1.0}
+    e2e = {
+        "size": "small",
+        "mode": "fast",
+        "p50_ms": 100.0,
+        "p95_ms": 200.0,
+        "p99_ms": 300.0,
+        "throughput_rps": 10.0,
+    }
+    baseline = {"micro": [micro], "e2e": [e2e]}
+    current = {
+        "micro": [{**micro, "median_ms": 2.0}],
+        "e2e": [{**e2e, "p95_ms": 210.0, "p99_ms": 600.0, "throughput_rps": 5.0}],
+    }
+
+    regressions = compare(current, baseline, tolerance=0.25)
+
+    assert len(regressions) == 3
+    assert regressions[0].startswith("extract [tiny]")
+    assert any("p99_ms" in line for line in regressions)
+    assert any("throughput" in line for line in regressions)
+
+
+def test_old_results_with_a_single_e2e_run_still_load():
+    old = {"e2e": {"size": "small", "p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0}}
+
+    (run,) = _e2e_runs(old)
+
+    assert run["mode"] == "two_stage"
+    assert run["health_p99_ms"] == 0.0
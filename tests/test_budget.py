@@ -0,0 +1,96 @@
+from app.fhir.resources import (
+    ConditionHandler,
+    MedicationRequestHandler,
+    ObservationHandler,
+    RecordTable,
+)
+from app.llm.prompts import SectionType
+from app.llm.tokens import TokenCounter
+from app.processing.budget import PromptBudget
+
+COUNTER = TokenCounter("gpt-test", use_tiktoken=False)
+
+
+def _observations(sample):
+    # (effective date, interpretation): normal rows go first, oldest first
+    results = [("2024-01-01", "High"), ("2024-02-01", "Normal"), ("2023-01-01", "Normal")]
+    return [
+        {
+            **sample,
+            "id": f"obs-{date}",
+            "effectiveDateTime": date,
+            "interpretation": [{"coding": [{"display": flag}]}],
+        }
+        for date, flag in results
+    ]
+
+
+def _tables(condition, medication, observation) -> dict[str, RecordTable]:
+    stopped = {**medication, "id": "medrx-stopped", "status": "stopped"}
+    return {
+        "Condition": ConditionHandler().to_records([condition]),
+        "MedicationRequest": MedicationRequestHandler().to_records([medication, stopped]),
+        "Observation": ObservationHandler().to_records(_observations(observation)),
+    }
+
+
+def _row_tokens(table: RecordTable) -> list[int]:
+    return [COUNTER.count(line) + 1 for line in list(table.markdown_lines())[2:]]
+
+
+def _untrimmed_tokens(tables: dict[str, RecordTable]) -> int:
+    _, report = PromptBudget(COUNTER, budget=10**9).build_prompts(tables)
+    assert report.trimmed_rows == {}
+    return report.prompt_tokens
+
+
+def test_prompts_within_budget_are_untouched(
+    sample_condition_resource, sample_medication_request_resource, sample_observation_resource
+):
+    tables = _tables(
+        sample_condition_resource, sample_medication_request_resource, sample_observation_resource
+    )
+
+    prompts, report = PromptBudget(COUNTER, budget=10**9).build_prompts(tables)
+
+    assert set(prompts) == {
+        SectionType.CONDITIONS,
+        SectionType.MEDICATIONS,
+        SectionType.OBSERVATIONS,
+    }
+    assert report.tokenizer == "heuristic"
+    assert report.prompt_tokens == sum(report.section_tokens.values())
+
+
+def test_oldest_normal_observation_is_trimmed_first(
+    sample_condition_resource, sample_medication_request_resource, sample_observation_resource
+):
+    tables = _tables(
+        sample_condition_resource, sample_medication_request_resource, sample_observation_resource
+    )
+    budget = _untrimmed_tokens(tables) - 1
+
+    prompts, report = PromptBudget(COUNTER, budget=budget).build_prompts(tables)
+
+    assert report.trimmed_rows == {"observations": 1}
+    observations = prompts[SectionType.OBSERVATIONS]
+    assert "2023-01-01" not in observations
+    assert "2024-02-01" in observations and "2024-01-01" in observations
+
+
+def test_sections_are_trimmed_in_order(
+    sample_condition_resource, sample_medication_request_resource, sample_observation_resource
+):
+    tables = _tables(
+        sample_condition_resource, sample_medication_request_resource, sample_observation_resource
+    )
+    # Dropping every observation isn't enough; one more row has to go
+    budget = _untrimmed_tokens(tables) - sum(_row_tokens(tables["Observation"])) - 1
+
+    prompts, report = PromptBudget(COUNTER, budget=budget).build_prompts(tables)
+
+    assert report.trimmed_rows == {"observations": 3, "medications": 1}
+    # The stopped prescription goes before the active one; conditions are untouched
+    assert "medrx-stopped" not in prompts[SectionType.MEDICATIONS]
+    assert "medrx-123" in prompts[SectionType.MEDICATIONS]
+    assert "Type 2 diabetes mellitus" in prompts[SectionType.CONDITIONS]
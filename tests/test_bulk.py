@@ -0,0 +1,104 @@
+import json
+
+import httpx
+import pytest
+
+from app.fhir.bulk import BulkDataIndex, BulkExportClient, patient_reference
+
+
+def _write_ndjson(path, resources, blank_lines=False):
+    lines = [json.dumps(resource) for resource in resources]
+    path.write_text(("\n\n" if blank_lines else "\n").join(lines) + "\n")
+
+
+def _condition(condition, condition_id, subject):
+    return {**condition, "id": condition_id, "subject": {"reference": subject}}
+
+
+def test_index_reads_back_each_patients_resources(
+    tmp_path, sample_patient_resource, sample_condition_resource
+):
+    other = {**sample_patient_resource, "id": "other"}
+    _write_ndjson(tmp_path / "Patient.ndjson", [sample_patient_resource, other])
+    _write_ndjson(
+        tmp_path / "Condition.ndjson",
+        [
+            _condition(sample_condition_resource, "c1", "Patient/test-patient-123"),
+            _condition(sample_condition_resource, "c2", "Patient/other"),
+            _condition(sample_condition_resource, "c3", "http://fhir/Patient/test-patient-123"),
+        ],
+        blank_lines=True,
+    )
+
+    index = BulkDataIndex.build(tmp_path, ["Patient", "Condition"])
+    resources = index.read_patient("test-patient-123")
+
+    assert index.patient_ids == ["other", "test-patient-123"]
+    assert resources["Patient"] == [sample_patient_resource]
+    assert [r["id"] for r in resources["Condition"]] == ["c1", "c3"]
+    assert [r["id"] for r in index.read_patient("other")["Condition"]] == ["c2"]
+
+
+def test_index_skips_unwanted_types_and_unreferenced_resources(
+    tmp_path, sample_patient_resource, sample_condition_resource
+):
+    orphan = {**sample_condition_resource, "id": "orphan"}
+    encounter = {"resourceType": "Encounter", "subject": {"reference": "Patient/test-patient-123"}}
+    _write_ndjson(tmp_path / "mixed.ndjson", [sample_patient_resource, orphan, encounter])
+
+    index = BulkDataIndex.build(tmp_path, ["Patient", "Condition"])
+
+    assert index.read_patient("test-patient-123") == {
+        "Patient": [sample_patient_resource],
+        "Condition": [],
+    }
+    # Resources of a patient with no Patient resource are indexed but not listed
+    assert index.read_patient("missing") == {"Patient": [], "Condition": []}
+
+
+def test_offsets_survive_multibyte_content(tmp_path, sample_patient_resource):
+    accented = {**sample_patient_resource, "id": "p2", "name": [{"family": "Müller-Łukasz"}]}
+    _write_ndjson(tmp_path / "Patient.ndjson", [accented, sample_patient_resource])
+
+    index = BulkDataIndex.build(tmp_path, ["Patient"])
+
+    assert index.read_patient("test-patient-123")["Patient"] == [sample_patient_resource]
+    assert index.read_patient("p2")["Patient"] == [accented]
+
+
+def test_patient_reference():
+    assert patient_reference({"resourceType": "Patient", "id": "p"}) == "p"
+    assert patient_reference({"resourceType": "X", "patient": {"reference": "Patient/q"}}) == "q"
+    assert patient_reference({"resourceType": "X", "subject": {"reference": "Group/g"}}) is None
+
+
+def _export_client() -> BulkExportClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b'{"resourceType": "Patient"}\n')
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return BulkExportClient(http, base_url="http://fhir")
+
+
+async def test_download_writes_one_file_per_output(tmp_path):
+    manifest = {"output": [{"type": "Patient", "url": "http://fhir/out/1"}]}
+
+    await _export_client().download(manifest, tmp_path / "export")
+
+    assert [p.name for p in (tmp_path / "export").iterdir()] == ["0.Patient.ndjson"]
+
+
+@pytest.mark.parametrize("output_type", ["../../escaped", "Patient/../x", "", None])
+async def test_download_rejects_output_types_that_are_not_resource_types(tmp_path, output_type):
+    manifest = {
+        "output": [
+            {"type": "Patient", "url": "http://fhir/out/1"},
+            {"type": output_type, "url": "http://fhir/out/2"},
+        ]
+    }
+
+    with pytest.raises(ValueError):
+        await _export_client().download(manifest, tmp_path / "export")
+
+    # Checked before anything is written
+    assert list(tmp_path.rglob("*")) == []
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.coldstart import parse_importtime
+
+# Generous: this guards the exit code and the probe, not the timing
+BUDGET_MS = 60_000
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        capture_output=True,
+        text=True,
+        timeout=120,
+        env={**os.environ, "WARM_IMPORTS": "false"},
+    )
+
+
+def test_coldstart_within_budget_exits_zero():
+    result = _run("-m", "app.coldstart", "--budget-ms", str(BUDGET_MS), "--repeat", "1", "--json")
+
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout)
+    assert report["over_budget"] is False
+    assert report["cold_start_ms"] > 0
+    assert report["packages"]
+
+
+def test_coldstart_over_budget_exits_non_zero():
+    result = _run("-m", "app.coldstart", "--budget-ms", "0", "--repeat", "1")
+
+    assert result.returncode == 1, result.stderr
+    assert "OVER BUDGET" in result.stdout
+
+
+@pytest.mark.parametrize("module", ["openai", "pandas", "fastapi_mcp"])
+def test_importing_the_app_does_not_import_heavy_modules(module):
+    # A fresh interpreter: this test process may have imported them already
+    result = _run("-c", f"import sys, app.main; print({module!r} in sys.modules)")
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "False"
+
+
+def test_parse_importtime_keeps_the_largest_cumulative_per_package():
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        150 |     fastapi.routing",
+            "import time:       200 |       2500 | fastapi",
+            "import time:        50 |         50 | json",
+            "unrelated line",
+        ]
+    )
+
+    assert parse_importtime(stderr) == {"fastapi": 2.5, "json": 0.05}
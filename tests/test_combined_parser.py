@@ -0,0 +1,69 @@
+import pytest
+
+from app.llm.prompts import CombinedOutputParser, SectionType
+
+OUTPUT = (
+    "<conditions>\nType 2 diabetes, well controlled.\n</conditions>\n"
+    "<medications>Metformin 500 mg BID.</medications>\n"
+    "<summary>\nA 55-year-old man with diabetes on metformin. A1c <7 is the goal.\n</summary>"
+)
+SECTIONS = {
+    SectionType.CONDITIONS: "Type 2 diabetes, well controlled.",
+    SectionType.MEDICATIONS: "Metformin 500 mg BID.",
+}
+SUMMARY = "A 55-year-old man with diabetes on metformin. A1c <7 is the goal."
+
+
+def _feed(chunks: list[str]) -> tuple[CombinedOutputParser, list[SectionType], str]:
+    parser = CombinedOutputParser()
+    completed: list[SectionType] = []
+    streamed: list[str] = []
+    for chunk in chunks:
+        sections, text = parser.feed(chunk)
+        completed += sections
+        streamed.append(text)
+    return parser, completed, "".join(streamed)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 11, len(OUTPUT)])
+def test_chunk_size_does_not_change_the_result(size):
+    chunks = [OUTPUT[i : i + size] for i in range(0, len(OUTPUT), size)]
+
+    parser, completed, streamed = _feed(chunks)
+
+    assert completed == [SectionType.CONDITIONS, SectionType.MEDICATIONS]
+    assert parser.sections == SECTIONS
+    assert parser.summary() == SUMMARY
+    # Streamed summary text never includes any part of the closing tag
+    assert streamed.strip() == SUMMARY
+
+
+def test_every_two_way_split_gives_the_same_result():
+    for split in range(1, len(OUTPUT)):
+        parser, completed, streamed = _feed([OUTPUT[:split], OUTPUT[split:]])
+
+        assert parser.sections == SECTIONS, split
+        assert parser.summary() == SUMMARY, split
+        assert "<" not in streamed.replace("<7", ""), split
+
+
+def test_section_is_reported_by_the_chunk_that_closes_it():
+    parser = CombinedOutputParser()
+
+    assert parser.feed("<allergies>Penicillin (hives)</aller") == ([], "")
+    assert parser.feed("gies>") == ([SectionType.ALLERGIES], "")
+    assert parser.sections == {SectionType.ALLERGIES: "Penicillin (hives)"}
+
+
+def test_output_cut_off_inside_the_summary_keeps_what_arrived():
+    parser, _, _ = _feed(["<summary>Partial summary</sum"])
+
+    assert parser.summary() == "Partial summary</sum"
+
+
+def test_untagged_output_is_the_summary():
+    parser, completed, streamed = _feed(["Just a ", "plain summary."])
+
+    assert completed == []
+    assert streamed == ""
+    assert parser.summary() == "Just a plain summary."
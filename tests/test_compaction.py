@@ -0,0 +1,99 @@
+import pytest
+
+from app.fhir.resources import ObservationHandler
+from app.processing.compaction import _trend, compact_observations, is_abnormal
+
+
+@pytest.mark.parametrize(
+    "series, trend",
+    [
+        ([], None),
+        ([5.0], None),
+        ([5.0, 5.0, 5.0], "stable"),
+        ([100.0, 101.0, 99.0, 102.0], "stable"),
+        ([5.0, 6.0, 7.0, 8.0], "rising"),
+        ([8.0, 7.0, 6.0, 5.0], "falling"),
+        # A spike in the middle doesn't make a trend
+        ([5.0, 9.0, 5.0], "stable"),
+        # Around zero the range sets the scale
+        ([-1.0, 0.0, 1.0], "rising"),
+        ([0.0, 0.0], "stable"),
+    ],
+)
+def test_trend(series, trend):
+    assert _trend(series) == trend
+
+
+@pytest.mark.parametrize(
+    "interpretation, abnormal",
+    [("H", True), ("Low", True), ("N", False), ("Normal ", False), ("", False), (None, False)],
+)
+def test_is_abnormal(interpretation, abnormal):
+    assert is_abnormal(interpretation) is abnormal
+
+
+def _results(sample, values_and_flags):
+    return [
+        {
+            **sample,
+            "id": f"obs-{i}",
+            "effectiveDateTime": f"2024-01-{i + 1:02d}",
+            "valueQuantity": {"value": value, "unit": "%"},
+            "interpretation": [{"coding": [{"display": flag}]}],
+        }
+        for i, (value, flag) in enumerate(values_and_flags)
+    ]
+
+
+def test_compaction_keeps_latest_stats_and_earlier_abnormal_results(sample_observation_resource):
+    results = _results(
+        sample_observation_resource,
+        [(6.0, "Normal"), (7.5, "High"), (6.5, "Normal"), (7.0, "High"), (8.0, "High")],
+    )
+    # Out of date order: compaction sorts by effective date
+    table = ObservationHandler().to_records(list(reversed(results)))
+
+    rows = compact_observations(table, window=3).to_dicts()
+
+    latest = rows[0]
+    assert (latest["row"], latest["value"], latest["effective_date"]) == (
+        "latest",
+        "8.0",
+        "2024-01-05",
+    )
+    assert latest["count"] == 5
+    # Stats cover the last three values only
+    assert (latest["min"], latest["max"], latest["trend"]) == ("6.5", "8", "rising")
+    earlier = rows[1:]
+    assert [row["row"] for row in earlier] == ["earlier abnormal"] * 2
+    assert [row["effective_date"] for row in earlier] == ["2024-01-04", "2024-01-02"]
+    assert all(row["loinc_code"] is None and row["count"] is None for row in earlier)
+
+
+def test_compaction_groups_by_code_then_name(sample_observation_resource):
+    glucose = {
+        **sample_observation_resource,
+        "code": {"coding": [{"code": "2345-7", "display": "Glucose"}]},
+    }
+    uncoded = {**sample_observation_resource, "code": {"text": "Pain score"}}
+    resources = [sample_observation_resource, glucose, glucose, uncoded, uncoded, uncoded]
+    table = ObservationHandler().to_records(resources)
+
+    rows = compact_observations(table).to_dicts()
+
+    counts = {row["observation_name"]: row["count"] for row in rows if row["row"] == "latest"}
+    assert counts == {
+        "Hemoglobin A1c/Hemoglobin.total in Blood": 1,
+        "Glucose": 2,
+        "Pain score": 3,
+    }
+
+
+def test_non_numeric_values_have_no_stats(sample_observation_resource):
+    resource = {**sample_observation_resource, "valueString": "trace"}
+    del resource["valueQuantity"]
+
+    (row,) = compact_observations(ObservationHandler().to_records([resource])).to_dicts()
+
+    assert (row["min"], row["max"], row["trend"]) == (None, None, None)
+    assert compact_observations(ObservationHandler().to_records([])).empty
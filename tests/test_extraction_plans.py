@@ -0,0 +1,406 @@
+"""Compiled extraction plans against rows frozen from the hand-written handlers.
+
+The expected rows are what the handlers produced before their fields were
+compiled into ``ExtractionPlan``s; each case overrides or drops elements of a
+conftest fixture and lists only the columns that differ from the fixture's row.
+"""
+
+import datetime
+
+import pytest
+
+from app.fhir.resources import (
+    AllergyHandler,
+    ConditionHandler,
+    MedicationRequestHandler,
+    ObservationHandler,
+    PatientHandler,
+)
+from app.fhir.resources import patient as patient_module
+
+
+class FixedDate(datetime.date):
+    @classmethod
+    def today(cls):
+        return cls(2025, 6, 1)
+
+
+@pytest.fixture(autouse=True)
+def fixed_today(monkeypatch):
+    monkeypatch.setattr(patient_module, "date", FixedDate)
+
+
+BASE_ROWS = {
+    PatientHandler: {
+        "patient_id": "test-patient-123",
+        "full_name": "John Robert Smith",
+        "birth_date": "1970-01-15",
+        "age": 55,
+        "gender": "male",
+        "address": "123 Main St, Boston, MA, 02101",
+        "phone": "555-123-4567",
+        "email": "john.smith@email.com",
+        "language": "",
+        "marital_status": "",
+    },
+    ConditionHandler: {
+        "condition_id": "condition-123",
+        "condition_name": "Type 2 diabetes mellitus",
+        "clinical_status": "Active",
+        "verification_status": "Confirmed",
+        "severity": "",
+        "category": "",
+        "onset_date": "2015-03-01",
+        "abatement_date": "",
+        "recorded_date": "",
+    },
+    MedicationRequestHandler: {
+        "medication_id": "medrx-123",
+        "medication_name": "Metformin 500 MG Oral Tablet",
+        "status": "active",
+        "intent": "order",
+        "dosage_text": "Take 1 tablet by mouth twice daily",
+        "dose_value": "500",
+        "dose_unit": "mg",
+        "frequency": "BID",
+        "route": "Oral",
+        "prescribed_date": "2024-01-15",
+        "reason": "",
+    },
+    ObservationHandler: {
+        "observation_id": "obs-123",
+        "observation_name": "Hemoglobin A1c/Hemoglobin.total in Blood",
+        "loinc_code": "4548-4",
+        "value": "7.2",
+        "unit": "%",
+        "status": "final",
+        "category": "Laboratory",
+        "effective_date": "2024-01-10",
+        "interpretation": "High",
+        "reference_range": "4.0-5.6 %",
+    },
+    AllergyHandler: {
+        "allergy_id": "allergy-123",
+        "allergen": "Penicillin G",
+        "clinical_status": "Active",
+        "verification_status": "Confirmed",
+        "type": "allergy",
+        "category": "medication",
+        "criticality": "high",
+        "onset_date": "2010-06-01",
+        "reaction": "Hives",
+        "reaction_severity": "moderate",
+    },
+}
+
+CASES = [
+    pytest.param(
+        PatientHandler,
+        "sample_patient_resource",
+        {},
+        (),
+        {},
+        id="patient",
+    ),
+    pytest.param(
+        PatientHandler,
+        "sample_patient_resource",
+        {"telecom": []},
+        ("name",),
+        {"full_name": "", "phone": "", "email": ""},
+        id="patient-no-name-or-telecom",
+    ),
+    pytest.param(
+        PatientHandler,
+        "sample_patient_resource",
+        {"name": [{"use": "nickname", "given": ["Jack"]}, {"family": "Smith"}]},
+        (),
+        {"full_name": "Jack"},
+        id="patient-unofficial-name",
+    ),
+    pytest.param(
+        PatientHandler,
+        "sample_patient_resource",
+        {"birthDate": "1970-13-01"},
+        (),
+        {"birth_date": "1970-13-01", "age": None},
+        id="patient-bad-birth-date",
+    ),
+    pytest.param(
+        PatientHandler,
+        "sample_patient_resource",
+        {
+            "communication": [
+                {"language": {"text": "Spanish"}},
+                {"language": {"coding": [{"display": "English"}]}, "preferred": True},
+            ],
+            "maritalStatus": {"coding": []},
+        },
+        (),
+        {"language": "English"},
+        id="patient-preferred-language",
+    ),
+    pytest.param(
+        ConditionHandler,
+        "sample_condition_resource",
+        {},
+        (),
+        {},
+        id="condition",
+    ),
+    pytest.param(
+        ConditionHandler,
+        "sample_condition_resource",
+        {
+            "code": {"coding": []},
+            "clinicalStatus": {"coding": [], "text": "Active"},
+            "category": [{"coding": []}],
+        },
+        (),
+        {"condition_name": ""},
+        id="condition-empty-codings",
+    ),
+    pytest.param(
+        ConditionHandler,
+        "sample_condition_resource",
+        {"onsetAge": {"value": 45}, "abatementPeriod": {"start": "2020-01-01"}},
+        ("onsetDateTime",),
+        {"onset_date": "45 years", "abatement_date": "2020-01-01"},
+        id="condition-onset-age",
+    ),
+    pytest.param(
+        ConditionHandler,
+        "sample_condition_resource",
+        {"onsetRange": {"low": {"value": 30}}, "abatementString": "resolved"},
+        ("onsetDateTime",),
+        {"onset_date": "30", "abatement_date": "resolved"},
+        id="condition-onset-range",
+    ),
+    pytest.param(
+        ConditionHandler,
+        "sample_condition_resource",
+        {"onsetPeriod": {"end": "2016"}},
+        ("onsetDateTime",),
+        {"onset_date": ""},
+        id="condition-onset-period",
+    ),
+    pytest.param(
+        ConditionHandler,
+        "sample_condition_resource",
+        {},
+        ("onsetDateTime", "code"),
+        {"condition_name": "", "onset_date": ""},
+        id="condition-no-onset",
+    ),
+    pytest.param(
+        MedicationRequestHandler,
+        "sample_medication_request_resource",
+        {},
+        (),
+        {},
+        id="medication",
+    ),
+    pytest.param(
+        MedicationRequestHandler,
+        "sample_medication_request_resource",
+        {"medicationReference": {"reference": "Medication/1", "display": "Insulin"}},
+        ("medicationCodeableConcept",),
+        {"medication_name": "Insulin"},
+        id="medication-reference",
+    ),
+    pytest.param(
+        MedicationRequestHandler,
+        "sample_medication_request_resource",
+        {"dosageInstruction": [], "reasonCode": [{"text": "Diabetes"}]},
+        (),
+        {
+            "dosage_text": "",
+            "dose_value": "",
+            "dose_unit": "",
+            "frequency": "",
+            "route": "",
+            "reason": "Diabetes",
+        },
+        id="medication-no-dosage",
+    ),
+    pytest.param(
+        MedicationRequestHandler,
+        "sample_medication_request_resource",
+        {
+            "dosageInstruction": [
+                {
+                    "timing": {
+                        "code": {"coding": []},
+                        "repeat": {"frequency": 2, "period": 1, "periodUnit": "d"},
+                    },
+                    "doseAndRate": [{}],
+                },
+            ],
+        },
+        (),
+        {
+            "dosage_text": "",
+            "dose_value": "",
+            "dose_unit": "",
+            "frequency": "2x per 1 d",
+            "route": "",
+        },
+        id="medication-timing-repeat",
+    ),
+    pytest.param(
+        MedicationRequestHandler,
+        "sample_medication_request_resource",
+        {},
+        ("medicationCodeableConcept", "dosageInstruction"),
+        {
+            "medication_name": "",
+            "dosage_text": "",
+            "dose_value": "",
+            "dose_unit": "",
+            "frequency": "",
+            "route": "",
+        },
+        id="medication-unnamed",
+    ),
+    pytest.param(
+        ObservationHandler,
+        "sample_observation_resource",
+        {},
+        (),
+        {},
+        id="observation",
+    ),
+    pytest.param(
+        ObservationHandler,
+        "sample_observation_resource",
+        {"interpretation": [], "referenceRange": [{"text": "normal"}]},
+        ("valueQuantity",),
+        {"value": "", "unit": "", "interpretation": "", "reference_range": "normal"},
+        id="observation-no-value",
+    ),
+    pytest.param(
+        ObservationHandler,
+        "sample_observation_resource",
+        {"valueCodeableConcept": {"coding": [{"display": "Positive"}]}, "code": {"coding": []}},
+        ("valueQuantity",),
+        {"observation_name": "", "loinc_code": "", "value": "Positive", "unit": ""},
+        id="observation-codeable-value",
+    ),
+    pytest.param(
+        ObservationHandler,
+        "sample_observation_resource",
+        {"valueString": "trace", "effectivePeriod": {"start": "2024-01-01"}},
+        ("valueQuantity", "effectiveDateTime"),
+        {"value": "trace", "unit": "", "effective_date": "2024-01-01"},
+        id="observation-string-value",
+    ),
+    pytest.param(
+        ObservationHandler,
+        "sample_observation_resource",
+        {"valueBoolean": False, "effectiveInstant": "2024-01-01T10:00:00Z"},
+        ("valueQuantity", "effectiveDateTime"),
+        {"value": "False", "unit": "", "effective_date": "2024-01-01T10:00:00Z"},
+        id="observation-false-value",
+    ),
+    pytest.param(
+        ObservationHandler,
+        "sample_observation_resource",
+        {"valueInteger": 0, "referenceRange": [{"high": {"value": 5, "unit": "mg"}}]},
+        ("valueQuantity",),
+        {"value": "0", "unit": "", "reference_range": "<= 5 mg"},
+        id="observation-zero-value",
+    ),
+    pytest.param(
+        ObservationHandler,
+        "sample_observation_resource",
+        {
+            "valueRange": {"low": {"value": 1}, "high": {"value": 3}},
+            "referenceRange": [{"low": {"value": 0}}],
+        },
+        ("valueQuantity",),
+        {"value": "1-3", "unit": "", "reference_range": ">= 0 None"},
+        id="observation-range-value",
+    ),
+    pytest.param(
+        ObservationHandler,
+        "sample_observation_resource",
+        {"valueRatio": {"numerator": {"value": 1}, "denominator": {"value": 0}}},
+        ("valueQuantity",),
+        {"value": "", "unit": ""},
+        id="observation-ratio-value",
+    ),
+    pytest.param(
+        ObservationHandler,
+        "sample_observation_resource",
+        {"valueQuantity": {"unit": "%"}, "category": []},
+        (),
+        {"value": "", "category": ""},
+        id="observation-quantity-without-value",
+    ),
+    pytest.param(
+        AllergyHandler,
+        "sample_allergy_resource",
+        {},
+        (),
+        {},
+        id="allergy",
+    ),
+    pytest.param(
+        AllergyHandler,
+        "sample_allergy_resource",
+        {"onsetString": "childhood", "category": ["food", "environment"]},
+        ("onsetDateTime",),
+        {"category": "food, environment", "onset_date": "childhood"},
+        id="allergy-onset-string",
+    ),
+    pytest.param(
+        AllergyHandler,
+        "sample_allergy_resource",
+        {
+            "reaction": [{"manifestation": [{"coding": []}, {"text": "Rash"}]}],
+            "code": {"coding": []},
+        },
+        (),
+        {"allergen": "", "reaction": "Rash", "reaction_severity": ""},
+        id="allergy-empty-manifestations",
+    ),
+    pytest.param(
+        AllergyHandler,
+        "sample_allergy_resource",
+        {"reaction": []},
+        ("category", "onsetDateTime"),
+        {"category": "", "onset_date": "", "reaction": "", "reaction_severity": ""},
+        id="allergy-no-reaction",
+    ),
+]
+
+
+def _resource(request, fixture: str, changes: dict, drop: tuple) -> dict:
+    resource = {**request.getfixturevalue(fixture), **changes}
+    return {key: value for key, value in resource.items() if key not in drop}
+
+
+@pytest.mark.parametrize("handler_class, fixture, changes, drop, expected", CASES)
+def test_extract_fields_matches_frozen_rows(
+    request, handler_class, fixture, changes, drop, expected
+):
+    resource = _resource(request, fixture, changes, drop)
+
+    row = handler_class().extract_fields(resource)
+
+    assert row == {**BASE_ROWS[handler_class], **expected}
+    assert list(row) == list(BASE_ROWS[handler_class])
+
+
+@pytest.mark.parametrize("handler_class", list(BASE_ROWS))
+def test_to_records_matches_row_extraction(request, handler_class):
+    handler = handler_class()
+    resources = [
+        _resource(request, *case.values[1:4]) for case in CASES if case.values[0] is handler_class
+    ]
+
+    table = handler.to_records(resources)
+
+    assert table.columns == tuple(BASE_ROWS[handler_class])
+    assert table.to_dicts() == [handler.extract_fields(resource) for resource in resources]
+    assert handler.to_records([]).empty
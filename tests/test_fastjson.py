@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from app import fastjson
+from app.fhir.bundle import bundle_from_dict, decode_bundle
+
+BACKENDS = ["json"] + [
+    name for name, module in (("orjson", fastjson.orjson), ("msgspec", fastjson.msgspec)) if module
+]
+
+BUNDLE = {
+    "resourceType": "Bundle",
+    "id": "page-1",
+    "type": "searchset",
+    "total": 2,
+    "meta": {"lastUpdated": "2025-06-01T00:00:00Z", "versionId": "3"},
+    "link": [
+        {"relation": "self", "url": "http://fhir/Patient?name=M%C3%BCller"},
+        {"relation": "next", "url": "http://fhir/Patient?_getpagesoffset=1"},
+    ],
+    "entry": [
+        {
+            "fullUrl": "http://fhir/Patient/p1",
+            "resource": {
+                "resourceType": "Patient",
+                "id": "p1",
+                "name": [{"family": "Müller-Łukasz", "given": ["Zoë", "李"]}],
+                "birthDate": "1970-01-15",
+                "extension": [{"valueDecimal": 7.25, "valueBoolean": True, "valueString": None}],
+            },
+            "search": {"mode": "match"},
+        },
+        {"fullUrl": "http://fhir/Patient/p2", "resource": {"resourceType": "Patient", "id": "p2"}},
+    ],
+}
+
+BATCH_RESPONSE = {
+    "resourceType": "Bundle",
+    "type": "batch-response",
+    "entry": [
+        {"resource": BUNDLE, "response": {"status": "200 OK", "etag": 'W/"1"'}},
+        {"response": {"status": "404 Not Found"}},
+    ],
+}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("as_text", [False, True], ids=["bytes", "str"])
+def test_backends_decode_like_the_stdlib(backend, as_text):
+    _, loads, _ = fastjson._select_backend(backend)
+    content = json.dumps(BUNDLE, ensure_ascii=False)
+
+    assert loads(content if as_text else content.encode()) == BUNDLE
+    # Escaped non-ASCII decodes to the same text
+    assert loads(json.dumps(BUNDLE).encode()) == BUNDLE
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_encode_like_the_stdlib(backend):
+    _, _, dumps = fastjson._select_backend(backend)
+    _, _, stdlib_dumps = fastjson._select_backend("json")
+
+    encoded = dumps(BUNDLE)
+
+    assert encoded == stdlib_dumps(BUNDLE)
+    assert "Müller-Łukasz".encode() in encoded
+    assert json.loads(encoded) == BUNDLE
+
+
+@pytest.mark.parametrize("bundle", [BUNDLE, BATCH_RESPONSE], ids=["searchset", "batch-response"])
+@pytest.mark.parametrize("as_text", [False, True], ids=["bytes", "str"])
+def test_decode_bundle_matches_the_dict_path(bundle, as_text):
+    content = json.dumps(bundle, ensure_ascii=False)
+
+    decoded = decode_bundle(content if as_text else content.encode())
+
+    assert decoded == bundle_from_dict(json.loads(content))
+
+
+def test_decode_bundle_falls_back_on_unexpected_shapes():
+    # An integer status doesn't fit the typed structs
+    bundle = {"type": "batch-response", "entry": [{"response": {"status": 200}}]}
+
+    decoded = decode_bundle(json.dumps(bundle).encode())
+
+    assert decoded == bundle_from_dict(bundle)
+    assert decoded.entries[0].status == "200"
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        fastjson._select_backend("yaml")
@@ -0,0 +1,131 @@
+import json
+
+import httpx
+
+from app.fhir.cache import FHIRCache
+from app.fhir.client import FHIRClient
+
+KEY = FHIRCache.make_key("http://fhir", "Patient", "p1")
+
+
+def test_key_ignores_param_order():
+    first = FHIRCache.make_key("http://fhir", "Condition", params={"a": "1", "b": "2"})
+    second = FHIRCache.make_key("http://fhir", "Condition", params={"b": "2", "a": "1"})
+
+    assert first == second
+
+
+def test_ttl_per_resource_type():
+    cache = FHIRCache(max_bytes=1000, ttls={"Patient": 60}, default_ttl=0)
+    observation = FHIRCache.make_key("http://fhir", "Observation", params={"patient": "p1"})
+    cache.put(KEY, "Patient", {"id": "p1"}, nbytes=10)
+    cache.put(observation, "Observation", [], nbytes=10)
+
+    assert cache.get(KEY).is_fresh()
+    # Expired entries are kept for revalidation, and counted as stale
+    stale = cache.get(observation)
+    assert stale is not None and not stale.is_fresh()
+    assert (cache.stats.hits, cache.stats.stale) == (1, 1)
+
+    cache.refresh(observation)
+    assert cache.stats.revalidated == 1
+
+
+def test_least_recently_used_entries_are_evicted_over_budget():
+    cache = FHIRCache(max_bytes=30, ttls={}, default_ttl=60)
+    keys = [FHIRCache.make_key("http://fhir", "Patient", str(i)) for i in range(3)]
+    for key in keys:
+        cache.put(key, "Patient", {}, nbytes=10)
+    cache.get(keys[0])
+
+    cache.put(FHIRCache.make_key("http://fhir", "Patient", "new"), "Patient", {}, nbytes=10)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    snapshot = cache.snapshot()
+    assert (snapshot["entries"], snapshot["bytes"], snapshot["evictions"]) == (3, 30, 1)
+
+
+def test_oversized_and_replaced_entries_keep_the_byte_count_right():
+    cache = FHIRCache(max_bytes=100, ttls={}, default_ttl=60)
+    cache.put(KEY, "Patient", {}, nbytes=500)
+    assert cache.get(KEY) is None
+
+    cache.put(KEY, "Patient", {"v": 1}, nbytes=40)
+    cache.put(KEY, "Patient", {"v": 2}, nbytes=60)
+
+    assert cache.get(KEY).value == {"v": 2}
+    assert cache.snapshot()["bytes"] == 60
+
+
+async def test_stale_read_is_revalidated_with_the_etag(sample_patient_resource):
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("If-None-Match") == 'W/"1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200, content=json.dumps(sample_patient_resource).encode(), headers={"ETag": 'W/"1"'}
+        )
+
+    cache = FHIRCache(max_bytes=10_000, ttls={}, default_ttl=0)
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://fhir")
+    client = FHIRClient(base_url="http://fhir", http_client=http, cache=cache)
+
+    first = await client.get_resource("Patient", "test-patient-123")
+    second = await client.get_resource("Patient", "test-patient-123")
+
+    assert first == second == sample_patient_resource
+    assert "If-None-Match" not in requests[0].headers
+    assert requests[1].headers["If-None-Match"] == 'W/"1"'
+    assert cache.stats.revalidated == 1
+
+
+async def test_deleted_resource_is_dropped_from_the_cache(sample_patient_resource):
+    status = 200
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(status, content=json.dumps(sample_patient_resource).encode())
+
+    cache = FHIRCache(max_bytes=10_000, ttls={}, default_ttl=0)
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://fhir")
+    client = FHIRClient(base_url="http://fhir", http_client=http, cache=cache)
+    await client.get_resource("Patient", "test-patient-123")
+
+    status = 404
+    assert await client.get_resource("Patient", "test-patient-123") is None
+    assert cache.snapshot()["entries"] == 0
+
+
+async def test_old_searches_are_refetched_so_deletions_show_up(sample_condition_resource):
+    conditions = [sample_condition_resource, {**sample_condition_resource, "id": "deleted"}]
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.params.get("_summary") == "count":
+            # A hard delete leaves nothing with a newer _lastUpdated
+            return httpx.Response(200, json={"resourceType": "Bundle", "total": 0})
+        bundle = {
+            "resourceType": "Bundle",
+            "type": "searchset",
+            "meta": {"lastUpdated": "2024-01-01T00:00:00Z"},
+            "entry": [{"resource": resource} for resource in conditions],
+        }
+        return httpx.Response(200, content=json.dumps(bundle).encode())
+
+    cache = FHIRCache(max_bytes=10_000, ttls={}, default_ttl=0, max_age=3600)
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://fhir")
+    client = FHIRClient(base_url="http://fhir", http_client=http, cache=cache)
+    params = {"patient": "p1"}
+
+    assert len(await client.search_resources("Condition", params)) == 2
+    conditions.pop()
+    # Within max_age the stale entry is revalidated by the probe and kept
+    assert len(await client.search_resources("Condition", params)) == 2
+    assert requests[-1].url.params["_summary"] == "count"
+
+    cache.max_age = 0
+    assert len(await client.search_resources("Condition", params)) == 1
+    assert "_summary" not in requests[-1].url.params
@@ -0,0 +1,72 @@
+import asyncio
+
+from app.processing.jobs import BatchJob, BatchJobManager
+
+
+async def _summarize(patient_id: str) -> dict:
+    await asyncio.sleep(0)
+    return {"patient_id": patient_id, "status": "ok"}
+
+
+async def test_job_runs_every_patient():
+    manager = BatchJobManager()
+    job = BatchJob(job_id="j", patient_ids=["a", "b", "c"])
+
+    await manager._run(job, _summarize)
+
+    assert job.status == "completed"
+    assert sorted(r["patient_id"] for r in job.results) == ["a", "b", "c"]
+    assert job.finished_at is not None
+
+
+async def test_cancel_while_preparing_finishes_the_job():
+    manager = BatchJobManager()
+    job = BatchJob(job_id="j", patient_ids=[])
+    preparing = asyncio.Event()
+
+    async def prepare() -> list[str]:
+        preparing.set()
+        await asyncio.sleep(10)
+        return ["a"]
+
+    manager._jobs[job.job_id] = job
+    job._task = asyncio.create_task(manager._run(job, _summarize, prepare))
+    await preparing.wait()
+    await manager.cancel(job.job_id)
+
+    assert job.status == "cancelled"
+    assert job.done
+    # Readers waiting on the job are released
+    assert [r async for r in job.iter_results()] == []
+
+
+async def test_cancel_while_running_stops_workers():
+    manager = BatchJobManager()
+    job = BatchJob(job_id="j", patient_ids=["a", "b"])
+    started = asyncio.Event()
+
+    async def slow(patient_id: str) -> dict:
+        started.set()
+        await asyncio.sleep(10)
+        return {"patient_id": patient_id, "status": "ok"}
+
+    manager._jobs[job.job_id] = job
+    job._task = asyncio.create_task(manager._run(job, slow))
+    await started.wait()
+    await manager.cancel(job.job_id)
+
+    assert job.status == "cancelled"
+    assert job.results == []
+
+
+async def test_prepare_failure_fails_the_job():
+    manager = BatchJobManager()
+    job = BatchJob(job_id="j", patient_ids=[])
+
+    async def prepare() -> list[str]:
+        raise OSError("export failed")
+
+    await manager._run(job, _summarize, prepare)
+
+    assert job.status == "failed"
+    assert job.error == "export failed"
@@ -0,0 +1,109 @@
+import itertools
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from app.llm import cache as cache_module
+from app.llm.cache import LLMCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing ``time.time()`` so LRU order doesn't depend on clock resolution."""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(cache_module.time, "time", lambda: float(next(ticks)))
+
+
+def _key(prompt: str) -> str:
+    return LLMCache.make_key("gpt-test", 0.3, 500, "system", prompt)
+
+
+def test_key_covers_every_request_parameter():
+    key = _key("prompt")
+
+    assert key == _key("prompt")
+    assert key != LLMCache.make_key("other-model", 0.3, 500, "system", "prompt")
+    assert key != LLMCache.make_key("gpt-test", 0.7, 500, "system", "prompt")
+    assert key != LLMCache.make_key("gpt-test", 0.3, 500, None, "prompt")
+    assert LLMCache.make_key("m", 0.3, 500, None, "p") == LLMCache.make_key("m", 0.3, 500, "", "p")
+
+
+async def test_memory_tier_evicts_least_recently_used():
+    cache = LLMCache(max_bytes=10, path="")
+    await cache.put(_key("a"), "aaaa")
+    await cache.put(_key("b"), "bbbb")
+    await cache.get(_key("a"))
+
+    await cache.put(_key("c"), "cccc")
+
+    assert await cache.get(_key("b")) is None
+    assert await cache.get(_key("a")) == "aaaa"
+    assert cache.snapshot()["bytes"] == 8
+
+
+async def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    cache = LLMCache(max_bytes=1000, path=path, disk_max_bytes=1000)
+    await cache.put(_key("a"), "summary")
+    cache.close()
+
+    restarted = LLMCache(max_bytes=1000, path=path, disk_max_bytes=1000)
+    assert await restarted.get(_key("a")) == "summary"
+    # Promoted to memory: the second read doesn't touch SQLite
+    assert await restarted.get(_key("a")) == "summary"
+    assert (restarted.stats.disk_hits, restarted.stats.memory_hits) == (1, 1)
+    assert await restarted.get(_key("missing")) is None
+    assert restarted.stats.misses == 1
+    restarted.close()
+
+
+async def test_disk_tier_evicts_least_recently_read(tmp_path, clock):
+    path = str(tmp_path / "llm.sqlite")
+    # A tiny memory tier so reads reach SQLite
+    cache = LLMCache(max_bytes=1, path=path, disk_max_bytes=10)
+    await cache.put(_key("a"), "aaaa")
+    await cache.put(_key("b"), "bbbb")
+    await cache.get(_key("a"))
+
+    await cache.put(_key("c"), "cccc")
+
+    assert await cache.get(_key("b")) is None
+    assert await cache.get(_key("a")) == "aaaa"
+    assert await cache.get(_key("c")) == "cccc"
+    assert cache.stats.evictions == 1
+    cache.close()
+
+
+async def test_replacing_a_disk_entry_does_not_double_count_it(tmp_path):
+    cache = LLMCache(max_bytes=1, path=str(tmp_path / "llm.sqlite"), disk_max_bytes=8)
+    await cache.put(_key("a"), "aaaa")
+    await cache.put(_key("a"), "AAAA")
+    await cache.put(_key("b"), "bbbb")
+
+    assert await cache.get(_key("a")) == "AAAA"
+    assert cache.stats.evictions == 0
+    cache.close()
+
+
+def _accessed(path: str, key: str) -> float:
+    with closing(sqlite3.connect(path)) as conn:
+        return conn.execute("SELECT accessed FROM completions WHERE key = ?", (key,)).fetchone()[0]
+
+
+async def test_disk_hits_are_written_in_batches(tmp_path, clock):
+    path = str(tmp_path / "llm.sqlite")
+    cache = LLMCache(max_bytes=1, path=path, disk_max_bytes=1000)
+    cache._disk.flush_every = 2
+    await cache.put(_key("a"), "aaaa")
+    await cache.put(_key("b"), "bbbb")
+    stored = _accessed(path, _key("a"))
+
+    await cache.get(_key("a"))
+    # Buffered: nothing committed for a single read
+    assert _accessed(path, _key("a")) == stored
+
+    await cache.get(_key("b"))
+    assert _accessed(path, _key("a")) > stored
+    cache.close()
+
@@ -0,0 +1,72 @@
+import re
+
+import httpx
+
+from app import metrics
+from app.api.dependencies import get_fhir_client
+from app.fhir.client import FHIRClient
+from app.main import create_app
+from app.mock.fhir_server import create_fhir_app
+
+SAMPLE = re.compile(r"^(\w+)(?:\{(.*)\})? (\S+)$")
+
+
+def _samples(text: str) -> dict[tuple[str, frozenset], float]:
+    """Exposition lines as ``{(name, labels): value}``, comments skipped."""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("#") or not line:
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        pairs = re.findall(r'(\w+)="([^"]*)"', labels or "")
+        samples[(name, frozenset(pairs))] = float(value)
+    return samples
+
+
+async def test_metrics_endpoint_after_one_request():
+    fhir = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=create_fhir_app()), base_url="http://fhir"
+    )
+
+    async def fhir_client():
+        client = FHIRClient(base_url="http://fhir", http_client=fhir)
+        client.batch_mode = False
+        yield client
+
+    app = create_app()
+    app.dependency_overrides[get_fhir_client] = fhir_client
+    # Metrics are process-wide, so compare against what earlier tests left behind
+    before = _samples(metrics.render())
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://api"
+    ) as api:
+        assert (await api.get("/api/v1/resources/patient-0")).status_code == 200
+        response = await api.get("/metrics")
+
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    text = response.text
+    assert "# TYPE fhir_requests_total counter" in text
+    assert "# TYPE fhir_fetch_seconds histogram" in text
+    after = _samples(text)
+
+    def delta(name: str, **labels: str) -> float:
+        key = (name, frozenset(labels.items()))
+        return after[key] - before.get(key, 0)
+
+    assert delta("fhir_requests_total", resource_type="Patient") == 1
+    for resource_type in ("Patient", "Condition", "Observation"):
+        # A search may take several pages, but it is one fetch
+        assert delta("fhir_requests_total", resource_type=resource_type) >= 1
+        assert delta("fhir_response_bytes_total", resource_type=resource_type) > 0
+        assert delta("fhir_fetch_seconds_count", resource_type=resource_type) == 1
+        assert delta("fhir_fetch_seconds_bucket", resource_type=resource_type, le="+Inf") == 1
+    # Buckets are cumulative and end at the count
+    patient = ("resource_type", "Patient")
+    buckets = [
+        value
+        for (name, labels), value in after.items()
+        if name == "fhir_fetch_seconds_bucket" and patient in labels
+    ]
+    assert buckets == sorted(buckets)
+    assert buckets[-1] == after[("fhir_fetch_seconds_count", frozenset({patient}))]
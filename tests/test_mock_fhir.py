@@ -0,0 +1,45 @@
+import pytest
+
+from app.mock.fhir_server import MockFHIRConfig, MockFHIRServer, _project
+from app.mock.synthetic import generate_patient
+from app.processing.pipeline import RESOURCE_ELEMENTS, RESOURCE_HANDLERS
+
+PATIENT_ID = "patient-0"
+
+
+def test_choice_elements_keep_their_typed_variants():
+    resource = {
+        "resourceType": "Observation",
+        "id": "o1",
+        "valueQuantity": {"value": 5},
+        "effectiveDateTime": "2024-01-01",
+        "valueset": "not a choice variant",
+        "status": "final",
+    }
+
+    projected = _project(resource, "value,effective")
+
+    assert projected == {
+        "resourceType": "Observation",
+        "id": "o1",
+        "valueQuantity": {"value": 5},
+        "effectiveDateTime": "2024-01-01",
+    }
+
+
+@pytest.mark.parametrize("resource_type", list(RESOURCE_HANDLERS))
+def test_projected_response_extracts_like_the_full_resource(resource_type):
+    server = MockFHIRServer(MockFHIRConfig())
+    params = {"_elements": ",".join(RESOURCE_ELEMENTS[resource_type])}
+    if resource_type == "Patient":
+        _, body = server.read("Patient", PATIENT_ID, params)
+        projected = [body]
+    else:
+        params.update(patient=PATIENT_ID, _count="1000")
+        _, bundle = server.search(resource_type, params, "http://fhir")
+        projected = [entry["resource"] for entry in bundle["entry"]]
+    full = generate_patient(PATIENT_ID)[resource_type]
+
+    handler = RESOURCE_HANDLERS[resource_type]
+    assert projected
+    assert handler.to_records(projected).to_dicts() == handler.to_records(full).to_dicts()
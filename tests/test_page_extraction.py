@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import httpx
+
+from app.fhir.client import FHIRClient
+from app.fhir.resources import RecordTable
+from app.processing.pipeline import PageExtractor, extract_patient_data, fetch_patient_data
+
+PAGES = 3
+PER_PAGE = 2
+
+
+def _conditions(page: int, template: dict) -> list[dict]:
+    return [
+        {**template, "id": f"condition-{page}-{i}", "onsetDateTime": f"2015-0{page + 1}-0{i + 1}"}
+        for i in range(PER_PAGE)
+    ]
+
+
+def _transport(patient: dict, condition: dict, log: list[str]) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.startswith("/Patient/"):
+            return httpx.Response(200, json=patient)
+        bundle = {"resourceType": "Bundle", "type": "searchset", "entry": []}
+        if path == "/Condition":
+            page = int(request.url.params.get("page", "0"))
+            log.append(f"get {page}")
+            bundle["entry"] = [{"resource": r} for r in _conditions(page, condition)]
+            if page + 1 < PAGES:
+                bundle["link"] = [
+                    {"relation": "next", "url": f"http://fhir/Condition?page={page + 1}"}
+                ]
+        return httpx.Response(200, content=json.dumps(bundle).encode())
+
+    return httpx.MockTransport(handler)
+
+
+def _client(transport: httpx.MockTransport) -> FHIRClient:
+    http = httpx.AsyncClient(transport=transport, base_url="http://fhir")
+    client = FHIRClient(base_url="http://fhir", http_client=http)
+    client.batch_mode = False
+    return client
+
+
+async def test_pages_are_extracted_while_the_next_one_downloads(
+    sample_patient_resource, sample_condition_resource
+):
+    log: list[str] = []
+    client = _client(_transport(sample_patient_resource, sample_condition_resource, log))
+
+    async def on_page(resource_type: str, resources: list[dict]) -> None:
+        log.append(f"extract {resources[0]['id']}")
+        await asyncio.sleep(0.01)
+        log.append(f"done {resources[0]['id']}")
+
+    results = await client.search_resources(
+        "Condition", {"patient": "p"}, max_pages=None, on_page=on_page
+    )
+
+    assert len(results) == PAGES * PER_PAGE
+    # Page 1 is requested before page 0 has finished extracting
+    assert log.index("get 1") < log.index("done condition-0-0")
+    assert log.index("get 2") < log.index("done condition-1-0")
+
+
+async def test_page_callback_gets_only_what_fits_the_budget(
+    sample_patient_resource, sample_condition_resource
+):
+    client = _client(_transport(sample_patient_resource, sample_condition_resource, []))
+    seen: list[int] = []
+
+    async def on_page(resource_type: str, resources: list[dict]) -> None:
+        seen.append(len(resources))
+
+    results = await client.search_resources(
+        "Condition", {"patient": "p"}, max_pages=None, max_resources=3, on_page=on_page
+    )
+
+    assert len(results) == 3
+    assert seen == [2, 1]
+    assert client.truncated["Condition"] is True
+
+
+async def test_fetch_patient_data_matches_extracting_everything_at_once(
+    sample_patient_resource, sample_condition_resource
+):
+    client = _client(_transport(sample_patient_resource, sample_condition_resource, []))
+    client.max_pages = None
+
+    data = await fetch_patient_data("test-patient-123", client)
+
+    conditions = [r for page in range(PAGES) for r in _conditions(page, sample_condition_resource)]
+    expected = extract_patient_data(
+        "test-patient-123", {"Patient": [sample_patient_resource], "Condition": conditions}
+    )
+    for resource_type, table in expected.tables.items():
+        assert data.tables[resource_type].columns == table.columns
+        assert data.tables[resource_type].to_dicts() == table.to_dicts()
+    assert data.data_availability == expected.data_availability
+
+
+def test_page_extractor_skips_types_with_missing_pages(sample_condition_resource):
+    pages = PageExtractor()
+    asyncio.run(pages("Condition", [sample_condition_resource]))
+
+    assert set(pages.tables({"Condition": [sample_condition_resource]})) == {"Condition"}
+    # The search failed after the first page, so the fetched list doesn't match
+    assert pages.tables({"Condition": []}) == {}
+
+
+def test_concat_stacks_rows_and_skips_empty_tables():
+    first = RecordTable.from_dicts([{"a": 1, "b": 2}])
+    second = RecordTable.from_dicts([{"a": 3, "b": 4}, {"a": 5, "b": 6}])
+
+    table = RecordTable.concat([RecordTable(), first, second])
+
+    assert table.columns == ("a", "b")
+    assert table.column("a") == [1, 3, 5]
+    assert RecordTable.concat([]).empty
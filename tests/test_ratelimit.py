@@ -0,0 +1,164 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.llm.client import LLMClient
+from app.llm.ratelimit import LLMRateLimiter, Priority, parse_duration, retry_after
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def _completion(total_tokens: int):
+    return SimpleNamespace(usage=SimpleNamespace(total_tokens=total_tokens))
+
+
+async def test_waiters_are_admitted_by_priority_then_arrival():
+    # 6000 tokens a minute: one 1-token request every 10 ms once the bucket is empty
+    limiter = LLMRateLimiter(tpm=6000)
+    limiter.tokens.level = 0
+    admitted: list[str] = []
+
+    async def request(name: str, priority: Priority) -> None:
+        await limiter.acquire(1, priority)
+        admitted.append(name)
+
+    tasks = []
+    for name, priority in [
+        ("batch-1", Priority.BATCH),
+        ("agent-1", Priority.AGENT),
+        ("interactive-1", Priority.INTERACTIVE),
+        ("batch-2", Priority.BATCH),
+        ("interactive-2", Priority.INTERACTIVE),
+    ]:
+        tasks.append(asyncio.create_task(request(name, priority)))
+        await asyncio.sleep(0)
+    await asyncio.wait_for(asyncio.gather(*tasks), 2)
+
+    assert admitted == ["interactive-1", "interactive-2", "agent-1", "batch-1", "batch-2"]
+    assert limiter.stats[Priority.BATCH].admitted == 2
+
+
+async def test_cancelled_waiter_leaves_the_queue():
+    limiter = LLMRateLimiter(tpm=6000)
+    limiter.tokens.level = 0
+    waiter = asyncio.create_task(limiter.acquire(1, Priority.BATCH))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    await asyncio.wait_for(limiter.acquire(1), 1)
+    assert limiter.stats[Priority.BATCH].depth == 0
+
+
+async def test_failed_attempts_are_refunded_before_retrying():
+    limiter = LLMRateLimiter(tpm=1000, backoff_base=0)
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise StatusError(503)
+        return _completion(100)
+
+    await limiter.run(call, 500)
+
+    assert attempts == 3
+    assert limiter.retries == 2
+    # Only the successful attempt's usage is charged
+    assert limiter.tokens.level == pytest.approx(900, abs=1)
+
+
+async def test_final_failure_is_refunded():
+    limiter = LLMRateLimiter(tpm=1000)
+
+    async def call():
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        await limiter.run(call, 500)
+
+    assert limiter.failed == 1
+    assert limiter.tokens.level == pytest.approx(1000, abs=1)
+
+
+async def test_rate_limit_drains_buckets_to_the_reported_remaining():
+    limiter = LLMRateLimiter(tpm=1000, backoff_base=0, backoff_max=0)
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            error = StatusError(429)
+            error.response = SimpleNamespace(
+                headers={"x-ratelimit-remaining-tokens": "200", "retry-after-ms": "0"}
+            )
+            raise error
+        return _completion(50)
+
+    await limiter.run(call, 100)
+
+    assert limiter.rate_limited == 1
+    assert limiter.tokens.level == pytest.approx(150, abs=1)
+
+
+async def test_stream_settles_with_the_final_chunk_usage():
+    limiter = LLMRateLimiter(tpm=10_000)
+    llm = LLMClient(limiter=limiter)
+    chunks = [
+        SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content="Hi"))]),
+        SimpleNamespace(usage=SimpleNamespace(prompt_tokens=30, completion_tokens=12), choices=[]),
+    ]
+
+    async def create(**kwargs):
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+
+        return stream()
+
+    llm._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    deltas = [delta async for delta in llm.stream("prompt", max_tokens=1000)]
+
+    assert deltas == ["Hi"]
+    assert limiter.tokens.level == pytest.approx(10_000 - 42, abs=1)
+
+
+def test_retry_after_headers():
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert retry_after({"retry-after-ms": "1500"}) == 1.5
+    exhausted = {"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "2s"}
+    assert retry_after(exhausted) == 2
+    assert retry_after({**exhausted, "x-ratelimit-remaining-tokens": "5"}) is None
+
+
+async def test_slots_cap_concurrent_requests_not_callers():
+    slots = asyncio.Semaphore(2)
+    llm = LLMClient(slots=slots)
+    active = peak = 0
+
+    async def create(**kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        message = SimpleNamespace(content="summary")
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=message)])
+
+    llm._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    # One client shared by a patient's section calls, as in a batch job
+    results = await asyncio.gather(*(llm.generate(f"section {i}") for i in range(5)))
+
+    assert results == ["summary"] * 5
+    assert peak == 2
@@ -0,0 +1,94 @@
+import asyncio
+
+from app.llm.prompts import SectionType
+from app.processing import SectionScheduler
+
+PROMPTS = {
+    SectionType.DEMOGRAPHICS: "demographics prompt",
+    SectionType.CONDITIONS: "conditions prompt",
+    SectionType.MEDICATIONS: "medications prompt",
+}
+
+
+async def test_results_keep_prompt_order_and_label_calls():
+    labels: list[str] = []
+
+    async def generate(prompt: str, section: str) -> str:
+        labels.append(section)
+        # Later sections finish first
+        await asyncio.sleep(0.03 - 0.01 * len(labels))
+        return f"summary of {prompt}"
+
+    results = await SectionScheduler(generate).run(PROMPTS)
+
+    assert list(results) == list(PROMPTS)
+    assert results[SectionType.CONDITIONS].summary == "summary of conditions prompt"
+    assert sorted(labels) == sorted(section.value for section in PROMPTS)
+    assert not any(result.fallback for result in results.values())
+
+
+async def test_slow_section_times_out_to_the_fallback():
+    async def generate(prompt: str, section: str) -> str:
+        if section == SectionType.CONDITIONS.value:
+            await asyncio.sleep(10)
+        return "ok"
+
+    scheduler = SectionScheduler(generate, timeout=0.05, fallback="unavailable")
+    results = await asyncio.wait_for(scheduler.run(PROMPTS), 2)
+
+    slow = results[SectionType.CONDITIONS]
+    assert (slow.summary, slow.fallback) == ("unavailable", True)
+    assert slow.error == "timed out after 0.05s"
+    assert results[SectionType.DEMOGRAPHICS].summary == "ok"
+
+
+async def test_failing_section_falls_back_with_its_error():
+    async def generate(prompt: str, section: str) -> str:
+        if section == SectionType.MEDICATIONS.value:
+            raise RuntimeError("provider down")
+        return "ok"
+
+    results = await SectionScheduler(generate, fallback="unavailable").run(PROMPTS)
+
+    failed = results[SectionType.MEDICATIONS]
+    assert (failed.summary, failed.fallback, failed.error) == ("unavailable", True, "provider down")
+
+
+async def test_concurrency_cap_queues_sections_and_times_only_the_call():
+    running = peak = 0
+
+    async def generate(prompt: str, section: str) -> str:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return "ok"
+
+    scheduler = SectionScheduler(generate, max_concurrency=1, timeout=0.2)
+    results = await scheduler.run(PROMPTS)
+
+    assert peak == 1
+    # Waiting for a slot doesn't count against the timeout
+    assert not any(result.fallback for result in results.values())
+    assert max(result.wait_ms for result in results.values()) >= 90
+
+
+async def test_iter_results_yields_in_completion_order_and_cancels_on_close():
+    cancelled: list[str] = []
+
+    async def generate(prompt: str, section: str) -> str:
+        try:
+            await asyncio.sleep(0 if section == SectionType.MEDICATIONS.value else 10)
+        except asyncio.CancelledError:
+            cancelled.append(section)
+            raise
+        return section
+
+    results = SectionScheduler(generate).iter_results(PROMPTS)
+    first = await results.__anext__()
+    await results.aclose()
+    await asyncio.sleep(0)
+
+    assert first.section_type is SectionType.MEDICATIONS
+    assert sorted(cancelled) == [SectionType.CONDITIONS.value, SectionType.DEMOGRAPHICS.value]
@@ -0,0 +1,126 @@
+import asyncio
+
+from app.processing import SingleFlight
+
+
+async def test_concurrent_calls_share_one_run():
+    flights = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flights.run("key", work) for _ in range(3)))
+
+    assert results == ["result"] * 3
+    assert calls == 1
+    assert (flights.started, flights.coalesced) == (1, 2)
+    assert flights.in_flight() == 0
+
+
+async def test_different_keys_run_separately():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0)
+        return object()
+
+    first, second = await asyncio.gather(flights.run("a", work), flights.run("b", work))
+
+    assert first is not second
+    assert flights.started == 2
+
+
+async def test_cancelled_caller_does_not_cancel_the_shared_run():
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    leaver = asyncio.create_task(flights.run("key", work))
+    stayer = asyncio.create_task(flights.run("key", work))
+    await asyncio.sleep(0)
+    leaver.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await stayer == "done"
+    assert leaver.cancelled()
+
+
+async def test_shared_run_is_cancelled_when_every_caller_leaves():
+    flights = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    callers = [asyncio.create_task(flights.run("key", work)) for _ in range(2)]
+    await asyncio.sleep(0)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+
+    await asyncio.wait_for(cancelled.wait(), 1)
+    await asyncio.sleep(0)
+    assert flights.in_flight() == 0
+
+
+async def test_exception_reaches_every_caller_and_key_is_freed():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        flights.run("key", fail), flights.run("key", fail), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.in_flight() == 0
+
+    async def succeed():
+        return "again"
+
+    assert await flights.run("key", succeed) == "again"
+
+
+async def test_caller_arriving_while_the_abandoned_run_unwinds_starts_a_new_one():
+    flights = SingleFlight()
+    unwinding = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_to_cancel():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            unwinding.set()
+            # Cleanup that takes a while, e.g. closing a connection
+            await release.wait()
+            raise
+
+    async def fresh():
+        return "fresh"
+
+    leaver = asyncio.create_task(flights.run("key", slow_to_cancel))
+    await asyncio.sleep(0)
+    leaver.cancel()
+    await unwinding.wait()
+
+    late = asyncio.create_task(flights.run("key", fresh))
+    result = await asyncio.wait_for(late, 1)
+    release.set()
+    await asyncio.gather(leaver, return_exceptions=True)
+
+    assert result == "fresh"
+    assert flights.started == 2
@@ -0,0 +1,152 @@
+import datetime
+
+import pytest
+
+from app.fhir.resources import AllergyHandler, ConditionHandler, RecordTable
+from app.fhir.resources import patient as patient_module
+from app.llm.prompts import SectionType
+from app.llm.tokens import TokenCounter
+from app.processing import pipeline
+from app.processing.pipeline import (
+    RESOURCE_HANDLERS,
+    build_section_prompts,
+    build_summary_response,
+    extract_patient_data,
+    merge_section_results,
+)
+from app.processing.scheduler import SectionResult
+from app.processing.templates import render_small_sections
+
+EVERY_SECTION = {section.value: 5 for section in SectionType}
+
+
+class FixedDate(datetime.date):
+    @classmethod
+    def today(cls):
+        return cls(2025, 6, 1)
+
+
+@pytest.fixture(autouse=True)
+def fixed_today(monkeypatch):
+    monkeypatch.setattr(patient_module, "date", FixedDate)
+
+
+def _allergies(sample: dict, count: int) -> RecordTable:
+    return AllergyHandler().to_records([{**sample, "id": f"allergy-{i}"} for i in range(count)])
+
+
+def test_sections_at_the_threshold_are_templated(sample_allergy_resource):
+    rendered = render_small_sections(
+        {"AllergyIntolerance": _allergies(sample_allergy_resource, 3)}, {"allergies": 3}
+    )
+
+    assert rendered[SectionType.ALLERGIES].count("\n") == 2
+
+
+def test_sections_over_the_threshold_go_to_the_llm(sample_allergy_resource):
+    rendered = render_small_sections(
+        {"AllergyIntolerance": _allergies(sample_allergy_resource, 4)}, {"allergies": 3}
+    )
+
+    assert rendered == {}
+
+
+@pytest.mark.parametrize("count, templated", [(3, True), (4, False)])
+def test_threshold_picks_the_template_or_the_llm_prompt(
+    monkeypatch, sample_patient_resource, sample_allergy_resource, count, templated
+):
+    monkeypatch.setattr(
+        pipeline, "get_token_counter", lambda model: TokenCounter(model, use_tiktoken=False)
+    )
+    data = extract_patient_data("test-patient-123", {"Patient": [sample_patient_resource]})
+    data.tables["AllergyIntolerance"] = _allergies(sample_allergy_resource, count)
+
+    prompts, results, _ = build_section_prompts(data)
+
+    # Default section_template_max_rows: {"demographics": 1, "allergies": 3}
+    assert (SectionType.ALLERGIES in results) is templated
+    assert (SectionType.ALLERGIES in prompts) is not templated
+    assert SectionType.DEMOGRAPHICS in results
+    assert set(prompts) <= {SectionType.ALLERGIES}
+
+
+def test_unlisted_sections_are_templated_only_when_empty(sample_condition_resource):
+    conditions = ConditionHandler().to_records([sample_condition_resource])
+
+    assert render_small_sections({"Condition": conditions}, {}) == {}
+    assert render_small_sections({"Condition": RecordTable()}, {}) == {
+        SectionType.CONDITIONS: "No conditions recorded."
+    }
+
+
+def test_rendered_sections(
+    sample_patient_resource,
+    sample_condition_resource,
+    sample_medication_request_resource,
+    sample_observation_resource,
+    sample_allergy_resource,
+):
+    resources = {
+        "Patient": [sample_patient_resource],
+        "Condition": [sample_condition_resource],
+        "MedicationRequest": [sample_medication_request_resource],
+        "Observation": [sample_observation_resource],
+        "AllergyIntolerance": [sample_allergy_resource],
+    }
+    tables = {rt: RESOURCE_HANDLERS[rt].to_records(found) for rt, found in resources.items()}
+
+    rendered = render_small_sections(tables, EVERY_SECTION)
+
+    assert rendered == {
+        SectionType.DEMOGRAPHICS: (
+            "John Robert Smith, 55-year-old male, born 1970-01-15. Phone: 555-123-4567; "
+            "email: john.smith@email.com; address: 123 Main St, Boston, MA, 02101."
+        ),
+        SectionType.CONDITIONS: "- Type 2 diabetes mellitus (Active, onset 2015-03-01)",
+        SectionType.MEDICATIONS: (
+            "- Metformin 500 MG Oral Tablet: Take 1 tablet by mouth twice daily "
+            "(active, prescribed 2024-01-15)"
+        ),
+        SectionType.OBSERVATIONS: (
+            "- Hemoglobin A1c/Hemoglobin.total in Blood: 7.2 % (High, 2024-01-10)"
+        ),
+        SectionType.ALLERGIES: (
+            "- **Penicillin G (high criticality)** reaction: Hives - moderate "
+            "(medication, Active)"
+        ),
+    }
+
+
+def test_empty_sections_render_a_placeholder():
+    tables = {rt: RecordTable() for rt in RESOURCE_HANDLERS}
+
+    rendered = render_small_sections(tables, {})
+
+    assert rendered[SectionType.DEMOGRAPHICS] == "No demographic information recorded."
+    assert rendered[SectionType.ALLERGIES] == "No allergies or intolerances recorded."
+    assert len(rendered) == len(SectionType)
+
+
+def test_section_sources_report_how_each_section_was_produced(sample_patient_resource):
+    data = extract_patient_data("test-patient-123", {"Patient": [sample_patient_resource]})
+    templated = {
+        SectionType.ALLERGIES: SectionResult(SectionType.ALLERGIES, "None", templated=True)
+    }
+    scheduled = {
+        SectionType.DEMOGRAPHICS: SectionResult(SectionType.DEMOGRAPHICS, "A summary"),
+        SectionType.CONDITIONS: SectionResult(
+            SectionType.CONDITIONS, "Unavailable", fallback=True, error="timed out"
+        ),
+    }
+
+    response = build_summary_response(
+        data, merge_section_results(templated, scheduled), "Final", 0.0
+    )
+
+    assert {k: v.value for k, v in response.section_sources.items()} == {
+        "allergies": "template",
+        "demographics": "llm",
+        "conditions": "fallback",
+    }
+    assert response.sections.allergies == "None"
+    assert response.scheduler.fallback_sections == ["conditions"]
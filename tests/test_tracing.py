@@ -0,0 +1,140 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import tracing
+
+INCOMING = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+class ListExporter(tracing.SpanExporter):
+    def __init__(self):
+        self.batches: list[list[tracing.Span]] = []
+
+    def export(self, spans: list[tracing.Span]) -> None:
+        self.batches.append(list(spans))
+
+
+@pytest.fixture
+def exporter():
+    exporter = ListExporter()
+    tracing.set_exporter(exporter)
+    yield exporter
+    tracing.set_exporter(None)
+
+
+async def test_spans_nest_under_the_current_span_including_tasks(exporter):
+    async def fetch() -> None:
+        with tracing.span("task"):
+            await asyncio.sleep(0)
+
+    with tracing.span("request") as root:
+        with tracing.span("child") as child:
+            with tracing.span("grandchild") as grandchild:
+                pass
+        await asyncio.create_task(fetch())
+
+    [spans] = exporter.batches
+    by_name = {span.name: span for span in spans}
+    assert root.parent_id is None
+    assert child.parent_id == root.span_id
+    assert grandchild.parent_id == child.span_id
+    assert by_name["task"].parent_id == root.span_id
+    assert {span.trace_id for span in spans} == {root.trace_id}
+    # Children finish first; the root's end exports the whole tree
+    assert [span.name for span in spans] == ["grandchild", "child", "task", "request"]
+
+
+async def test_exporter_gets_each_span_once_with_its_error(exporter):
+    with pytest.raises(ValueError):
+        with tracing.span("request"):
+            with tracing.span("extract", resource_type="Condition") as span:
+                span.set(rows=3)
+                raise ValueError("bad row")
+
+    [spans] = exporter.batches
+    extract = spans[0]
+    assert extract.attributes == {"resource_type": "Condition", "rows": 3}
+    assert extract.error == "ValueError: bad row"
+    assert extract.duration_ms is not None
+
+    with tracing.span("next request"):
+        pass
+    assert [[span.name for span in batch] for batch in exporter.batches[1:]] == [["next request"]]
+
+
+async def test_span_outliving_its_root_is_exported_on_its_own(exporter):
+    with tracing.span("request"):
+        straggler = tracing.start_span("background")
+
+    straggler.end()
+
+    assert [[span.name for span in batch] for batch in exporter.batches] == [
+        ["request"],
+        ["background"],
+    ]
+
+
+def test_disabled_tracing_uses_the_noop_span():
+    tracing.set_exporter(None)
+
+    with tracing.span("request") as span:
+        span.set(ignored=True)
+
+    assert span is tracing.NOOP_SPAN
+    assert tracing.current_traceparent() is None
+
+
+async def test_incoming_traceparent_reaches_outbound_calls(exporter):
+    outbound: list[httpx.Request] = []
+
+    def tool_server(request: httpx.Request) -> httpx.Response:
+        outbound.append(request)
+        return httpx.Response(200)
+
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(tool_server),
+        event_hooks={"request": [tracing.inject_traceparent]},
+    )
+
+    async def app(scope, receive, send):
+        with tracing.span("tool call"):
+            await client.get("http://tools/summary")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=tracing.TraceMiddleware(app)), base_url="http://api"
+    ) as caller:
+        await caller.get("/mcp", headers={"traceparent": INCOMING})
+
+    [spans] = exporter.batches
+    tool_call, request = spans
+    assert request.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert request.parent_id == "00f067aa0ba902b7"
+    assert request.attributes["status_code"] == 200
+    assert tool_call.parent_id == request.span_id
+    # The outbound call continues the same trace, parented on the span that made it
+    assert outbound[0].headers["traceparent"] == tool_call.traceparent
+    assert tool_call.traceparent.startswith("00-4bf92f3577b34da6a3ce929d0e0e4736-")
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        None,
+        "garbage",
+        "00-00000000000000000000000000000000-00f067aa0ba902b7-01",
+        "00-4bf92f3577b34da6a3ce929d0e0e4736-0000000000000000-01",
+    ],
+)
+def test_invalid_traceparent_starts_a_new_trace(header):
+    assert tracing.parse_traceparent(header) is None
+
+
+def test_parse_traceparent_ignores_case():
+    assert tracing.parse_traceparent(INCOMING.upper()) == (
+        "4bf92f3577b34da6a3ce929d0e0e4736",
+        "00f067aa0ba902b7",
+    )
@@ -0,0 +1,51 @@
+import asyncio
+
+import httpx
+
+from app.fhir.transport import _MeteredTransport
+
+
+class Body(httpx.AsyncByteStream):
+    """Unread response body, as a real transport returns it."""
+
+    async def __aiter__(self):
+        yield b"{}"
+
+
+class SlowTransport(httpx.AsyncBaseTransport):
+    """Answers every request with 200 after ``delay`` seconds."""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.delay)
+        return httpx.Response(200, stream=Body())
+
+
+async def test_requests_waiting_on_per_host_limit_count_as_saturated():
+    transport = _MeteredTransport(SlowTransport(), max_connections=100, max_connections_per_host=2)
+    async with httpx.AsyncClient(transport=transport, base_url="http://fhir") as client:
+        await asyncio.gather(*(client.get("/Patient/1") for _ in range(5)))
+
+    assert transport.stats.requests_total == 5
+    assert transport.stats.saturated_total == 3
+    assert transport.stats.peak_in_flight == 2
+    assert transport.stats.in_flight == 0
+
+
+async def test_requests_under_the_limit_are_not_saturated():
+    transport = _MeteredTransport(SlowTransport(), max_connections=100, max_connections_per_host=20)
+    async with httpx.AsyncClient(transport=transport, base_url="http://fhir") as client:
+        await asyncio.gather(*(client.get("/Patient/1") for _ in range(5)))
+
+    assert transport.stats.saturated_total == 0
+    assert transport.stats.peak_in_flight == 5
+
+
+async def test_pool_limit_counts_without_per_host_limit():
+    transport = _MeteredTransport(SlowTransport(), max_connections=2, max_connections_per_host=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://fhir") as client:
+        await asyncio.gather(*(client.get("/Patient/1") for _ in range(4)))
+
+    assert transport.stats.saturated_total == 2